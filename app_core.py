@@ -3,11 +3,7 @@ import sys
 sys.path.insert(0, os.path.abspath(".")) 
 import time
 import json
-import numpy as np
-from pathlib import Path
-from sklearn.metrics.pairwise import cosine_similarity
 import requests
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import faiss
 import openai
@@ -27,6 +23,10 @@ from import_shims import (
     run_chunking,
     FAISSRetriever
 )
+from corpus.unified import get_unified_index
+from tooling.common_utils import html_to_text, rank_typesense_groups, typesense_ngram_body
+from tooling.page_fetcher import fetch_page, fetch_pages
+from tooling.slack_client import search_slack_ngrams
 
 load_dotenv()
 
@@ -38,11 +38,6 @@ openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
 ENABLE_MCP = os.getenv("ENABLE_MCP", "true").lower() in {"1", "true", "yes"}
 SLACK_TOKEN = os.getenv("SLACK_API_KEY")
 
-# Initialize SlackSearcher only if the module is available
-if SlackSearcher is not None:
-    slack_searcher = SlackSearcher(slack_token=SLACK_TOKEN, result_limit=3, thread_limit=5)
-else:
-    slack_searcher = None
 TYPESENSE_API_KEY = os.getenv('TYPESENSE_API_KEY')
 TYPESENSE_BASE_URL = os.getenv('TYPESENSE_BASE_URL')
 TYPESENSE_URL = f"https://{TYPESENSE_BASE_URL}-1.a1.typesense.net/multi_search?x-typesense-api-key={TYPESENSE_API_KEY}"
@@ -86,38 +81,6 @@ ngram_config = {
     }
 }
 
-def load_json_embeddings(json_dir_or_file):
-    all_chunks = []
-    paths = [Path(json_dir_or_file)] if Path(json_dir_or_file).is_file() else Path(json_dir_or_file).glob("*.json*")
-    
-    for path in paths:
-        with open(path) as f:
-            if path.suffix == ".jsonl":
-                for line in f:
-                    try:
-                        chunk = json.loads(line)
-                        if "embedding" in chunk and isinstance(chunk["embedding"], list):
-                            all_chunks.append(chunk)
-                    except json.JSONDecodeError:
-                        continue
-            elif path.suffix == ".json":
-                try:
-                    data = json.load(f)
-                    for chunk in data:
-                        if "embedding" in chunk and isinstance(chunk["embedding"], list):
-                            all_chunks.append(chunk)
-                except json.JSONDecodeError:
-                    continue
-    return all_chunks
-
-def search_json_chunks(query_embedding, chunks, top_k=5):
-    if not chunks:
-        return []
-    embeddings = np.array([c["embedding"] for c in chunks])
-    scores = cosine_similarity([query_embedding], embeddings)[0]
-    top_indices = scores.argsort()[-top_k:][::-1]
-    return [chunks[i] for i in top_indices]
-
 if ENABLE_MCP:
     registry = MCPRegistry()
     mcp_client = registry.get_client(
@@ -134,40 +97,29 @@ else:
     mcp_client = None
 
 def fetch_live_content(url, timeout=8):
-    try:
-        resp = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        return soup.get_text(" ", strip=True)
-    except Exception:
-        return None
+    return fetch_page(url, timeout)
 
 def search_typesense_ngrams(ngrams, max_results=5):
-    docs, seen_urls = [], set()
+    """All n-grams in one multi_search request; grouped hits merged and ranked client-side."""
     ngram_list = ngrams.get("ngram") if isinstance(ngrams, dict) else ngrams
-    for ngram in ngram_list:
-        body = TYPESENSE_SEARCH_BODY_TEMPLATE.copy()
-        body["searches"][0] = body["searches"][0].copy()
-        body["searches"][0]["q"] = ngram
-        try:
-            resp = requests.post(TYPESENSE_URL, headers=TYPESENSE_HEADERS, data=json.dumps(body), timeout=8)
-            resp.raise_for_status()
-            results = resp.json().get("results", [])
-        except Exception:
-            continue
-        for group in results[0].get("grouped_hits", []):
-            for hit in group.get("hits", []):
-                doc = hit["document"]
-                url = doc.get("url", "")
-                if url in seen_urls:
-                    continue
-                seen_urls.add(url)
-                content = fetch_live_content(url) or BeautifulSoup(doc.get("content", ""), "html.parser").get_text(" ", strip=True)
-                title = " > ".join([doc.get(f"hierarchy.lvl{i}") for i in range(7) if doc.get(f"hierarchy.lvl{i}")])
-                docs.append({"title": title, "url": url, "content": content})
-                if len(docs) >= max_results:
-                    return docs
-                time.sleep(0.5)
+    body = typesense_ngram_body(TYPESENSE_SEARCH_BODY_TEMPLATE["searches"][0], ngram_list or [])
+    if not body["searches"]:
+        return []
+    try:
+        resp = requests.post(TYPESENSE_URL, headers=TYPESENSE_HEADERS, data=json.dumps(body), timeout=8)
+        resp.raise_for_status()
+        results = resp.json().get("results", [])
+    except Exception:
+        return []
+    ranked = rank_typesense_groups(results, max_results)
+    # all pages at once: latency of the slowest page, bounded by the fetch deadline
+    pages = fetch_pages(doc.get("url") for doc in ranked)
+    docs = []
+    for doc in ranked:
+        url = doc.get("url", "")
+        content = pages.get(url) or html_to_text(doc.get("content", ""))
+        title = " > ".join([doc.get(f"hierarchy.lvl{i}") for i in range(7) if doc.get(f"hierarchy.lvl{i}")])
+        docs.append({"title": title, "url": url, "content": content})
     return docs
 
 def is_metric_query(query):
@@ -231,28 +183,25 @@ def handle_user_query(query):
     seen = set()
     slack_ngrams = ngrams.get("ngram") if isinstance(ngrams, dict) else ngrams
     search_excluded = " -in:customer-sla-breach -in:customer-triage -in:support-overflow -in:omnis -in:customer-membership-alerts -in:vector-alerts -in:notifications-alerts -cypress -github -sentry -squadcast -syften -in:leadership -in:leaders"
-    if slack_searcher:
-        for ng in slack_ngrams:
-            for res in slack_searcher.search(ng+search_excluded):
-                channel_name = res.get("metadata", {}).get("channel_name") or res.get("metadata", {}).get("channel")
-                text = res.get("text", "") if isinstance(res, dict) else res
-                url = res.get("metadata", {}).get("permalink", "") if isinstance(res, dict) else ""
-                key = url or text
-                if key in seen:
-                    continue
-                seen.add(key)
-                slack_docs.append({
-                    "title": f"Slack – #{channel_name}" if channel_name else "Slack",
-                    "url": url,
-                    "content": text,
-                    "source": "slack"
-                })
+    if SlackSearcher is not None:
+        # a few planned queries for all n-grams, deduped by permalink and re-scored
+        for res in search_slack_ngrams(SLACK_TOKEN, slack_ngrams, exclusions=search_excluded, result_limit=3, thread_limit=5):
+            channel_name = res.get("metadata", {}).get("channel_name") or res.get("metadata", {}).get("channel")
+            text = res.get("text", "") if isinstance(res, dict) else res
+            url = res.get("metadata", {}).get("permalink", "") if isinstance(res, dict) else ""
+            key = url or text
+            if key in seen:
+                continue
+            seen.add(key)
+            slack_docs.append({
+                "title": f"Slack – #{channel_name}" if channel_name else "Slack",
+                "url": url,
+                "content": text,
+                "source": "slack"
+            })
     else:
         print("SlackSearcher module not available, skipping Slack search.")
 
-    docs_chunks = load_json_embeddings(Path("sources/docs/docs-000.jsonl"))
-    community_chunks = load_json_embeddings(Path("sources/discourse/discourse-000.jsonl"))
-
     query_chunks = run_chunking(
         raw_text=query,
         chunk_method="sentence",
@@ -262,9 +211,11 @@ def handle_user_query(query):
         provider="voyage",
         model_name="voyage-3.5"
     )
-    query_embedding = query_chunks[0]["embedding"]
+    query_embeddings = [c["embedding"] for c in query_chunks]
 
-    top_docs = search_json_chunks(query_embedding, docs_chunks)
+    corpus_index = get_unified_index()
+    hits = corpus_index.search_per_source(query_embeddings, top_k={"docs": 5, "community": 5})
+    top_docs = [corpus_index.chunk(row)[1] for row, _ in hits["docs"]]
     top_docs_formatted = []
     docs_base_url = "https://docs.omni.co/"
     for chunk in top_docs:
@@ -283,7 +234,7 @@ def handle_user_query(query):
             "content": chunk.get("chunk_text", ""),
             "source": "docs"
         })
-    top_community = search_json_chunks(query_embedding, community_chunks)
+    top_community = [corpus_index.chunk(row)[1] for row, _ in hits["community"]]
     top_community_formatted = []
     community_base_url="https://community.omni.co/t/"
     for chunk in top_community:
@@ -0,0 +1,8 @@
+# corpus/__init__.py
+"""
+Local embedding corpus: resident stores, indexes and their maintenance jobs.
+
+Import what you need from the submodules (corpus.store, corpus.unified,
+corpus.bm25, ...). Nothing is imported here, so `python -m corpus.<job>`
+does not load the module twice and FAISS is only loaded by code that uses it.
+"""
@@ -0,0 +1,177 @@
+# corpus/bm25.py
+"""
+Local BM25 keyword search over the embedded corpora.
+
+The inverted index is built from the same `chunk_text` the embedding tools
+search, so its rows line up with the store's rows. Each posting stores its
+precomputed BM25 weight; a query is scored by concatenating the postings of
+its terms and summing them per row with one `np.bincount`.
+
+Hybrid search fuses the BM25 ranking with the cosine ranking of the unified
+vector index by reciprocal-rank fusion.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import DigestCache
+from .filters import filter_rows
+from .search import RRF_K, fuse_ranked, top_k_indices
+from .sources import DEFAULT_TOP_K, SOURCE_FILES
+from .store import CorpusStore, get_store
+from .unified import get_unified_index
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SEARCH_MODES = ("bm25", "hybrid")
+
+_WORD_RE = re.compile(r"\w+")
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens. Identifiers are kept whole and also split into
+    their parts (`sql_expression` -> sql_expression, sql, expression;
+    `fetchRows` -> fetchrows, fetch, rows), so both spellings match.
+    """
+    out = []
+    for word in _WORD_RE.findall(text or ""):
+        out.append(word.lower())
+        parts = [p for chunk in word.split("_") for p in _CAMEL_RE.split(chunk) if p]
+        if len(parts) > 1:
+            out.extend(p.lower() for p in parts)
+    return out
+
+
+@dataclass
+class BM25Index:
+    digest: str                 # digest of the store it was built from
+    vocab: Dict[str, int]
+    indptr: np.ndarray          # (V + 1,) postings of term t are indptr[t]:indptr[t + 1]
+    rows: np.ndarray            # (P,) int32 row of each posting
+    weights: np.ndarray         # (P,) float32 idf * saturated tf of each posting
+    n_rows: int
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def score(self, query: str) -> np.ndarray:
+        """(n,) BM25 scores of every row for `query` (repeated query terms count once)."""
+        ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not ids or not self.n_rows:
+            return np.zeros(self.n_rows, dtype=np.float32)
+        spans = [slice(self.indptr[t], self.indptr[t + 1]) for t in ids]
+        rows = np.concatenate([self.rows[s] for s in spans])
+        weights = np.concatenate([self.weights[s] for s in spans])
+        return np.bincount(rows, weights=weights, minlength=self.n_rows).astype(np.float32)
+
+    def search_rows(self, query: str, top_k: int = DEFAULT_TOP_K,
+                    rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Best-first (rows, scores) of rows matching at least one query term, optionally within `rows`."""
+        scores = self.score(query)
+        if rows is not None:
+            idx = top_k_indices(scores[rows], top_k)[0]
+            idx = rows[idx]
+        else:
+            idx = top_k_indices(scores, top_k)[0]
+        idx = idx[scores[idx] > 0]
+        return idx, scores[idx]
+
+
+def build_bm25(texts: Iterable[str], digest: str = "", k1: float = BM25_K1, b: float = BM25_B) -> BM25Index:
+    vocab: Dict[str, int] = {}
+    term_ids: List[int] = []
+    rows: List[int] = []
+    tfs: List[int] = []
+    doc_len: List[int] = []
+    for row, text in enumerate(texts):
+        counts = Counter(tokenize(text))
+        doc_len.append(sum(counts.values()))
+        for term, tf in counts.items():
+            term_ids.append(vocab.setdefault(term, len(vocab)))
+            rows.append(row)
+            tfs.append(tf)
+
+    n = len(doc_len)
+    t = np.array(term_ids, dtype=np.int64)
+    order = np.argsort(t, kind="stable")
+    t, r, tf = t[order], np.array(rows, dtype=np.int32)[order], np.array(tfs, dtype=np.float32)[order]
+    df = np.bincount(t, minlength=len(vocab))
+    indptr = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+
+    lengths = np.array(doc_len, dtype=np.float32)
+    avgdl = float(lengths.mean()) if n and lengths.sum() else 1.0
+    idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+    norm = k1 * (1.0 - b + b * lengths[r] / avgdl) if n else np.zeros(0, np.float32)
+    weights = (idf[t] * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32)
+    return BM25Index(digest, vocab, indptr, r, weights, n)
+
+
+def build_from_store(store: CorpusStore) -> BM25Index:
+    return build_bm25((store.text(i) for i in range(len(store))), digest=store.digest)
+
+
+# -------- Process-wide registry --------
+_INDEXES: DigestCache[BM25Index] = DigestCache()
+
+
+def bm25_for_store(store: CorpusStore) -> BM25Index:
+    return _INDEXES.get(str(store.path), store.digest, lambda: build_from_store(store))
+
+
+def get_bm25_index(source_path) -> Tuple[CorpusStore, BM25Index]:
+    """Resident store plus a BM25 index in sync with it (rebuilt when the store's content changes)."""
+    store = get_store(source_path)
+    return store, bm25_for_store(store)
+
+
+def warm(store: CorpusStore) -> None:
+    """Build the index for a new version of a source ahead of its first query, if the source is in use."""
+    if str(store.path) in _INDEXES.keys():
+        bm25_for_store(store)
+
+
+# -------- Keyword + hybrid search --------
+def keyword_search(
+    source: str,
+    query: str,
+    top_k: int = DEFAULT_TOP_K,
+    mode: str = "bm25",
+    query_embeddings: Optional[List[List[float]]] = None,
+    depth: int = 50,
+    rrf_k: int = RRF_K,
+    filters: Optional[Dict[str, Any]] = None,
+) -> Tuple[CorpusStore, List[Tuple[int, float]]]:
+    """
+    Top-k rows of one source for `query` as (store, [(row, score), ...]).
+
+    "bm25" ranks by keyword score alone. "hybrid" fuses the BM25 ranking and
+    the cosine ranking of `query_embeddings` (top-`depth` each) with RRF;
+    without embeddings it degrades to plain BM25. `filters` restrict both
+    rankings to matching rows (see corpus/filters.py).
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown keyword search mode: {mode} (expected one of {SEARCH_MODES})")
+    if mode == "bm25" or not query_embeddings:
+        store, index = get_bm25_index(SOURCE_FILES[source])
+        rows, scores = index.search_rows(query, top_k, rows=filter_rows(store, filters))
+        return store, [(int(r), float(s)) for r, s in zip(rows, scores)]
+
+    # keyword and dense rows from one generation, so a hot swap mid-query cannot misalign them
+    unified = get_unified_index()
+    store = unified.stores[source]
+    kw_rows, kw_scores = bm25_for_store(store).search_rows(query, depth, rows=filter_rows(store, filters))
+    lo, _ = unified.source_range(source)
+    hits = unified.search_per_source(query_embeddings, top_k={source: depth}, filters=filters)[source]
+    ranked = np.full((2, depth), -1, dtype=np.int64)
+    scores = np.zeros((2, depth), dtype=np.float32)
+    ranked[0, :len(kw_rows)], scores[0, :len(kw_rows)] = kw_rows, kw_scores
+    ranked[1, :len(hits)] = [row - lo for row, _ in hits]
+    scores[1, :len(hits)] = [s for _, s in hits]
+    rows, fused = fuse_ranked(ranked, scores, top_k=top_k, method="rrf", rrf_k=rrf_k)
+    return store, [(int(r), float(s)) for r, s in zip(rows, fused)]
@@ -0,0 +1,103 @@
+# corpus/cache.py
+"""
+Process caches.
+
+DigestCache holds objects derived from a store (BM25, FAISS, metadata
+indexes), keyed per source by the store digest they were built from. The
+last `generations` digests are kept per source, so while a new corpus
+version is being swapped in, queries still running on the previous one find
+their index instead of thrashing a single slot. Builds run outside the lock.
+
+LRUCache is a plain bounded cache for values that do not depend on the
+corpus; both kinds are saved by corpus/snapshot.py.
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class DigestCache(Generic[T]):
+    def __init__(self, generations: int = 2):
+        self.generations = generations
+        self._entries: Dict[Hashable, "OrderedDict[str, T]"] = {}
+        self._lock = threading.Lock()
+
+    def peek(self, key: Hashable, digest: str) -> Optional[T]:
+        with self._lock:
+            return self._entries.get(key, {}).get(digest)
+
+    def put(self, key: Hashable, digest: str, value: T) -> T:
+        with self._lock:
+            slot = self._entries.setdefault(key, OrderedDict())
+            slot[digest] = value
+            slot.move_to_end(digest)
+            while len(slot) > self.generations:
+                slot.popitem(last=False)
+        return value
+
+    def get(self, key: Hashable, digest: str, build: Callable[[], T]) -> T:
+        hit = self.peek(key, digest)
+        if hit is not None:
+            return hit
+        return self.put(key, digest, build())
+
+    def keys(self) -> List[Hashable]:
+        with self._lock:
+            return list(self._entries)
+
+    def items(self) -> List[Tuple[Hashable, str, T]]:
+        with self._lock:
+            return [(key, digest, value) for key, slot in self._entries.items() for digest, value in slot.items()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class LRUCache(Generic[T]):
+    """Thread-safe, size-bounded process cache (query embeddings, fetched pages)."""
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._items: "OrderedDict[Hashable, T]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def version(self) -> int:
+        """Bumped on every write, so snapshots can tell whether the contents changed."""
+        return self._version
+
+    def get(self, key: Hashable) -> Optional[T]:
+        with self._lock:
+            hit = self._items.get(key)
+            if hit is not None:
+                self._items.move_to_end(key)
+            return hit
+
+    def put(self, key: Hashable, value: T) -> T:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            self._version += 1
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return value
+
+    def items(self) -> List[Tuple[Hashable, T]]:
+        """Oldest first, so `update(items())` restores the same recency order."""
+        with self._lock:
+            return list(self._items.items())
+
+    def update(self, items) -> None:
+        for key, value in items:
+            self.put(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._version += 1
@@ -0,0 +1,347 @@
+# corpus/compiled.py
+"""
+Compiled, memory-mapped corpus format.
+
+`python -m corpus.compiled` converts the JSONL shards of every source in
+SOURCE_FILES into one directory of flat arrays:
+
+    sources/compiled/
+        CURRENT                     name of the live version directory
+        <version>/
+            meta.json               sources, row ranges, shard stats + digests, dtype
+            vectors.npy             (n, d) float32, L2-normalized
+            codes.npy, scales.npy   float16/int8 codes (+ int8 row scales), with --dtype
+            uids.npy                (n,) int64 chunk_uid
+            source.npy              (n,) int16 index into meta["sources"]
+            shard.npy               (n,) int32 index into the source's shards
+            <col>.bin, <col>.idx.npy  utf-8 string column: blob + (n + 1) byte offsets
+
+String columns are id, chunk_text, record (the remaining chunk fields as
+JSON), the precomputed url and title, and metadata.<field> for each of
+store.METADATA_FIELDS, so metadata filters and text indexes are built
+without decoding any JSON.
+
+Every process maps the same files read-only, so N Streamlit or worker
+processes share one page-cache copy of the vectors instead of N heap copies.
+`get_store` serves a source from here while its shards still match the
+compiled stats/digests, and falls back to parsing the JSONL once they don't.
+A compile writes a new version directory and flips CURRENT atomically;
+processes still mapping the old version keep reading it until they reload.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tooling.common_utils import make_community_url, make_docs_url_from_path
+
+from .quantize import DEFAULT_DTYPE, DTYPES, quantize
+from .sources import SOURCE_FILES
+from .store import METADATA_FIELDS, CorpusStore, Shard, discover_shards, load_store, shard_stats, shards_unchanged
+
+COMPILED_DIR = Path(os.getenv("CORPUS_COMPILED_DIR", "sources/compiled"))
+FORMAT_VERSION = 3
+STRING_COLUMNS = ("id", "chunk_text", "record", "url", "title") + tuple(f"metadata.{f}" for f in METADATA_FIELDS)
+KEEP_VERSIONS = 2
+
+
+def chunk_url_title(source: str, chunk: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    """Display (url, title) of a chunk, as the search tools present it."""
+    meta = chunk.get("metadata") or {}
+    if source == "docs":
+        url = make_docs_url_from_path(meta.get("path", ""))
+        return url, url
+    if source == "community":
+        slug = str(meta.get("slug") or "")
+        return make_community_url(slug, str(meta.get("topic_id") or "")), slug or "Community"
+    if source == "slack":
+        channel = meta.get("channel_name")
+        return meta.get("permalink"), f"Slack – #{channel}" if channel else "Slack"
+    return None, chunk.get("title") or source
+
+
+# -------- String columns --------
+@dataclass
+class StringColumn:
+    blob: np.ndarray        # uint8, all values back to back
+    offsets: np.ndarray     # (n + 1,) int64
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        lo, hi = int(self.offsets[row]), int(self.offsets[row + 1])
+        return bytes(self.blob[lo:hi]).decode("utf-8")
+
+
+def _write_strings(root: Path, name: str, values: List[str]) -> None:
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    with open(root / f"{name}.bin", "wb") as f:
+        for i, value in enumerate(values):
+            data = (value or "").encode("utf-8")
+            f.write(data)
+            offsets[i + 1] = offsets[i] + len(data)
+    np.save(root / f"{name}.idx.npy", offsets)
+
+
+def _load(path: Path) -> np.ndarray:
+    return np.load(path, mmap_mode="r")
+
+
+def _read_strings(root: Path, name: str) -> StringColumn:
+    path = root / f"{name}.bin"
+    blob = np.memmap(path, dtype=np.uint8, mode="r") if path.stat().st_size else np.zeros(0, dtype=np.uint8)
+    return StringColumn(blob, _load(root / f"{name}.idx.npy"))
+
+
+# -------- Reading --------
+@dataclass
+class CompiledCorpus:
+    root: Path
+    meta: Dict[str, Any]
+    vectors: np.ndarray                 # (n, d) float32, exact
+    matrix: np.ndarray                  # (n, d) search matrix: `vectors` or quantized codes
+    scales: Optional[np.ndarray]
+    uids: np.ndarray
+    source_col: np.ndarray
+    shard_col: np.ndarray
+    columns: Dict[str, StringColumn]
+    _stores: Dict[str, CorpusStore] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @property
+    def sources(self) -> Tuple[str, ...]:
+        return tuple(s["name"] for s in self.meta["sources"])
+
+    def source_meta(self, spec) -> Optional[Dict[str, Any]]:
+        return next((s for s in self.meta["sources"] if s["spec"] == str(spec)), None)
+
+    def payload(self, row: int) -> Dict[str, Any]:
+        """Chunk dict as in the JSONL (without the embedding), plus precomputed url/title."""
+        cols = self.columns
+        chunk = json.loads(cols["record"][row] or "{}")
+        chunk["id"] = cols["id"][row]
+        chunk["chunk_text"] = cols["chunk_text"][row]
+        chunk["url"] = cols["url"][row] or None
+        chunk["title"] = cols["title"][row]
+        return chunk
+
+    def metadata_fields(self, row: int) -> Dict[str, str]:
+        return {f: self.columns[f"metadata.{f}"][row] for f in METADATA_FIELDS}
+
+    def is_fresh(self, src: Dict[str, Any]) -> bool:
+        """True if the source's shards on disk are the ones compiled (or there are none, e.g. a binary-only deploy)."""
+        if not discover_shards(src["spec"]):
+            return True
+        return shards_unchanged(src["spec"], src["shards"])
+
+    def store(self, src: Dict[str, Any]) -> CorpusStore:
+        """CorpusStore whose arrays are views into the mapped files."""
+        cur = self._stores.get(src["name"])
+        if cur is None:
+            lo, hi = src["rows"]
+            shard_col = self.shard_col[lo:hi]
+            counts = np.bincount(shard_col, minlength=len(src["shards"])) if hi > lo else [0] * len(src["shards"])
+            shards = [Shard(Path(sh["path"]), sh["mtime_ns"], sh["size"], sh["digest"], int(n))
+                      for sh, n in zip(src["shards"], counts)]
+            cur = CorpusStore(
+                Path(src["spec"]),
+                shards,
+                src["digest"],
+                self.matrix[lo:hi],
+                self.uids[lo:hi],
+                shard_col,
+                np.zeros(0, dtype=np.int64),
+                None if self.scales is None else self.scales[lo:hi],
+                compiled=self,
+                row0=lo,
+            )
+            self._stores[src["name"]] = cur
+        return cur
+
+
+def open_compiled(root: Path, dtype: str = DEFAULT_DTYPE) -> CompiledCorpus:
+    meta = json.loads((root / "meta.json").read_text())
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled corpus format {meta.get('format')} in {root}")
+    empty = meta["rows"] == 0
+    load = (lambda p: np.load(p)) if empty else _load
+    vectors = load(root / "vectors.npy")
+    matrix, scales = vectors, None
+    if dtype != "float32":
+        if meta["dtype"] == dtype:
+            matrix = load(root / "codes.npy")
+            scales = load(root / "scales.npy") if (root / "scales.npy").exists() else None
+        else:
+            # not shareable: quantize into this process's heap
+            print(f"[WARN] Compiled corpus {root.name} is {meta['dtype']}, quantizing to {dtype} in memory")
+            matrix, scales = quantize(np.asarray(vectors), dtype)
+    return CompiledCorpus(
+        root,
+        meta,
+        vectors,
+        matrix,
+        scales,
+        load(root / "uids.npy"),
+        load(root / "source.npy"),
+        load(root / "shard.npy"),
+        {name: _read_strings(root, name) for name in STRING_COLUMNS},
+    )
+
+
+_CURRENT: Optional[CompiledCorpus] = None
+_STALE_WARNED = set()
+_LOCK = threading.Lock()
+
+
+def current_version(out: Path = COMPILED_DIR) -> Optional[str]:
+    try:
+        return (Path(out) / "CURRENT").read_text().strip() or None
+    except OSError:
+        return None
+
+
+def get_compiled(out: Path = COMPILED_DIR) -> Optional[CompiledCorpus]:
+    """The live compiled corpus (re-opened when CURRENT changes), or None if none was compiled."""
+    global _CURRENT
+    version = current_version(out)
+    if version is None:
+        return None
+    with _LOCK:
+        if _CURRENT is None or _CURRENT.root != Path(out) / version:
+            try:
+                _CURRENT = open_compiled(Path(out) / version)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[WARN] Could not open compiled corpus {version}: {e}")
+                return None
+        return _CURRENT
+
+
+def compiled_store(spec) -> Optional[CorpusStore]:
+    """Store for `spec` served from the compiled corpus, if it holds that source and it is fresh."""
+    corpus = get_compiled()
+    src = corpus.source_meta(spec) if corpus is not None else None
+    if src is None:
+        return None
+    if not corpus.is_fresh(src):
+        if (corpus.root, src["name"]) not in _STALE_WARNED:
+            _STALE_WARNED.add((corpus.root, src["name"]))
+            print(f"[WARN] Compiled corpus is stale for '{src['name']}', loading JSONL (re-run python -m corpus.compiled)")
+        return None
+    return corpus.store(src)
+
+
+# -------- Writing --------
+def compile_corpus(source_files: Optional[Dict[str, Any]] = None, out: Path = COMPILED_DIR,
+                   dtype: str = "float32") -> Path:
+    """Compile `source_files` (default SOURCE_FILES) into a new version under `out`; returns its directory."""
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown embedding dtype: {dtype} (expected one of {DTYPES})")
+    files = source_files or SOURCE_FILES
+    stores = {name: load_store(spec, "float32") for name, spec in files.items()}
+    dims = {s.matrix.shape[1] for s in stores.values() if len(s)}
+    if len(dims) > 1:
+        raise ValueError(f"Sources have mismatched embedding dims: {sorted(dims)}")
+
+    key = f"format{FORMAT_VERSION}|" + "|".join(f"{name}:{files[name]}:{s.digest}" for name, s in stores.items())
+    version = f"{hashlib.sha256(key.encode()).hexdigest()[:16]}-{dtype}"
+    out = Path(out)
+    root = out / version
+    if not (root / "meta.json").exists():
+        tmp = out / f".{version}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        _write_version(tmp, files, stores, dtype)
+        shutil.rmtree(root, ignore_errors=True)
+        os.replace(tmp, root)
+
+    pointer = out / "CURRENT.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, out / "CURRENT")
+    _prune_versions(out, keep=version)
+    return root
+
+
+def _write_version(root: Path, files: Dict[str, Any], stores: Dict[str, CorpusStore], dtype: str) -> None:
+    cols: Dict[str, List[str]] = {name: [] for name in STRING_COLUMNS}
+    sources, lo = [], 0
+    for name, store in stores.items():
+        for row in range(len(store)):
+            chunk = store.payload(row)
+            url, title = chunk_url_title(name, chunk)
+            meta = chunk.get("metadata") or {}
+            cols["id"].append(str(chunk.pop("id", "") or ""))
+            cols["chunk_text"].append(chunk.pop("chunk_text", "") or "")
+            cols["record"].append(json.dumps(chunk, ensure_ascii=False))
+            cols["url"].append(url or "")
+            cols["title"].append(title or "")
+            for f in METADATA_FIELDS:
+                cols[f"metadata.{f}"].append("" if meta.get(f) is None else str(meta[f]))
+        sources.append({
+            "name": name,
+            "spec": str(files[name]),
+            "rows": [lo, lo + len(store)],
+            "digest": store.digest,
+            "shards": shard_stats(store),
+        })
+        lo += len(store)
+
+    filled = [s.matrix for s in stores.values() if len(s)]
+    vectors = np.concatenate(filled) if filled else np.zeros((0, 0), dtype=np.float32)
+    np.save(root / "vectors.npy", vectors)
+    if dtype != "float32":
+        codes, scales = quantize(vectors, dtype)
+        np.save(root / "codes.npy", codes)
+        if scales is not None:
+            np.save(root / "scales.npy", scales)
+    np.save(root / "uids.npy", np.concatenate([s.uids for s in stores.values()]).astype(np.int64))
+    np.save(root / "source.npy", np.concatenate(
+        [np.full(len(s), i, dtype=np.int16) for i, s in enumerate(stores.values())]))
+    np.save(root / "shard.npy", np.concatenate([s.shard_col for s in stores.values()]).astype(np.int32))
+    for name, values in cols.items():
+        _write_strings(root, name, values)
+    (root / "meta.json").write_text(json.dumps({
+        "format": FORMAT_VERSION,
+        "dtype": dtype,
+        "rows": lo,
+        "dim": int(vectors.shape[1]) if vectors.size else 0,
+        "sources": sources,
+        "compiled_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }, indent=2))
+
+
+def _prune_versions(out: Path, keep: str) -> None:
+    """Drop all but the newest KEEP_VERSIONS version directories (never `keep`)."""
+    versions = sorted((p for p in out.iterdir() if p.is_dir() and not p.name.startswith(".")),
+                      key=lambda p: p.stat().st_mtime, reverse=True)
+    for p in [v for v in versions if v.name != keep][KEEP_VERSIONS - 1:]:
+        shutil.rmtree(p, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile JSONL corpora into the shared mmap format.")
+    parser.add_argument("--out", type=Path, default=COMPILED_DIR)
+    parser.add_argument("--dtype", choices=DTYPES, default="float32",
+                        help="also store quantized codes for CORPUS_EMBED_DTYPE=float16|int8")
+    args = parser.parse_args(argv)
+    start = time.time()
+    root = compile_corpus(out=args.out, dtype=args.dtype)
+    meta = json.loads((root / "meta.json").read_text())
+    size = sum(p.stat().st_size for p in root.iterdir())
+    print(f"{root}: {meta['rows']} rows x {meta['dim']} dims, {size / 1e6:.1f} MB in {time.time() - start:.2f}s")
+    for src in meta["sources"]:
+        print(f"  {src['name']}: rows {src['rows'][0]}-{src['rows'][1]} from {len(src['shards'])} shard(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# corpus/embedder.py
+"""
+Batched document embedding against the Voyage API.
+
+The query path keeps using `run_chunking` (one short text per call); corpus
+ingestion goes through `embed_texts` so that many chunks share one request.
+"""
+import os
+import time
+from typing import List
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VOYAGE_API_KEY = os.getenv("VOYAGE_API_KEY")
+VOYAGE_EMBED_URL = "https://api.voyageai.com/v1/embeddings"
+EMBED_MODEL = "voyage-3.5"
+EMBED_PROVIDER = "voyage"
+
+
+class EmbeddingError(Exception):
+    """Raised when the embedding provider keeps failing for a batch."""
+    pass
+
+
+def embed_texts(
+    texts: List[str],
+    model: str = EMBED_MODEL,
+    input_type: str = "document",
+    batch_size: int = 64,
+    max_retries: int = 3,
+    timeout: float = 60.0,
+) -> List[List[float]]:
+    """Embed `texts` in batches of `batch_size`, preserving order."""
+    if not texts:
+        return []
+    if not VOYAGE_API_KEY:
+        raise EmbeddingError("VOYAGE_API_KEY not set in environment or .env file.")
+
+    session = requests.Session()
+    session.headers.update({"Authorization": f"Bearer {VOYAGE_API_KEY}"})
+    out: List[List[float]] = []
+    try:
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            retries = 0
+            while True:
+                resp = session.post(
+                    VOYAGE_EMBED_URL,
+                    json={"input": batch, "model": model, "input_type": input_type},
+                    timeout=timeout,
+                )
+                if resp.status_code == 429 or 500 <= resp.status_code < 600:
+                    if retries >= max_retries:
+                        raise EmbeddingError(f"Max retries reached: {resp.status_code}")
+                    wait = min(2 ** retries, 8)
+                    print(f"[WARN] Retrying embeddings in {wait}s after {resp.status_code}...")
+                    time.sleep(wait)
+                    retries += 1
+                    continue
+                if not resp.ok:
+                    raise EmbeddingError(f"Request failed: {resp.status_code} {resp.text[:200]}")
+                break
+            data = sorted(resp.json().get("data", []), key=lambda d: d.get("index", 0))
+            out.extend(d["embedding"] for d in data)
+    finally:
+        session.close()
+    return out
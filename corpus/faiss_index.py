@@ -0,0 +1,229 @@
+# corpus/faiss_index.py
+"""
+Persisted FAISS indexes over the resident corpus stores.
+
+An index is built from a store's normalized matrix (inner product == cosine)
+and saved next to the source shards as `<base>.<type>.faiss` (see
+store.source_base), with a small JSON sidecar recording the combined source
+digest it was built from. Loading reuses the
+saved index as long as the digest still matches; otherwise it is rebuilt.
+
+Rows are added under stable 63-bit ids derived from the chunk id, so the
+index survives row reordering and can be patched in place.
+"""
+import argparse
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from .cache import DigestCache
+from .quantize import dequantize
+from .search import as_query_batch
+from .store import CorpusStore, get_store, source_base
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+DEFAULT_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "8"))
+
+
+def index_paths(source_path, index_type: str) -> Tuple[Path, Path]:
+    base = source_base(source_path)
+    return base.with_name(f"{base.name}.{index_type}.faiss"), base.with_name(f"{base.name}.{index_type}.json")
+
+
+def build_index(matrix: np.ndarray, ids: np.ndarray, index_type: str = DEFAULT_INDEX_TYPE) -> faiss.Index:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type} (expected one of {INDEX_TYPES})")
+    n, d = matrix.shape
+    if index_type == "flat":
+        base = faiss.IndexFlatIP(d)
+    elif index_type == "ivf":
+        nlist = max(1, min(4096, int(4 * math.sqrt(n)), n // 39))
+        base = faiss.IndexIVFFlat(faiss.IndexFlatIP(d), d, nlist, faiss.METRIC_INNER_PRODUCT)
+        base.train(matrix)
+        base.nprobe = min(IVF_NPROBE, nlist)
+    else:
+        base = faiss.IndexHNSWFlat(d, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        base.hnsw.efSearch = HNSW_EF_SEARCH
+    index = faiss.IndexIDMap2(base)
+    if n:
+        index.add_with_ids(matrix, ids)
+    return index
+
+
+@dataclass
+class FaissIndex:
+    index: faiss.Index
+    index_type: str
+    digest: str
+    uids: np.ndarray        # sorted chunk uids
+    rows: np.ndarray        # store row for each entry in `uids`
+
+    def search_rows(self, queries, top_k: int = 5,
+                    rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Same contract as CorpusStore.search_rows; missing hits are -1 with score -inf.
+        With `rows` (pre-filtered store rows) the index only visits those ids.
+        """
+        q = as_query_batch(queries)
+        if self.index.ntotal == 0 or (rows is not None and not len(rows)):
+            return np.full((q.shape[0], 0), -1, dtype=np.int64), np.zeros((q.shape[0], 0), dtype=np.float32)
+        if rows is None:
+            scores, ids = self.index.search(q, min(top_k, self.index.ntotal))
+        else:
+            scores, ids = self.index.search(q, min(top_k, len(rows)), params=self._selector(rows))
+        pos = np.searchsorted(self.uids, ids).clip(0, len(self.uids) - 1)
+        found = (ids >= 0) & (self.uids[pos] == ids)
+        rows = np.where(found, self.rows[pos], -1)
+        return rows, np.where(found, scores, -np.inf).astype(np.float32)
+
+    def _selector(self, rows: np.ndarray) -> faiss.SearchParameters:
+        uid_of_row = np.empty(len(self.uids), dtype=np.int64)
+        uid_of_row[self.rows] = self.uids
+        sel = faiss.IDSelectorBatch(uid_of_row[rows])
+        if self.index_type == "ivf":
+            return faiss.SearchParametersIVF(sel=sel, nprobe=faiss.extract_index_ivf(self.index).nprobe)
+        if self.index_type == "hnsw":
+            return faiss.SearchParametersHNSW(sel=sel, efSearch=faiss.downcast_index(self.index.index).hnsw.efSearch)
+        return faiss.SearchParameters(sel=sel)
+
+
+def _uid_lookup(uids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(uids, kind="stable")
+    return uids[order], order.astype(np.int64)
+
+
+def wrap_index(index: faiss.Index, store: CorpusStore, index_type: str) -> FaissIndex:
+    return FaissIndex(index, index_type, store.digest, *_uid_lookup(store.uids))
+
+
+def save_index(index: faiss.Index, source_path, index_type: str, digest: str) -> None:
+    idx_path, meta_path = index_paths(source_path, index_type)
+    tmp = idx_path.with_suffix(".faiss.tmp")
+    faiss.write_index(index, str(tmp))
+    os.replace(tmp, idx_path)
+    meta_path.write_text(json.dumps({
+        "index_type": index_type,
+        "source_digest": digest,
+        "ntotal": int(index.ntotal),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }, indent=2))
+
+
+def _read_saved(source_path, index_type: str, digest: str) -> Optional[faiss.Index]:
+    idx_path, meta_path = index_paths(source_path, index_type)
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+    if meta.get("source_digest") != digest or not idx_path.exists():
+        return None
+    return read_index(idx_path, index_type)
+
+
+def read_index(path: Path, index_type: str) -> faiss.Index:
+    """Read an index file, applying the configured search-time parameters."""
+    index = faiss.read_index(str(path))
+    if index_type == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efSearch = HNSW_EF_SEARCH
+    elif index_type == "ivf":
+        faiss.extract_index_ivf(index).nprobe = IVF_NPROBE
+    return index
+
+
+def load_or_build(store: CorpusStore, index_type: str = DEFAULT_INDEX_TYPE, persist: bool = True) -> FaissIndex:
+    uids = store.uids
+    index = _read_saved(store.path, index_type, store.digest) if store.digest else None
+    if index is None:
+        if len(store):
+            matrix = dequantize(store.matrix, store.scales) if store.quantized else store.matrix
+            index = build_index(matrix, uids, index_type)
+        else:
+            index = build_index(np.zeros((0, 1), dtype=np.float32), uids, "flat")
+        if persist and store.digest:
+            save_index(index, store.path, index_type, store.digest)
+    return wrap_index(index, store, index_type)
+
+
+def patch_saved_indexes(
+    source_path,
+    old_digest: str,
+    new_digest: str,
+    removed_uids: np.ndarray,
+    added: np.ndarray,
+    added_uids: np.ndarray,
+) -> Dict[str, str]:
+    """
+    Apply a row delta to every persisted index that was built from `old_digest`.
+
+    Index types that cannot delete (HNSW) are dropped instead and get rebuilt on
+    next use. Returns {index_type: "patched" | "dropped"}.
+    """
+    status = {}
+    for index_type in INDEX_TYPES:
+        idx_path, meta_path = index_paths(source_path, index_type)
+        index = _read_saved(source_path, index_type, old_digest)
+        if index is None:
+            continue
+        try:
+            if len(removed_uids):
+                index.remove_ids(np.asarray(removed_uids, dtype=np.int64))
+            if len(added_uids):
+                index.add_with_ids(np.asarray(added, dtype=np.float32), np.asarray(added_uids, dtype=np.int64))
+        except RuntimeError:
+            idx_path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+            status[index_type] = "dropped"
+            continue
+        save_index(index, source_path, index_type, new_digest)
+        status[index_type] = "patched"
+    return status
+
+
+# -------- Process-wide registry --------
+_INDEXES: DigestCache[FaissIndex] = DigestCache()
+
+
+def faiss_for_store(store: CorpusStore, index_type: str = DEFAULT_INDEX_TYPE) -> FaissIndex:
+    key = (str(store.base.resolve()), index_type)
+    return _INDEXES.get(key, store.digest, lambda: load_or_build(store, index_type))
+
+
+def get_faiss_index(source_path, index_type: str = DEFAULT_INDEX_TYPE) -> Tuple[CorpusStore, FaissIndex]:
+    """Resident store plus a FAISS index in sync with it (loaded from disk or rebuilt)."""
+    store = get_store(source_path)
+    return store, faiss_for_store(store, index_type)
+
+
+def warm(store: CorpusStore) -> None:
+    """Load/build every index type in use for a new version of a source ahead of its first query."""
+    base = str(store.base.resolve())
+    for key in _INDEXES.keys():
+        if key[0] == base:
+            faiss_for_store(store, key[1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and persist FAISS indexes for corpus files.")
+    parser.add_argument("sources", nargs="+", help="JSONL corpus files, shard directories or globs")
+    parser.add_argument("--type", dest="index_type", choices=INDEX_TYPES, default=DEFAULT_INDEX_TYPE)
+    args = parser.parse_args(argv)
+    for src in args.sources:
+        start = time.time()
+        store = get_store(src)
+        idx = load_or_build(store, args.index_type)
+        print(f"{src}: {args.index_type} index with {idx.index.ntotal} rows in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# corpus/filters.py
+"""
+Metadata pre-filters (and document grouping) for corpus search.
+
+Filters are evaluated on column indexes built once per store digest, before
+any vector is scored; search then gathers and scores only the matching rows.
+
+    source           "docs" | ["docs", "community"]   metadata.source
+    path_prefix      "./docs/embed" | [...]           sorted path column, bisected
+    topic_id         376 | [376, 372]                 int column
+    ingested_after   "2025-06-01" (inclusive)         epoch column; rows without
+    ingested_before  "2025-09-01" (exclusive)         metadata.ingested_at use their shard's mtime
+
+All given filters must match (AND); list values match any of their items.
+The same index carries each row's document group (doc path, else community
+topic) used for distinct-document top-k.
+"""
+import bisect
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .cache import DigestCache
+from .store import CorpusStore
+
+FILTER_KEYS = ("source", "path_prefix", "topic_id", "ingested_after", "ingested_before")
+
+
+def _as_list(value) -> List[Any]:
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _epoch(value) -> float:
+    """Epoch seconds of an ISO date/datetime string (UTC if naive) or a number."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid date filter value: {value!r}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def active_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Drop empty values and reject unknown keys."""
+    active = {k: v for k, v in (filters or {}).items() if v not in (None, "", [], {})}
+    unknown = set(active) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter(s): {sorted(unknown)} (expected any of {FILTER_KEYS})")
+    return active
+
+
+@dataclass
+class MetadataIndex:
+    digest: str
+    sources: np.ndarray         # (n,) str, metadata.source
+    path_order: np.ndarray      # (n,) rows sorted by path
+    paths: List[str]            # paths in `path_order` order
+    topic_ids: np.ndarray       # (n,) int64, -1 when absent
+    ingested: np.ndarray        # (n,) float64 epoch seconds
+    groups: np.ndarray          # (n,) int64 document id: same doc path / community topic
+
+    def __len__(self) -> int:
+        return len(self.topic_ids)
+
+    def prefix_rows(self, prefix: str) -> np.ndarray:
+        lo = bisect.bisect_left(self.paths, prefix)
+        hi = bisect.bisect_left(self.paths, prefix + "\U0010ffff")
+        return self.path_order[lo:hi]
+
+    def mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """(n,) bool mask of rows matching every filter in `filters` (already validated)."""
+        mask = np.ones(len(self), dtype=bool)
+        if "source" in filters:
+            mask &= np.isin(self.sources, [str(s) for s in _as_list(filters["source"])])
+        if "path_prefix" in filters:
+            hit = np.zeros(len(self), dtype=bool)
+            for prefix in _as_list(filters["path_prefix"]):
+                hit[self.prefix_rows(str(prefix))] = True
+            mask &= hit
+        if "topic_id" in filters:
+            mask &= np.isin(self.topic_ids, [int(t) for t in _as_list(filters["topic_id"])])
+        if "ingested_after" in filters:
+            mask &= self.ingested >= _epoch(filters["ingested_after"])
+        if "ingested_before" in filters:
+            mask &= self.ingested < _epoch(filters["ingested_before"])
+        return mask
+
+
+def build_metadata_index(store: CorpusStore) -> MetadataIndex:
+    n = len(store)
+    sources, paths = [], []
+    topic_ids = np.full(n, -1, dtype=np.int64)
+    ingested = np.zeros(n, dtype=np.float64)
+    if store.shards and n:
+        ingested[:] = np.array([sh.mtime_ns for sh in store.shards], dtype=np.float64)[store.shard_col] / 1e9
+    for row in range(n):
+        meta = store.metadata_fields(row)
+        sources.append(meta["source"])
+        paths.append(meta["path"])
+        if meta["topic_id"]:
+            try:
+                topic_ids[row] = int(meta["topic_id"])
+            except ValueError:
+                pass
+        if meta["ingested_at"]:
+            try:
+                ingested[row] = _epoch(meta["ingested_at"])
+            except ValueError:
+                try:
+                    ingested[row] = float(meta["ingested_at"])  # stored as epoch seconds
+                except ValueError:
+                    pass
+    order = np.argsort(np.array(paths, dtype=object), kind="stable") if n else np.zeros(0, dtype=np.int64)
+    keys = [p or (f"topic:{t}" if t >= 0 else f"row:{row}") for row, (p, t) in enumerate(zip(paths, topic_ids))]
+    groups = np.unique(np.array(keys, dtype=object), return_inverse=True)[1] if n else np.zeros(0)
+    return MetadataIndex(
+        store.digest,
+        np.array(sources, dtype=object),
+        order.astype(np.int64),
+        [paths[i] for i in order],
+        topic_ids,
+        ingested,
+        groups.astype(np.int64),
+    )
+
+
+# -------- Process-wide registry --------
+_INDEXES: DigestCache[MetadataIndex] = DigestCache()
+
+
+def get_metadata_index(store: CorpusStore) -> MetadataIndex:
+    """Column indexes of `store`, rebuilt when its content changes."""
+    return _INDEXES.get(str(store.path), store.digest, lambda: build_metadata_index(store))
+
+
+def warm(store: CorpusStore) -> None:
+    """Build the indexes for a new version of a source ahead of its first query, if the source is in use."""
+    if str(store.path) in _INDEXES.keys():
+        get_metadata_index(store)
+
+
+def filter_rows(store: CorpusStore, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """Sorted store rows matching `filters`, or None when no filter is set (search everything)."""
+    active = active_filters(filters)
+    if not active:
+        return None
+    return np.flatnonzero(get_metadata_index(store).mask(active))
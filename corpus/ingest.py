@@ -0,0 +1,298 @@
+# corpus/ingest.py
+"""
+Incremental corpus ingestion.
+
+Current documents are hashed (sha256 of their raw content) and diffed against
+the manifests in metadata/ollama-paragraph/. Only new or changed documents are
+re-chunked and re-embedded (in batched provider calls); their rows are
+dropped from whichever corpus shard holds them and the new rows appended to
+the last shard (a new one is started once it reaches SHARD_MAX_BYTES). Rows
+of removed documents are dropped when `--prune` is given, and persisted FAISS
+indexes are patched with the delta.
+
+Usage:
+    python -m corpus.ingest docs --root ../omni-docs/docs
+    python -m corpus.ingest discourse --root exports/discourse --prune
+
+Slack messages go through the same pipeline from `python -m corpus.slack_sync`.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .embedder import EMBED_MODEL, EMBED_PROVIDER, embed_texts
+from .faiss_index import patch_saved_indexes
+from .search import normalize_rows
+from .sources import SOURCE_FILES
+from .store import chunk_uid, discover_shards, source_base, source_digest
+
+MANIFEST_DIR = Path("metadata/ollama-paragraph")
+
+# appended rows go to a new shard once the last one reaches this size
+SHARD_MAX_BYTES = int(os.getenv("CORPUS_SHARD_MAX_BYTES", str(256 << 20)))
+
+SOURCES = {
+    "docs": {
+        "corpus": SOURCE_FILES["docs"],
+        "manifest": MANIFEST_DIR / "docs.json",
+    },
+    "discourse": {
+        "corpus": SOURCE_FILES["community"],
+        "manifest": MANIFEST_DIR / "discourse.json",
+    },
+    # pulled from the Slack API by corpus/slack_sync.py rather than read from a --root
+    "slack": {
+        "corpus": SOURCE_FILES["slack"],
+        "manifest": MANIFEST_DIR / "slack.json",
+    },
+}
+
+
+@dataclass
+class Document:
+    key: str                  # manifest key: "./docs/<path>.md", "discourse:<id>" or "slack:<channel>:<ts>"
+    text: str
+    digest: str
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# -------- Document discovery --------
+def iter_docs(root: Path) -> Iterator[Document]:
+    """Markdown files under a docs checkout; keys match the manifest ("./docs/...")."""
+    root = Path(root)
+    for path in sorted(root.rglob("*.md")):
+        raw = path.read_bytes()
+        key = "./" + (Path(root.name) / path.relative_to(root)).as_posix()
+        yield Document(key, raw.decode("utf-8", errors="replace"), _sha256(raw), {"source": "docs", "path": key})
+
+
+def iter_discourse(root: Path) -> Iterator[Document]:
+    """Discourse topic exports (`/t/<id>.json` payloads saved as <id>.json)."""
+    for path in sorted(Path(root).glob("*.json")):
+        try:
+            topic = json.loads(path.read_text())
+        except json.JSONDecodeError:
+            continue
+        posts = (topic.get("post_stream") or {}).get("posts") or []
+        text = "\n\n".join(p.get("cooked", "") for p in posts if p.get("cooked"))
+        if not text:
+            continue
+        topic_id = topic.get("id")
+        yield Document(
+            f"discourse:{topic_id}",
+            text,
+            _sha256(text.encode("utf-8")),
+            {"source": "community", "slug": topic.get("slug"), "topic_id": topic_id},
+        )
+
+
+DISCOVERERS = {"docs": iter_docs, "discourse": iter_discourse}
+
+
+def row_doc_key(source: str, row: Dict[str, Any]) -> Optional[str]:
+    meta = row.get("metadata") or {}
+    if source == "docs":
+        return meta.get("path")
+    if source == "slack":
+        return f"slack:{meta['channel']}:{meta['ts']}" if meta.get("ts") else None
+    if meta.get("topic_id") is not None:
+        return f"discourse:{meta['topic_id']}"
+    return None
+
+
+# -------- Chunking --------
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+
+def chunk_paragraphs(text: str, max_tokens: int = 300) -> List[Tuple[int, int, str]]:
+    """Pack consecutive paragraphs into chunks of at most ~max_tokens words; returns (start, end, text)."""
+    chunks, start, end, tokens = [], None, 0, 0
+    pos = 0
+    for m in list(_PARAGRAPH_RE.finditer(text)) + [None]:
+        p_end = m.start() if m else len(text)
+        para = text[pos:p_end]
+        n = len(para.split())
+        if n:
+            if start is not None and tokens + n > max_tokens:
+                chunks.append((start, end, text[start:end].strip()))
+                start, tokens = None, 0
+            if start is None:
+                start = pos
+            end, tokens = p_end, tokens + n
+        pos = m.end() if m else len(text)
+    if start is not None:
+        chunks.append((start, end, text[start:end].strip()))
+    return chunks
+
+
+def _chunk_id_prefix(source: str, doc: Document) -> str:
+    if source == "discourse":
+        return f"discourse-{doc.metadata.get('topic_id')}"
+    return doc.key
+
+
+def build_rows(source: str, docs: List[Document], batch_size: int = 64) -> List[Dict[str, Any]]:
+    rows = []
+    ingested_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    for doc in docs:
+        prefix = _chunk_id_prefix(source, doc)
+        for i, (start, end, text) in enumerate(chunk_paragraphs(doc.text)):
+            rows.append({
+                "chunk_id": i,
+                "source_id": "raw_text",
+                "chunking_method": "paragraph",
+                "header": None,
+                "start_char": start,
+                "end_char": end,
+                "token_count": len(text.split()),
+                "chunk_text": text,
+                "model": EMBED_MODEL,
+                "id": f"{prefix}:chunk-{i}",
+                "metadata": {
+                    **doc.metadata,
+                    "chunk_index": i,
+                    "provider": EMBED_PROVIDER,
+                    "model": EMBED_MODEL,
+                    "chunk_method": "paragraph",
+                    "ingested_at": ingested_at,
+                },
+            })
+    vectors = embed_texts([r["chunk_text"] for r in rows], batch_size=batch_size)
+    for row, vec in zip(rows, vectors):
+        row["embedding"] = vec
+    return rows
+
+
+# -------- Diff + apply --------
+def diff_manifest(manifest: Dict[str, str], docs: List[Document]) -> Tuple[List[Document], Set[str]]:
+    """Return (new-or-changed docs, manifest keys no longer present)."""
+    current = {d.key for d in docs}
+    changed = [d for d in docs if manifest.get(d.key) != d.digest]
+    missing = set(manifest) - current
+    return changed, missing
+
+
+def _rewrite_shard(shard: Path, source: str, drop_keys: Set[str], new_rows: List[Dict[str, Any]]) -> List[str]:
+    """Copy untouched lines verbatim, drop rows of `drop_keys`, append `new_rows`. Atomic replace."""
+    removed_ids: List[str] = []
+    shard.parent.mkdir(parents=True, exist_ok=True)
+    tmp = shard.with_suffix(shard.suffix + ".tmp")
+    with open(tmp, "w") as out:
+        if shard.exists():
+            with open(shard) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if row_doc_key(source, row) in drop_keys:
+                        removed_ids.append(row.get("id"))
+                        continue
+                    out.write(line if line.endswith("\n") else line + "\n")
+        for row in new_rows:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+    if removed_ids or new_rows:
+        os.replace(tmp, shard)
+    else:
+        tmp.unlink()
+    return removed_ids
+
+
+def _append_target(corpus) -> Path:
+    """Last shard of the source, or the next numbered one if it is full (or none exist)."""
+    shards = discover_shards(corpus)
+    if shards and shards[-1].stat().st_size < SHARD_MAX_BYTES:
+        return shards[-1]
+    base = source_base(corpus)
+    return base.with_name(f"{base.name}-{len(shards):03d}.jsonl")
+
+
+def _rewrite_corpus(corpus, source: str, drop_keys: Set[str], new_rows: List[Dict[str, Any]]) -> List[str]:
+    """Drop rows of `drop_keys` from every shard and append `new_rows` to the last one."""
+    removed_ids: List[str] = []
+    target = _append_target(corpus)
+    for shard in discover_shards(corpus):
+        if shard != target:
+            removed_ids += _rewrite_shard(shard, source, drop_keys, [])
+    removed_ids += _rewrite_shard(target, source, drop_keys, new_rows)
+    return removed_ids
+
+
+def ingest(source: str, root: Path, prune: bool = False, dry_run: bool = False, batch_size: int = 64) -> Dict[str, Any]:
+    return ingest_documents(source, list(DISCOVERERS[source](root)), prune=prune, dry_run=dry_run,
+                            batch_size=batch_size)
+
+
+def ingest_documents(source: str, docs: List[Document], prune: bool = False, dry_run: bool = False,
+                     batch_size: int = 64) -> Dict[str, Any]:
+    """Diff `docs` against the source's manifest and re-embed / drop rows accordingly."""
+    cfg = SOURCES[source]
+    corpus, manifest_path = cfg["corpus"], cfg["manifest"]
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    changed, missing = diff_manifest(manifest, docs)
+    removed_keys = missing if prune else set()
+    summary = {
+        "source": source,
+        "documents": len(docs),
+        "changed": sorted(d.key for d in changed),
+        "removed": sorted(removed_keys),
+        "unchanged": len(docs) - len(changed),
+    }
+    if dry_run or not (changed or removed_keys):
+        return summary
+
+    new_rows = build_rows(source, changed, batch_size=batch_size)
+    old_digest = source_digest(corpus)
+    removed_ids = _rewrite_corpus(corpus, source, {d.key for d in changed} | removed_keys, new_rows)
+
+    if old_digest:
+        summary["indexes"] = patch_saved_indexes(
+            corpus,
+            old_digest,
+            source_digest(corpus),
+            removed_uids=np.array([chunk_uid(i) for i in removed_ids if i], dtype=np.int64),
+            added=normalize_rows([r["embedding"] for r in new_rows]) if new_rows else np.zeros((0, 0), np.float32),
+            added_uids=np.array([chunk_uid(r["id"]) for r in new_rows], dtype=np.int64),
+        )
+
+    for d in changed:
+        manifest[d.key] = d.digest
+    for key in removed_keys:
+        manifest.pop(key, None)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+
+    summary["rows_added"] = len(new_rows)
+    summary["rows_removed"] = len(removed_ids)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-embed only new/changed documents of a corpus source.")
+    parser.add_argument("source", choices=sorted(DISCOVERERS))
+    parser.add_argument("--root", required=True, type=Path, help="docs checkout dir or Discourse export dir")
+    parser.add_argument("--prune", action="store_true", help="drop rows of documents missing from --root")
+    parser.add_argument("--dry-run", action="store_true", help="only report the diff")
+    parser.add_argument("--batch-size", type=int, default=64, help="texts per embedding request")
+    args = parser.parse_args(argv)
+    summary = ingest(args.source, args.root, prune=args.prune, dry_run=args.dry_run, batch_size=args.batch_size)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# corpus/quantize.py
+"""
+Scalar quantization of normalized embedding matrices.
+
+    float32  4 bytes/dim   exact
+    float16  2 bytes/dim   ~1e-3 relative error
+    int8     1 byte/dim    per-row symmetric scale (max |x| -> 127)
+
+Quantized matrices are only used for first-stage candidate scoring; the
+final ranking is recomputed on exact float32 rows (see CorpusStore.exact_rows).
+"""
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+DEFAULT_DTYPE = os.getenv("CORPUS_EMBED_DTYPE", "float32").lower()
+
+# first-stage candidates kept for float32 rescoring: max(k * factor, minimum)
+RESCORE_FACTOR = 20
+RESCORE_MIN = 100
+
+# rows upcast per block when scoring a quantized matrix (bounds the temporary)
+SCORE_BLOCK_ROWS = 4096
+
+
+def quantize(matrix: np.ndarray, dtype: str = DEFAULT_DTYPE) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Return (data, scales); scales is None except for int8."""
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown embedding dtype: {dtype} (expected one of {DTYPES})")
+    if dtype == "float32":
+        return matrix, None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    scales = np.abs(matrix).max(axis=1) / 127.0 if matrix.size else np.zeros(len(matrix), np.float32)
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    codes = np.rint(matrix / scales[:, None]).clip(-127, 127).astype(np.int8)
+    return codes, scales
+
+
+def dequantize(data: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    out = data.astype(np.float32)
+    if scales is not None:
+        out *= scales[:, None]
+    return out
+
+
+def is_quantized(data: np.ndarray) -> bool:
+    return data.dtype != np.float32
+
+
+def score_quantized(data: np.ndarray, scales: Optional[np.ndarray], q: np.ndarray) -> np.ndarray:
+    """(q, n) scores of a normalized float32 query batch against a quantized matrix, upcast blockwise."""
+    n = data.shape[0]
+    out = np.empty((q.shape[0], n), dtype=np.float32)
+    for lo in range(0, n, SCORE_BLOCK_ROWS):
+        hi = min(n, lo + SCORE_BLOCK_ROWS)
+        out[:, lo:hi] = q @ data[lo:hi].astype(np.float32).T
+    if scales is not None:
+        out *= scales[None, :]
+    return out
+
+
+def rescore_depth(top_k: int) -> int:
+    return max(top_k * RESCORE_FACTOR, RESCORE_MIN)
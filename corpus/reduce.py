@@ -0,0 +1,177 @@
+# corpus/reduce.py
+"""
+Reduced-dimension first-stage scoring.
+
+With CORPUS_PREFILTER_DIMS set (e.g. 128 or 256) the unified index keeps a
+low-dimensional copy of every embedding and scores queries against it
+first; only the best few hundred candidates per source are rescored on the
+full 1024-dim vectors.
+
+    pca     projection on the top principal components (sklearn PCA fitted on
+            a sample of the corpus); ranking-equivalent up to the dropped variance
+    prefix  Matryoshka-style truncation to the first dims, renormalized
+            (voyage-3.5 embeddings are trained to support this)
+
+`python -m corpus.reduce` reports recall@k of the two-stage search against
+exact search for a set of dims and methods.
+"""
+import argparse
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .quantize import SCORE_BLOCK_ROWS, dequantize, is_quantized, rescore_depth
+from .search import as_query_batch, normalize_rows, top_k_indices
+
+REDUCE_METHODS = ("pca", "prefix")
+PREFILTER_DIMS = int(os.getenv("CORPUS_PREFILTER_DIMS", "0"))
+PREFILTER_METHOD = os.getenv("CORPUS_PREFILTER_METHOD", "pca").lower()
+
+# rows used to fit the PCA basis
+PCA_FIT_SAMPLE = 20000
+
+
+@dataclass
+class Reduction:
+    method: str
+    dims: int
+    mean: Optional[np.ndarray]          # (d,) PCA centering
+    components: Optional[np.ndarray]    # (dims, d) PCA basis
+    matrix: np.ndarray                  # (n, dims) reduced corpus
+
+    def project(self, queries) -> np.ndarray:
+        q = as_query_batch(queries)
+        if self.method == "prefix":
+            return normalize_rows(q[:, :self.dims])
+        # q . x = q . mean + (Pq) . P(x - mean) + dropped variance; the first term is constant per query
+        return q @ self.components.T
+
+    def score(self, queries, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """(q, n) first-stage scores, over all rows or only `rows`."""
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        return self.project(queries) @ matrix.T
+
+
+def _dense_blocks(matrix: np.ndarray, scales: Optional[np.ndarray] = None):
+    """float32 row blocks of a (possibly quantized) matrix, without materializing all of it."""
+    for lo in range(0, matrix.shape[0], SCORE_BLOCK_ROWS):
+        hi = min(matrix.shape[0], lo + SCORE_BLOCK_ROWS)
+        block = matrix[lo:hi]
+        if is_quantized(block):
+            block = dequantize(block, None if scales is None else scales[lo:hi])
+        yield np.asarray(block, dtype=np.float32)
+
+
+def build_reduction(matrix: np.ndarray, dims: int, method: str = PREFILTER_METHOD,
+                    scales: Optional[np.ndarray] = None) -> Optional[Reduction]:
+    """Reduced copy of a normalized corpus matrix; None if it would not be smaller."""
+    if method not in REDUCE_METHODS:
+        raise ValueError(f"Unknown reduction method: {method} (expected one of {REDUCE_METHODS})")
+    n, d = matrix.shape if matrix.ndim == 2 else (0, 0)
+    if not n or dims <= 0 or dims >= d:
+        return None
+
+    if method == "prefix":
+        reduced = np.concatenate([normalize_rows(b[:, :dims]) for b in _dense_blocks(matrix, scales)])
+        return Reduction(method, dims, None, None, reduced)
+
+    from sklearn.decomposition import PCA
+
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(n, size=min(n, PCA_FIT_SAMPLE), replace=False))
+    fit_rows = matrix[sample]
+    if is_quantized(fit_rows):
+        fit_rows = dequantize(fit_rows, None if scales is None else scales[sample])
+    pca = PCA(n_components=min(dims, len(sample)), svd_solver="auto", random_state=0).fit(fit_rows)
+    mean = pca.mean_.astype(np.float32)
+    components = pca.components_.astype(np.float32)
+    reduced = np.concatenate([(b - mean) @ components.T for b in _dense_blocks(matrix, scales)])
+    return Reduction(method, components.shape[0], mean, components, reduced)
+
+
+# -------- Recall report --------
+def two_stage_search(exact: np.ndarray, reduction: Reduction, queries: np.ndarray, top_k: int) -> np.ndarray:
+    """(q, k) rows: reduced-dim candidates, rescored at full dims."""
+    depth = min(rescore_depth(top_k), exact.shape[0])
+    cand = top_k_indices(reduction.score(queries), depth)
+    out = np.empty((queries.shape[0], min(top_k, depth)), dtype=np.int64)
+    for i, rows in enumerate(cand):
+        best = top_k_indices(queries[i] @ exact[rows].T, top_k)[0]
+        out[i] = rows[best]
+    return out
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    if truth.size == 0:
+        return 1.0
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth.tolist(), found.tolist()))
+    return hits / truth.size
+
+
+def recall_report(matrix: np.ndarray, dims: List[int], methods: List[str], n_queries: int = 200,
+                  top_k: int = 10, noise: float = 0.05, seed: int = 0) -> List[Dict[str, float]]:
+    """
+    recall@k of first-stage-only and two-stage search vs exact search.
+
+    Queries are corpus rows perturbed with gaussian noise (so a row is not
+    trivially its own best match).
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(matrix.shape[0], size=min(n_queries, matrix.shape[0]), replace=False)
+    queries = normalize_rows(matrix[picks] + rng.normal(0, noise, (len(picks), matrix.shape[1])))
+
+    start = time.perf_counter()
+    truth = top_k_indices(queries @ matrix.T, top_k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(picks)
+
+    rows = []
+    for method in methods:
+        for d in dims:
+            reduction = build_reduction(matrix, d, method)
+            if reduction is None:
+                continue
+            first = top_k_indices(reduction.score(queries), top_k)
+            start = time.perf_counter()
+            found = two_stage_search(matrix, reduction, queries, top_k)
+            ms = (time.perf_counter() - start) * 1000 / len(picks)
+            rows.append({
+                "method": method,
+                "dims": reduction.dims,
+                "first_stage_recall": recall_at_k(truth, first),
+                "two_stage_recall": recall_at_k(truth, found),
+                "ms_per_query": ms,
+                "exact_ms_per_query": exact_ms,
+            })
+    return rows
+
+
+def main(argv=None):
+    from .sources import SOURCE_FILES
+    from .store import load_store
+
+    parser = argparse.ArgumentParser(description="recall@k of reduced-dim two-stage search vs exact search.")
+    parser.add_argument("sources", nargs="*", help="corpus files/globs (default: all SOURCE_FILES)")
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--method", choices=REDUCE_METHODS, nargs="+", default=list(REDUCE_METHODS))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", "--top-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    stores = [load_store(src, "float32") for src in (args.sources or SOURCE_FILES.values())]
+    filled = [s.matrix for s in stores if len(s)]
+    if not filled:
+        print("No embedded rows found.")
+        return
+    matrix = np.concatenate(filled)
+    print(f"{matrix.shape[0]} rows x {matrix.shape[1]} dims, recall@{args.top_k} over {min(args.queries, len(matrix))} queries")
+    print(f"{'method':<8}{'dims':>6}{'stage-1':>10}{'2-stage':>10}{'ms/q':>9}{'exact ms/q':>12}")
+    for r in recall_report(matrix, args.dims, args.method, args.queries, args.top_k):
+        print(f"{r['method']:<8}{r['dims']:>6}{r['first_stage_recall']:>10.3f}{r['two_stage_recall']:>10.3f}"
+              f"{r['ms_per_query']:>9.3f}{r['exact_ms_per_query']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# corpus/search.py
+"""
+Vectorized top-k cosine search.
+
+Corpus rows are L2-normalized once (at load); a query batch is normalized,
+scored against the whole corpus with a single matmul, and the top-k rows are
+selected with `argpartition` instead of a full sort.
+
+A multi-chunk query is one batch: its per-chunk results are fused either by
+max-sim (best cosine of any query chunk) or reciprocal-rank fusion.
+
+Matrices may be float16/int8 quantized (pass the int8 `scales`); they are
+scored blockwise and callers rescore the candidates with `rescore_fused`.
+
+Ranked candidates can be diversified to k distinct documents (best chunk
+per group) and optionally by maximal marginal relevance.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .quantize import is_quantized, score_quantized
+
+
+def normalize_rows(matrix) -> np.ndarray:
+    """Return a C-contiguous float32 copy of `matrix` with unit-length rows (zero rows stay zero)."""
+    m = np.array(matrix, dtype=np.float32, ndmin=2, order="C")
+    if m.size == 0:
+        return m
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    m /= norms
+    return m
+
+
+def as_query_batch(queries) -> np.ndarray:
+    """Accept one vector or a list/array of vectors and return a normalized (q, d) batch."""
+    return normalize_rows(queries)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores per row, best first. Works on (n,) or (q, n)."""
+    scores = np.atleast_2d(scores)
+    n = scores.shape[1]
+    k = max(0, min(int(k), n))
+    if k == 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.int64)
+    if k < n:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.broadcast_to(np.arange(n), (scores.shape[0], n))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+def score_matrix(matrix: np.ndarray, queries, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """Cosine scores (q, n) of a query batch against a pre-normalized corpus matrix."""
+    q = as_query_batch(queries)
+    if matrix.size == 0:
+        return np.zeros((q.shape[0], matrix.shape[0]), dtype=np.float32)
+    if is_quantized(matrix):
+        return score_quantized(matrix, scales, q)
+    return q @ matrix.T
+
+
+def search_matrix(matrix: np.ndarray, queries, top_k: int = 5,
+                  scales: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k search of a query batch against a pre-normalized (n, d) matrix.
+
+    Returns (indices, scores), both shaped (q, k) and ordered best first.
+    """
+    scores = score_matrix(matrix, queries, scales)
+    idx = top_k_indices(scores, top_k)
+    return idx, np.take_along_axis(scores, idx, axis=1)
+
+
+FUSION_METHODS = ("max", "rrf")
+RRF_K = 60
+
+
+def fuse_ranked(rows: np.ndarray, scores: np.ndarray, top_k: int = 5,
+                method: str = "max", rrf_k: int = RRF_K) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuse per-query ranked lists (q, depth) into one list of `top_k` rows.
+
+    "max" keeps each row's best score, "rrf" sums 1 / (rrf_k + rank).
+    Negative rows (missing hits) are ignored. Returns 1-d (rows, fused scores).
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method: {method} (expected one of {FUSION_METHODS})")
+    rows, scores = np.atleast_2d(rows), np.atleast_2d(scores)
+    valid = rows >= 0
+    flat_rows = rows[valid]
+    if flat_rows.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    if method == "max":
+        contrib = scores[valid].astype(np.float32)
+    else:
+        ranks = np.broadcast_to(np.arange(rows.shape[1]), rows.shape)[valid]
+        contrib = (1.0 / (rrf_k + ranks + 1)).astype(np.float32)
+    uniq, inv = np.unique(flat_rows, return_inverse=True)
+    fused = np.full(len(uniq), -np.inf if method == "max" else 0.0, dtype=np.float32)
+    if method == "max":
+        np.maximum.at(fused, inv, contrib)
+    else:
+        np.add.at(fused, inv, contrib)
+    order = top_k_indices(fused, top_k)[0]
+    return uniq[order], fused[order]
+
+
+def search_matrix_fused(matrix: np.ndarray, queries, top_k: int = 5, method: str = "max",
+                        depth: int = 50, scales: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    One scoring pass for all query vectors, fused into a single top-k list.
+
+    Max-sim is exact over the full (q, n) score matrix; RRF fuses each query
+    vector's top-`depth` ranking.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method: {method} (expected one of {FUSION_METHODS})")
+    scores = score_matrix(matrix, queries, scales)
+    return fuse_scores(scores, top_k=top_k, method=method, depth=depth)
+
+
+def fuse_scores(scores: np.ndarray, top_k: int = 5, method: str = "max",
+                depth: int = 50) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse a (q, n) score matrix into one top-k list of column indices."""
+    if scores.shape[1] == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    if method == "max" or scores.shape[0] == 1:
+        best = scores.max(axis=0)
+        idx = top_k_indices(best, top_k)[0]
+        return idx, best[idx]
+    idx = top_k_indices(scores, max(depth, top_k))
+    return fuse_ranked(idx, np.take_along_axis(scores, idx, axis=1), top_k=top_k, method=method)
+
+
+def rescore_fused(exact: np.ndarray, rows: np.ndarray, queries, top_k: int = 5,
+                  method: str = "max") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Re-rank first-stage candidates on their exact float32 vectors.
+
+    `exact` holds the normalized vectors of `rows` (same order). Returns the
+    fused top-k as (rows, scores).
+    """
+    rows = np.asarray(rows)
+    if rows.size == 0:
+        return rows.astype(np.int64), np.zeros(0, dtype=np.float32)
+    idx, fused = fuse_scores(as_query_batch(queries) @ exact.T, top_k=top_k, method=method, depth=len(rows))
+    return rows[idx], fused
+
+
+# -------- Diversification --------
+DIVERSITY_MODES = ("none", "group", "mmr")
+MMR_LAMBDA = 0.7
+
+# candidates ranked before diversifying: max(k * factor, minimum), grown until k groups are found
+DIVERSITY_POOL_FACTOR = 8
+DIVERSITY_POOL_MIN = 50
+
+
+def diversity_pool(top_k: int) -> int:
+    return max(top_k * DIVERSITY_POOL_FACTOR, DIVERSITY_POOL_MIN)
+
+
+def group_best(groups: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the first (best) entry of each group in a best-first list; at most k, in rank order."""
+    groups = np.asarray(groups)
+    if groups.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    _, first = np.unique(groups, return_index=True)
+    return np.sort(first)[:k]
+
+
+def mmr_select(vectors: np.ndarray, relevance: np.ndarray, k: int, lam: float = MMR_LAMBDA) -> np.ndarray:
+    """
+    Greedy maximal marginal relevance over normalized candidate vectors:
+    each pick maximizes lam * relevance - (1 - lam) * max cosine to the picks so far.
+    Returns candidate positions in pick order.
+    """
+    n = len(relevance)
+    k = min(int(k), n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    sims = vectors @ vectors.T
+    picked = [int(np.argmax(relevance))]
+    chosen = np.zeros(n, dtype=bool)
+    chosen[picked[0]] = True
+    max_sim = sims[picked[0]].copy()
+    while len(picked) < k:
+        gain = lam * relevance - (1.0 - lam) * max_sim
+        gain[chosen] = -np.inf
+        j = int(np.argmax(gain))
+        picked.append(j)
+        chosen[j] = True
+        np.maximum(max_sim, sims[j], out=max_sim)
+    return np.array(picked, dtype=np.int64)
+
+
+def diversify(rows: np.ndarray, scores: np.ndarray, top_k: int, mode: str = "group",
+              groups: Optional[np.ndarray] = None, vectors: Optional[np.ndarray] = None,
+              queries=None, lam: float = MMR_LAMBDA) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a best-first candidate list to `top_k` non-redundant rows.
+
+    "group" keeps the best row of each group (document / topic); "mmr" does
+    the same and then picks among the group winners by MMR on `vectors`
+    (normalized vectors of `rows`, same order) against `queries`.
+    """
+    if mode not in DIVERSITY_MODES:
+        raise ValueError(f"Unknown diversity mode: {mode} (expected one of {DIVERSITY_MODES})")
+    rows, scores = np.asarray(rows), np.asarray(scores)
+    if mode == "none":
+        return rows[:top_k], scores[:top_k]
+    pos = group_best(groups, len(rows) if mode == "mmr" else top_k) if groups is not None else np.arange(len(rows))
+    if mode == "group":
+        return rows[pos[:top_k]], scores[pos[:top_k]]
+    vecs = vectors[pos]
+    relevance = (as_query_batch(queries) @ vecs.T).max(axis=0)
+    pick = pos[mmr_select(vecs, relevance, top_k, lam)]
+    return rows[pick], scores[pick]
@@ -0,0 +1,211 @@
+# corpus/slack_sync.py
+"""
+Incremental Slack channel sync into the local `slack` corpus source.
+
+Each run walks the public channels the token's user/bot is a member of
+(optionally only SLACK_SYNC_CHANNELS), skipping those excluded by
+`-in:<channel>` in tooling/common_utils.SLACK_EXCLUSIONS and messages with
+one of its `-<word>` terms. A per-channel cursor (ts of the newest message
+seen, kept in SLACK_SYNC_STATE) means only new history is read. Each run
+re-reads THREAD_LOOKBACK_HOURS behind the cursor, so replies to recent
+threads are picked up. A first run backfills SLACK_SYNC_BACKFILL_DAYS.
+
+A top-level message plus its thread replies is one document, keyed
+"slack:<channel>:<ts>". The documents go through corpus.ingest, so only new
+or changed threads are re-embedded and the shards under sources/slack/ are
+replaced atomically. The corpus watcher then swaps in the new BM25 and
+embedding indexes. `last_synced_at()` tells the `slack_local_search` tool
+where the live API has to take over once the sync is overdue (SYNC_INTERVAL).
+
+Usage:
+    python -m corpus.slack_sync
+    python -m corpus.slack_sync --channels embed,dashboards --backfill-days 30 --dry-run
+"""
+import argparse
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from tooling.common_utils import SLACK_EXCLUSIONS
+
+from .ingest import Document, _sha256, ingest_documents
+
+try:
+    from slack_sdk import WebClient
+    from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
+except ImportError:  # optional: only the sync job needs it
+    WebClient = None
+
+SLACK_TOKEN = os.getenv("SLACK_API_KEY")
+SLACK_SYNC_STATE = Path(os.getenv("SLACK_SYNC_STATE", "metadata/slack/sync_state.json"))
+# comma-separated channel names; empty = every channel the token is a member of
+SLACK_SYNC_CHANNELS = [c.strip().lstrip("#") for c in os.getenv("SLACK_SYNC_CHANNELS", "").split(",") if c.strip()]
+BACKFILL_DAYS = float(os.getenv("SLACK_SYNC_BACKFILL_DAYS", "90"))
+# how often the sync job is scheduled; an index synced more recently than this is as fresh as it gets
+SYNC_INTERVAL = float(os.getenv("SLACK_SYNC_INTERVAL", "900"))
+THREAD_LOOKBACK_HOURS = 72
+MAX_REPLIES = 50
+PAGE_SIZE = 200
+
+# channel housekeeping, never content
+SKIP_SUBTYPES = {
+    "channel_join", "channel_leave", "channel_topic", "channel_purpose", "channel_name",
+    "channel_archive", "channel_unarchive", "pinned_item", "unpinned_item", "bot_add", "bot_remove",
+}
+
+_WORD_RE = re.compile(r"[\w-]+")
+
+
+def parse_exclusions(spec: str = SLACK_EXCLUSIONS) -> Tuple[Set[str], Set[str]]:
+    """(excluded channel names, excluded words) of a Slack search exclusion suffix."""
+    channels, words = set(), set()
+    for tok in spec.split():
+        if tok.startswith("-in:"):
+            channels.add(tok[4:].lstrip("#").lower())
+        elif tok.startswith("-") and len(tok) > 1:
+            words.add(tok[1:].lower())
+    return channels, words
+
+
+def _excluded(text: str, words: Set[str]) -> bool:
+    return bool(words) and not words.isdisjoint(_WORD_RE.findall(text.lower()))
+
+
+# -------- Sync state --------
+def load_state(path: Path = SLACK_SYNC_STATE) -> Dict[str, Any]:
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, json.JSONDecodeError):
+        return {"channels": {}, "synced_at": None}
+
+
+def save_state(state: Dict[str, Any], path: Path = SLACK_SYNC_STATE) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, path)
+
+
+def last_synced_at(path: Path = SLACK_SYNC_STATE) -> Optional[float]:
+    """Epoch seconds of the last completed sync, None if the index was never synced."""
+    return load_state(path).get("synced_at")
+
+
+# -------- Slack API --------
+def make_client(token: Optional[str] = SLACK_TOKEN):
+    if WebClient is None:
+        raise RuntimeError("slack-sdk is not installed (pip install slack-sdk)")
+    if not token:
+        raise RuntimeError("SLACK_API_KEY not set in environment or .env file.")
+    client = WebClient(token=token)
+    client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=5))
+    return client
+
+
+def _paged(call, key: str, **params) -> Iterator[Dict[str, Any]]:
+    cursor = None
+    while True:
+        resp = call(limit=PAGE_SIZE, cursor=cursor, **params)
+        yield from resp.get(key, [])
+        cursor = (resp.get("response_metadata") or {}).get("next_cursor")
+        if not cursor:
+            return
+
+
+def list_channels(client, only: Optional[List[str]] = None, excluded: Set[str] = frozenset()) -> List[Dict[str, Any]]:
+    """Member channels to sync: not archived, not excluded, and in `only` when given."""
+    wanted = {c.lower() for c in only or []}
+    return [
+        ch for ch in _paged(client.conversations_list, "channels", types="public_channel", exclude_archived=True)
+        if ch.get("is_member") and ch["name"].lower() not in excluded
+        and (not wanted or ch["name"].lower() in wanted)
+    ]
+
+
+def channel_documents(client, channel: Dict[str, Any], oldest: float, permalink_base: str,
+                      words: Set[str]) -> Tuple[List[Document], Optional[str]]:
+    """Documents of the channel's messages since `oldest`, plus the ts of the newest message seen."""
+    docs, newest = [], None
+    for msg in _paged(client.conversations_history, "messages", channel=channel["id"], oldest=f"{oldest:.6f}"):
+        ts = msg.get("ts")
+        newest = ts if newest is None or float(ts) > float(newest) else newest
+        text = (msg.get("text") or "").strip()
+        if msg.get("subtype") in SKIP_SUBTYPES or not text or _excluded(text, words):
+            continue
+        if msg.get("reply_count"):
+            replies = client.conversations_replies(channel=channel["id"], ts=ts, limit=MAX_REPLIES + 1)
+            text += "".join(
+                f"\n\n{r['text'].strip()}" for r in replies.get("messages", [])
+                if r.get("ts") != ts and (r.get("text") or "").strip() and not _excluded(r["text"], words)
+            )
+        docs.append(Document(
+            f"slack:{channel['id']}:{ts}",
+            text,
+            _sha256(text.encode("utf-8")),
+            {
+                "source": "slack",
+                "channel": channel["id"],
+                "channel_name": channel["name"],
+                "ts": ts,
+                "user": msg.get("user"),
+                "permalink": f"{permalink_base}archives/{channel['id']}/p{ts.replace('.', '')}",
+            },
+        ))
+    return docs, newest
+
+
+# -------- Sync --------
+def sync(channels: Optional[List[str]] = None, backfill_days: float = BACKFILL_DAYS, dry_run: bool = False,
+         batch_size: int = 64, token: Optional[str] = SLACK_TOKEN) -> Dict[str, Any]:
+    client = make_client(token)
+    state = load_state()
+    cursors = state.setdefault("channels", {})
+    excluded, words = parse_exclusions()
+    permalink_base = client.auth_test()["url"]
+    started = time.time()
+
+    docs: List[Document] = []
+    per_channel = {}
+    for ch in list_channels(client, channels or SLACK_SYNC_CHANNELS, excluded):
+        cursor = (cursors.get(ch["id"]) or {}).get("cursor")
+        oldest = float(cursor) - THREAD_LOOKBACK_HOURS * 3600 if cursor else started - backfill_days * 86400
+        try:
+            found, newest = channel_documents(client, ch, max(oldest, 0.0), permalink_base, words)
+        except Exception as e:
+            print(f"[WARN] Slack sync skipped #{ch['name']}: {e}")
+            continue
+        docs += found
+        per_channel[ch["name"]] = len(found)
+        if newest is not None and (cursor is None or float(newest) > float(cursor)):
+            cursors[ch["id"]] = {"name": ch["name"], "cursor": newest}
+        else:
+            cursors.setdefault(ch["id"], {"name": ch["name"], "cursor": cursor})
+
+    # nothing outside the lookback window is re-read, so a missing thread is not a deleted one
+    summary = ingest_documents("slack", docs, prune=False, dry_run=dry_run, batch_size=batch_size)
+    summary["changed"] = len(summary["changed"])
+    summary["channels"] = per_channel
+    if not dry_run:
+        state["synced_at"] = started
+        save_state(state)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pull new Slack messages into the local slack corpus.")
+    parser.add_argument("--channels", help="comma-separated channel names (default: SLACK_SYNC_CHANNELS or all member channels)")
+    parser.add_argument("--backfill-days", type=float, default=BACKFILL_DAYS, help="history read for channels never synced")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be embedded")
+    parser.add_argument("--batch-size", type=int, default=64, help="texts per embedding request")
+    args = parser.parse_args(argv)
+    channels = [c.strip().lstrip("#") for c in args.channels.split(",") if c.strip()] if args.channels else None
+    summary = sync(channels, backfill_days=args.backfill_days, dry_run=args.dry_run, batch_size=args.batch_size)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+# corpus/snapshot.py
+"""
+Cold-start snapshots of built indexes and warm caches.
+
+A fresh process otherwise re-parses every corpus and starts with empty
+caches. A snapshot is one versioned directory holding everything that is
+expensive to rebuild:
+
+    sources/snapshot/
+        CURRENT                         name of the live version directory
+        <version>/
+            meta.json                   sources + shard stats/digests, dtype, section keys
+            unified/                    stacked matrix (+ scales), source column, offsets
+            stores/<source>/            uids, shard column, byte offsets per row
+            reduction/                  reduced-dim prefilter matrix and PCA basis
+            bm25/<source>/              postings arrays + vocab.json
+            filters/<source>/           metadata index (pickle)
+            faiss/<source>.<type>/      FAISS index file
+            caches/<name>.pkl           registered process caches (query embeddings, pages, ...)
+
+Arrays are loaded with mmap, so restoring takes milliseconds plus the shard
+checks. A snapshot is rejected as a whole when any source's shards on disk
+no longer match its recorded digests, or when the embedding dtype changed.
+When the sources come from the compiled corpus only the derived indexes are
+stored. Sections whose key (the digests they were built from) is unchanged
+since the previous version are hard-linked instead of rewritten, so a
+snapshot after a corpus update mostly costs the changed sources.
+
+Several app processes may share one snapshot directory. A version is only
+pruned once it has been superseded for PRUNE_GRACE seconds, so a process
+still restoring it (or one that just wrote the next one) is never cut short.
+
+Process caches take part through `register_cache(name, dump, load, version)`;
+entries restored before their owner registers are handed over on
+registration. `version` is a cheap change counter (LRUCache.version) the
+corpus watcher polls to decide when warm caches are worth a new snapshot;
+`save_snapshot(if_changed=True)` then compares the cache contents
+themselves with the current version before writing anything.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import bm25, filters
+from .compiled import compiled_store, current_version
+from .quantize import DEFAULT_DTYPE
+from .reduce import PREFILTER_DIMS, PREFILTER_METHOD, Reduction, build_reduction
+from .sources import SOURCE_FILES
+from .store import CorpusStore, Shard, _open_mmap, _stat, seed_store, shard_stats, shards_unchanged
+from .unified import UnifiedIndex, build_unified, get_unified_index, resident_unified, seed_unified
+
+SNAPSHOT_DIR = Path(os.getenv("CORPUS_SNAPSHOT_DIR", "sources/snapshot"))
+FORMAT_VERSION = 1
+KEEP_VERSIONS = 2
+# seconds a superseded version is kept for processes still restoring it
+PRUNE_GRACE = 600
+
+
+# -------- Cache registry --------
+_CACHES: Dict[str, Tuple[Callable[[], Any], Callable[[Any], None], Optional[Callable[[], Any]]]] = {}
+_PENDING: Dict[str, Any] = {}
+_LOCK = threading.Lock()
+
+
+def register_cache(name: str, dump: Callable[[], Any], load: Callable[[Any], None],
+                   version: Optional[Callable[[], Any]] = None) -> None:
+    """
+    Include a process cache in snapshots: `dump()` returns a picklable value
+    that `load` restores; `version()`, if given, changes whenever the contents do.
+    """
+    with _LOCK:
+        _CACHES[name] = (dump, load, version)
+        pending = _PENDING.pop(name, None)
+    if pending is not None:
+        load(pending)
+
+
+def cache_versions() -> Tuple:
+    """Change marker of the registered caches that report a version."""
+    with _LOCK:
+        caches = dict(_CACHES)
+    return tuple(sorted((name, version()) for name, (_, _, version) in caches.items() if version is not None))
+
+
+# -------- Writing --------
+def _load(path: Path) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # empty arrays cannot be mapped
+        return np.load(path)
+
+
+def _section(root: Path, prev: Optional[Path], sections: Dict[str, str], prev_sections: Dict[str, str],
+             name: str, key: str, write: Callable[[Path], None]) -> None:
+    """Write section `name` under `root`, or hard-link it from `prev` when it was built from the same `key`."""
+    target = root / name
+    target.mkdir(parents=True)
+    source = prev / name if prev is not None else None
+    if source is not None and prev_sections.get(name) == key and source.is_dir():
+        for f in source.iterdir():
+            try:
+                os.link(f, target / f.name)
+            except OSError:
+                shutil.copy2(f, target / f.name)
+    else:
+        write(target)
+    sections[name] = key
+
+
+def _index_sections(unified: UnifiedIndex) -> List[str]:
+    """Sections of the BM25 / metadata / FAISS indexes built for `unified`'s stores."""
+    from . import faiss_index
+
+    names = []
+    for name in unified.sources:
+        store = unified.stores[name]
+        if bm25._INDEXES.peek(str(store.path), store.digest) is not None:
+            names.append(f"bm25/{name}")
+        if filters._INDEXES.peek(str(store.path), store.digest) is not None:
+            names.append(f"filters/{name}")
+        base = str(store.base.resolve())
+        names += [f"faiss/{name}.{key[1]}" for key, digest, _ in faiss_index._INDEXES.items()
+                  if key[0] == base and digest == store.digest]
+    return names
+
+
+def save_snapshot(unified: Optional[UnifiedIndex] = None, out: Path = SNAPSHOT_DIR,
+                  if_changed: bool = False) -> Path:
+    """
+    Snapshot `unified` (default: the resident unified index), the BM25 /
+    metadata / FAISS indexes in use for its stores and every registered
+    cache into a new version under `out`; returns its directory. With
+    `if_changed`, nothing is written when the current version already holds
+    this corpus, these indexes and the same cache contents (e.g. saved by
+    another process after the same update).
+    """
+    from . import faiss_index
+
+    if unified is None:
+        unified = resident_unified()
+    if unified is None:
+        unified = get_unified_index()
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    prev_version = current_version(out)
+    prev = out / prev_version if prev_version else None
+    try:
+        prev_meta = json.loads((prev / "meta.json").read_text()) if prev else {}
+        prev_sections = prev_meta["sections"] if prev else {}
+    except (OSError, ValueError, KeyError):
+        prev, prev_meta, prev_sections = None, {}, {}
+
+    with _LOCK:
+        caches = dict(_CACHES)
+    blobs: Dict[str, bytes] = {}
+    for name, (dump, _, _) in caches.items():
+        try:
+            blobs[name] = pickle.dumps(dump(), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"[WARN] Could not snapshot cache '{name}': {e}")
+    cache_keys = {name: hashlib.sha256(blob).hexdigest()[:16] for name, blob in blobs.items()}
+    if (if_changed and prev is not None and _same_corpus(prev_meta, unified)
+            and prev_meta.get("caches") == cache_keys and set(_index_sections(unified)) <= set(prev_sections)):
+        return prev
+
+    version = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:6]}"
+    tmp = out / f".{version}.tmp"
+    tmp.mkdir()
+    stores = [unified.stores[name] for name in unified.sources]
+    compiled = all(s.compiled is not None for s in stores) and bool(stores)
+    corpus_key = "|".join(unified.digests) + f"|{DEFAULT_DTYPE}"
+    sections: Dict[str, str] = {}
+
+    def section(name, key, write):
+        _section(tmp, prev, sections, prev_sections, name, key, write)
+
+    if not compiled:
+        def write_unified(d: Path):
+            np.save(d / "matrix.npy", np.asarray(unified.matrix))
+            np.save(d / "source.npy", np.asarray(unified.source_col))
+            np.save(d / "offsets.npy", np.asarray(unified.offsets))
+            if unified.scales is not None:
+                np.save(d / "scales.npy", np.asarray(unified.scales))
+        section("unified", corpus_key, write_unified)
+        for name, store in zip(unified.sources, stores):
+            def write_store(d: Path, store=store):
+                np.save(d / "uids.npy", np.asarray(store.uids))
+                np.save(d / "shard.npy", np.asarray(store.shard_col))
+                np.save(d / "offsets.npy", np.asarray(store.offsets))
+            section(f"stores/{name}", store.digest, write_store)
+
+    red = unified.reduction
+    if red is not None:
+        def write_reduction(d: Path):
+            np.save(d / "matrix.npy", np.asarray(red.matrix))
+            if red.components is not None:
+                np.save(d / "mean.npy", red.mean)
+                np.save(d / "components.npy", red.components)
+        section("reduction", f"{corpus_key}|{red.method}|{red.dims}", write_reduction)
+
+    for name, store in zip(unified.sources, stores):
+        index = bm25._INDEXES.peek(str(store.path), store.digest)
+        if index is not None:
+            def write_bm25(d: Path, index=index):
+                np.save(d / "indptr.npy", index.indptr)
+                np.save(d / "rows.npy", index.rows)
+                np.save(d / "weights.npy", index.weights)
+                (d / "vocab.json").write_text(json.dumps(index.vocab, ensure_ascii=False))
+            section(f"bm25/{name}", store.digest, write_bm25)
+
+        meta_index = filters._INDEXES.peek(str(store.path), store.digest)
+        if meta_index is not None:
+            def write_filters(d: Path, meta_index=meta_index):
+                with open(d / "index.pkl", "wb") as f:
+                    pickle.dump(meta_index, f, protocol=pickle.HIGHEST_PROTOCOL)
+            section(f"filters/{name}", store.digest, write_filters)
+
+        base = str(store.base.resolve())
+        for key, digest, idx in faiss_index._INDEXES.items():
+            if key[0] == base and digest == store.digest:
+                def write_faiss(d: Path, idx=idx):
+                    faiss_index.faiss.write_index(idx.index, str(d / "index.faiss"))
+                section(f"faiss/{name}.{key[1]}", store.digest, write_faiss)
+
+    (tmp / "caches").mkdir()
+    for name, blob in blobs.items():
+        (tmp / "caches" / f"{name}.pkl").write_bytes(blob)
+
+    lo = [int(unified.offsets[i]) for i in range(len(unified.sources) + 1)]
+    (tmp / "meta.json").write_text(json.dumps({
+        "format": FORMAT_VERSION,
+        "dtype": DEFAULT_DTYPE,
+        "compiled": compiled,
+        "sources": [
+            {"name": name, "spec": str(SOURCE_FILES.get(name, store.path)), "digest": store.digest,
+             "rows": [lo[i], lo[i + 1]], "shards": shard_stats(store)}
+            for i, (name, store) in enumerate(zip(unified.sources, stores))
+        ],
+        "reduction": None if red is None else {"method": red.method, "dims": red.dims, "requested": PREFILTER_DIMS},
+        "sections": sections,
+        "caches": cache_keys,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }, indent=2))
+
+    root = out / version
+    os.replace(tmp, root)
+    pointer = out / "CURRENT.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, out / "CURRENT")
+    if prev is not None:
+        # superseded now: the grace period starts here
+        os.utime(prev)
+    _prune_versions(out, keep=version)
+    return root
+
+
+def _same_corpus(meta: Dict[str, Any], unified: UnifiedIndex) -> bool:
+    return (meta.get("dtype") == DEFAULT_DTYPE
+            and [(s["name"], s["digest"]) for s in meta.get("sources", [])] == list(zip(unified.sources, unified.digests)))
+
+
+def _prune_versions(out: Path, keep: str, grace: float = PRUNE_GRACE) -> None:
+    """
+    Drop all but the newest KEEP_VERSIONS version directories. Never `keep`,
+    the CURRENT one, or one superseded less than `grace` seconds ago.
+    """
+    protected = {keep, current_version(out)}
+    cutoff = time.time() - grace
+    versions = sorted((p for p in out.iterdir() if p.is_dir() and not p.name.startswith(".")),
+                      key=lambda p: p.name, reverse=True)
+    for p in [v for v in versions if v.name not in protected][KEEP_VERSIONS - 1:]:
+        try:
+            if p.stat().st_mtime >= cutoff:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(p, ignore_errors=True)
+
+
+# -------- Restoring --------
+def _reject_reason(meta: Dict[str, Any]) -> Optional[str]:
+    if meta.get("format") != FORMAT_VERSION:
+        return f"format {meta.get('format')}"
+    if meta.get("dtype") != DEFAULT_DTYPE:
+        return f"taken with CORPUS_EMBED_DTYPE={meta.get('dtype')}"
+    if [(s["name"], s["spec"]) for s in meta["sources"]] != [(n, str(p)) for n, p in SOURCE_FILES.items()]:
+        return "different sources"
+    for src in meta["sources"]:
+        if meta["compiled"]:
+            store = compiled_store(src["spec"])
+            if store is None or store.digest != src["digest"]:
+                return f"compiled corpus changed for '{src['name']}'"
+        elif not shards_unchanged(src["spec"], src["shards"]):
+            return f"corpus changed for '{src['name']}'"
+    return None
+
+
+def _restore_store(root: Path, src: Dict[str, Any], unified: Dict[str, np.ndarray]) -> CorpusStore:
+    lo, hi = src["rows"]
+    d = root / "stores" / src["name"]
+    shard_col = _load(d / "shard.npy")
+    counts = np.bincount(shard_col, minlength=len(src["shards"])) if hi > lo else [0] * len(src["shards"])
+    shards = []
+    for sh, n in zip(src["shards"], counts):
+        path = Path(sh["path"])
+        mtime_ns, size = _stat(path)
+        shards.append(Shard(path, mtime_ns, size, sh["digest"], int(n), _open_mmap(path) if n else None))
+    scales = unified.get("scales")
+    return CorpusStore(
+        Path(src["spec"]),
+        shards,
+        src["digest"],
+        unified["matrix"][lo:hi],
+        _load(d / "uids.npy"),
+        shard_col,
+        _load(d / "offsets.npy"),
+        None if scales is None else scales[lo:hi],
+    )
+
+
+def _restore_unified(root: Path, meta: Dict[str, Any]) -> UnifiedIndex:
+    if meta["compiled"]:
+        stores = {src["name"]: compiled_store(src["spec"]) for src in meta["sources"]}
+        index = build_unified(stores, prefilter_dims=0)
+    else:
+        d = root / "unified"
+        arrays = {name: _load(d / f"{name}.npy") for name in ("matrix", "source", "offsets")}
+        if (d / "scales.npy").exists():
+            arrays["scales"] = _load(d / "scales.npy")
+        stores = {src["name"]: _restore_store(root, src, arrays) for src in meta["sources"]}
+        index = UnifiedIndex(tuple(stores), tuple(s.digest for s in stores.values()), arrays["matrix"],
+                             arrays["source"], np.asarray(arrays["offsets"]), stores, arrays.get("scales"))
+
+    saved = meta.get("reduction")
+    if PREFILTER_DIMS and saved and (saved["method"], saved["requested"]) == (PREFILTER_METHOD, PREFILTER_DIMS):
+        d = root / "reduction"
+        pca = (d / "components.npy").exists()
+        index.reduction = Reduction(saved["method"], saved["dims"],
+                                    np.load(d / "mean.npy") if pca else None,
+                                    np.load(d / "components.npy") if pca else None,
+                                    _load(d / "matrix.npy"))
+    elif PREFILTER_DIMS:
+        index.reduction = build_reduction(index.matrix, PREFILTER_DIMS, scales=index.scales)
+    return index
+
+
+def _restore_indexes(root: Path, meta: Dict[str, Any], index: UnifiedIndex) -> List[str]:
+    from . import faiss_index
+
+    restored = []
+    for src in meta["sources"]:
+        store = index.stores[src["name"]]
+        d = root / "bm25" / src["name"]
+        if d.is_dir():
+            bm25._INDEXES.put(str(store.path), store.digest, bm25.BM25Index(
+                store.digest,
+                json.loads((d / "vocab.json").read_text()),
+                _load(d / "indptr.npy"),
+                _load(d / "rows.npy"),
+                _load(d / "weights.npy"),
+                len(store),
+            ))
+            restored.append(f"bm25/{src['name']}")
+        d = root / "filters" / src["name"]
+        if d.is_dir():
+            with open(d / "index.pkl", "rb") as f:
+                filters._INDEXES.put(str(store.path), store.digest, pickle.load(f))
+            restored.append(f"filters/{src['name']}")
+        for d in sorted((root / "faiss").glob(f"{src['name']}.*")):
+            index_type = d.name.rsplit(".", 1)[1]
+            idx = faiss_index.wrap_index(faiss_index.read_index(d / "index.faiss", index_type), store, index_type)
+            faiss_index._INDEXES.put((str(store.base.resolve()), index_type), store.digest, idx)
+            restored.append(f"faiss/{d.name}")
+    return restored
+
+
+def restore_snapshot(out: Path = SNAPSHOT_DIR) -> bool:
+    """
+    Adopt the current snapshot's stores, indexes and caches, if it matches the
+    corpus on disk. Returns False (and leaves everything to lazy loading) otherwise.
+    """
+    start = time.perf_counter()
+    version = current_version(out)
+    if version is None:
+        return False
+    root = Path(out) / version
+    try:
+        meta = json.loads((root / "meta.json").read_text())
+        reason = _reject_reason(meta)
+    except (OSError, ValueError, KeyError) as e:
+        reason = f"unreadable ({e})"
+    if reason:
+        print(f"[WARN] Ignoring corpus snapshot {version}: {reason}")
+        return False
+
+    try:
+        index = _restore_unified(root, meta)
+        restored = _restore_indexes(root, meta, index)
+    except (OSError, ValueError, KeyError, TypeError, RuntimeError, pickle.UnpicklingError) as e:
+        print(f"[WARN] Could not restore corpus snapshot {version}: {e}")
+        return False
+    for src in meta["sources"]:
+        seed_store(src["spec"], index.stores[src["name"]])
+    seed_unified(index)
+
+    for f in sorted((root / "caches").glob("*.pkl")):
+        try:
+            with open(f, "rb") as fh:
+                value = pickle.load(fh)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"[WARN] Could not restore cache '{f.stem}': {e}")
+            continue
+        with _LOCK:
+            owner = _CACHES.get(f.stem)
+            if owner is None:
+                _PENDING[f.stem] = value
+        if owner is not None:
+            owner[1](value)
+        restored.append(f"caches/{f.stem}")
+
+    ms = (time.perf_counter() - start) * 1000
+    print(f"[corpus] restored snapshot {version} ({len(index)} rows, {len(restored)} parts) in {ms:.0f} ms")
+    return True
+
+
+def main(argv=None):
+    from . import faiss_index
+
+    parser = argparse.ArgumentParser(description="Save or restore a snapshot of the corpus indexes.")
+    parser.add_argument("action", choices=("save", "restore"))
+    parser.add_argument("--out", type=Path, default=SNAPSHOT_DIR)
+    parser.add_argument("--faiss", nargs="*", default=[], choices=faiss_index.INDEX_TYPES,
+                        help="also build and include FAISS indexes of these types")
+    args = parser.parse_args(argv)
+    start = time.time()
+    if args.action == "restore":
+        if not restore_snapshot(args.out):
+            raise SystemExit(1)
+        return
+    unified = get_unified_index()
+    for store in unified.stores.values():
+        bm25.bm25_for_store(store)
+        filters.get_metadata_index(store)
+        for index_type in args.faiss:
+            faiss_index.faiss_for_store(store, index_type)
+    root = save_snapshot(unified, args.out)
+    size = sum(p.stat().st_size for p in root.rglob("*") if p.is_file())
+    print(f"{root}: {len(unified)} rows, {size / 1e6:.1f} MB in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
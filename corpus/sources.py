@@ -0,0 +1,15 @@
+# corpus/sources.py
+from pathlib import Path
+
+# Embedded corpora, keyed by the `source` label the tools and evidence use.
+# Each value is a JSONL file, a directory or a glob of shards (-000, -001, ...).
+# Adding a source here makes it part of the unified index.
+SOURCE_FILES = {
+    "docs": Path("sources/docs/docs-*.jsonl"),
+    "community": Path("sources/discourse/discourse-*.jsonl"),
+    # written by `python -m corpus.slack_sync`
+    "slack": Path("sources/slack/slack-*.jsonl"),
+}
+
+# Results returned per source when a caller does not ask for a specific k
+DEFAULT_TOP_K = 5
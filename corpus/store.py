@@ -0,0 +1,437 @@
+# corpus/store.py
+"""
+Process-resident embedding store.
+
+A source is a set of JSONL shards (`discourse-000.jsonl .. discourse-NNN.jsonl`,
+given as a file, a directory or a glob). Shards are parsed once, in parallel
+worker processes when several need (re)loading, and merged into one
+contiguous, L2-normalized matrix kept for the lifetime of the process. Only
+the vectors, a stable id per row and each row's (shard, byte offset) stay on
+the heap; chunk text and metadata are read back on demand for the winning
+rows through a read-only mmap of the shard, so resident memory scales with
+the vectors alone. A source compiled with `python -m corpus.compiled` is
+served from shared memory-mapped arrays instead (see corpus/compiled.py).
+
+A store is only reloaded when a shard's mtime/size changes *and* its content
+hash differs, and then only the changed shards are re-parsed. The mapping
+pins the file version the offsets refer to, so writers must replace shards
+atomically (write + os.replace), never truncate them in place.
+
+With CORPUS_EMBED_DTYPE=float16|int8 the resident matrix is quantized; a
+search then scores all rows on it and re-ranks the best few hundred on exact
+float32 vectors re-read by byte offset.
+"""
+import glob
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .quantize import DEFAULT_DTYPE, is_quantized, quantize, rescore_depth
+from .search import normalize_rows, rescore_fused, search_matrix, search_matrix_fused
+
+# worker processes used when more than one shard has to be parsed (0/1 = parse serially)
+LOAD_WORKERS = int(os.getenv("CORPUS_LOAD_WORKERS", str(min(4, os.cpu_count() or 1))))
+# below this many bytes to parse, process start-up costs more than it saves
+PARALLEL_MIN_BYTES = 32 << 20
+# per-row metadata read by the search filters (corpus/filters.py); compiled as string columns
+METADATA_FIELDS = ("source", "path", "topic_id", "ingested_at")
+
+# a chunk's embedding array, cut before json.loads when only its text/metadata are read
+_EMBEDDING_RE = re.compile(rb'(?<!\\)"embedding"\s*:\s*\[[^\]]*\]')
+
+
+def chunk_uid(chunk_id: str) -> int:
+    """Stable non-negative int64 id for a chunk id string."""
+    digest = hashlib.blake2b(str(chunk_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+# -------- Shard discovery --------
+def discover_shards(spec) -> List[Path]:
+    """JSONL shards of a source: a file, a directory (all *.jsonl) or a glob, in sorted order."""
+    spec = str(spec)
+    if glob.has_magic(spec):
+        return sorted(Path(p) for p in glob.glob(spec) if p.endswith(".jsonl"))
+    p = Path(spec)
+    if p.is_dir():
+        return sorted(p.glob("*.jsonl"))
+    return [p] if p.exists() else []
+
+
+def source_base(spec) -> Path:
+    """Stable path prefix for artifacts derived from a whole source (indexes, compiled files)."""
+    spec = str(spec)
+    p = Path(spec)
+    if glob.has_magic(spec):
+        stem = p.name.split("*", 1)[0].rstrip("-_.") or p.parent.name
+        return p.parent / stem
+    if p.is_dir():
+        return p / p.name
+    return p.with_suffix("")
+
+
+@dataclass
+class Shard:
+    path: Path
+    mtime_ns: int
+    size: int
+    digest: str
+    rows: int
+    mm: Optional[mmap.mmap] = field(default=None, repr=False)
+
+    def line(self, offset: int) -> bytes:
+        end = self.mm.find(b"\n", offset)
+        return self.mm[offset:end if end >= 0 else len(self.mm)]
+
+
+def combined_digest(shards) -> str:
+    """sha256 over (name, digest) of each shard; "" for a source with no shards."""
+    if not shards:
+        return ""
+    h = hashlib.sha256()
+    for sh in shards:
+        h.update(f"{sh.path.name}:{sh.digest}\n".encode())
+    return h.hexdigest()
+
+
+def source_digest(spec) -> str:
+    """Combined digest of a source's shards as currently on disk."""
+    return combined_digest([Shard(p, 0, 0, file_digest(p), 0) for p in discover_shards(spec)])
+
+
+@dataclass
+class CorpusStore:
+    path: Path                              # source spec: file, directory or glob of shards
+    shards: List[Shard]
+    digest: str                             # sha256 over the shard digests
+    matrix: np.ndarray                      # (n, d) unit-length rows: float32, float16 or int8 codes
+    uids: np.ndarray                        # (n,) int64 chunk_uid of each row's chunk id
+    shard_col: np.ndarray                   # (n,) int32 index into `shards`
+    offsets: np.ndarray                     # (n,) byte offset of the row's line within its shard
+    scales: Optional[np.ndarray] = None     # (n,) per-row scale for int8 codes
+    compiled: Optional[Any] = field(default=None, repr=False)  # CompiledCorpus serving this source
+    row0: int = 0                           # first row of this source in `compiled`
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def quantized(self) -> bool:
+        return is_quantized(self.matrix)
+
+    @property
+    def base(self) -> Path:
+        return source_base(self.path)
+
+    def _line(self, row: int, embedding: bool = True) -> Dict[str, Any]:
+        line = self.shards[self.shard_col[row]].line(int(self.offsets[row]))
+        if not embedding:
+            line = _EMBEDDING_RE.sub(b'"embedding": null', line, count=1)
+        return json.loads(line)
+
+    def payload(self, row: int) -> Dict[str, Any]:
+        """Chunk dict (text, metadata, ...) of `row`, without the embedding."""
+        if self.compiled is not None:
+            return self.compiled.payload(self.row0 + int(row))
+        chunk = self._line(int(row), embedding=False)
+        chunk.pop("embedding", None)
+        return chunk
+
+    def text(self, row: int) -> str:
+        """chunk_text of `row`, for index builds: neither its embedding nor its record JSON is decoded."""
+        if self.compiled is not None:
+            return self.compiled.columns["chunk_text"][self.row0 + int(row)]
+        return self._line(int(row), embedding=False).get("chunk_text") or ""
+
+    def metadata_fields(self, row: int) -> Dict[str, str]:
+        """METADATA_FIELDS of `row` as strings, "" when absent (the embedding is not decoded)."""
+        if self.compiled is not None:
+            return self.compiled.metadata_fields(self.row0 + int(row))
+        meta = self._line(int(row), embedding=False).get("metadata") or {}
+        return {f: "" if meta.get(f) is None else str(meta[f]) for f in METADATA_FIELDS}
+
+    def payloads(self, rows) -> List[Dict[str, Any]]:
+        return [self.payload(int(r)) for r in rows]
+
+    def exact_rows(self, rows) -> np.ndarray:
+        """Normalized float32 vectors for `rows`; re-read from the shards when the resident matrix is quantized."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not self.quantized:
+            return self.matrix[rows]
+        if self.compiled is not None:
+            return np.asarray(self.compiled.vectors[self.row0 + rows])
+        return normalize_rows([self._line(int(r))["embedding"] for r in rows])
+
+    def search_rows(self, queries, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Batched first-stage search; returns (row indices, scores), each shaped (q, k)."""
+        return search_matrix(self.matrix, queries, top_k=top_k, scales=self.scales)
+
+    def search(self, query_embeddings, top_k: int = 5, fusion: str = "max") -> List[Dict[str, Any]]:
+        """Top-k chunks for one query vector, or several fused with `fusion` ("max" | "rrf")."""
+        if not len(self):
+            return []
+        if not self.quantized:
+            idx, _ = search_matrix_fused(self.matrix, query_embeddings, top_k=top_k, method=fusion)
+        else:
+            depth = rescore_depth(top_k)
+            cand, _ = search_matrix_fused(self.matrix, query_embeddings, top_k=depth,
+                                          method=fusion, depth=depth, scales=self.scales)
+            idx, _ = rescore_fused(self.exact_rows(cand), cand, query_embeddings, top_k=top_k, method=fusion)
+        return self.payloads(idx)
+
+    def shard_rows(self, i: int) -> slice:
+        start = sum(sh.rows for sh in self.shards[:i])
+        return slice(start, start + self.shards[i].rows)
+
+    def close(self) -> None:
+        """Unmap the shards (a refreshed store shares the mappings of unchanged shards)."""
+        for sh in self.shards:
+            if sh.mm is not None:
+                sh.mm.close()
+                sh.mm = None
+
+
+# -------- Parsing --------
+def _parse_shard(path: str, dtype: str) -> Dict[str, Any]:
+    """
+    One pass over a JSONL shard: quantized vectors, row uids, line offsets and
+    the sha256 of the bytes. Runs in a worker process, so it only returns arrays.
+    """
+    p = Path(path)
+    st = p.stat()
+    vectors, uids, offsets = [], [], []
+    h = hashlib.sha256()
+    with open(p, "rb") as f:
+        pos = 0
+        for line in f:
+            h.update(line)
+            off, pos = pos, pos + len(line)
+            try:
+                chunk = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            emb = chunk.get("embedding") if isinstance(chunk, dict) else None
+            if not isinstance(emb, list):
+                continue
+            vectors.append(emb)
+            uids.append(chunk_uid(chunk.get("id") or f"{p.name}:{off}"))
+            offsets.append(off)
+    matrix, scales = quantize(normalize_rows(vectors), dtype) if vectors else (None, None)
+    return {
+        "path": path,
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "digest": h.hexdigest(),
+        "matrix": matrix,
+        "scales": scales,
+        "uids": np.array(uids, dtype=np.int64),
+        "offsets": np.array(offsets, dtype=np.int64),
+    }
+
+
+def parse_shards(paths: List[Path], dtype: str = DEFAULT_DTYPE, workers: int = LOAD_WORKERS) -> List[Dict[str, Any]]:
+    """Parse shards, fanning out to a process pool when there is more than one."""
+    jobs = [str(p) for p in paths]
+    if len(jobs) > 1 and workers > 1 and sum(p.stat().st_size for p in paths) >= PARALLEL_MIN_BYTES:
+        try:
+            # spawn: forking a threaded (Streamlit) process is not safe
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=ctx) as pool:
+                return list(pool.map(_parse_shard, jobs, [dtype] * len(jobs)))
+        except Exception as e:
+            print(f"[WARN] Parallel shard load failed ({e}), parsing serially")
+    return [_parse_shard(j, dtype) for j in jobs]
+
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _stat(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _open_mmap(path: Path) -> Optional[mmap.mmap]:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else None
+
+
+def _merge(spec, parts: List[Dict[str, Any]]) -> CorpusStore:
+    """Concatenate per-shard arrays (fresh parses or slices of the previous store) into one store."""
+    shards, matrices, scales, uids, offsets, shard_col = [], [], [], [], [], []
+    for part in parts:
+        n = 0 if part["matrix"] is None else part["matrix"].shape[0]
+        mm = part.get("mm") or (_open_mmap(Path(part["path"])) if n else None)
+        shards.append(Shard(Path(part["path"]), part["mtime_ns"], part["size"], part["digest"], n, mm))
+        if n:
+            matrices.append(part["matrix"])
+            if part["scales"] is not None:
+                scales.append(part["scales"])
+            uids.append(part["uids"])
+            offsets.append(part["offsets"])
+            shard_col.append(np.full(n, len(shards) - 1, dtype=np.int32))
+
+    if not matrices:
+        return CorpusStore(Path(str(spec)), shards, combined_digest(shards), np.zeros((0, 0), dtype=np.float32),
+                           np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64))
+    if len({m.dtype for m in matrices}) > 1:
+        raise ValueError("Shards were loaded with different embedding dtypes")
+    return CorpusStore(
+        Path(str(spec)),
+        shards,
+        combined_digest(shards),
+        np.concatenate(matrices),
+        np.concatenate(uids),
+        np.concatenate(shard_col),
+        np.concatenate(offsets),
+        np.concatenate(scales) if scales else None,
+    )
+
+
+def load_store(path, dtype: str = DEFAULT_DTYPE) -> CorpusStore:
+    return _merge(path, parse_shards(discover_shards(path), dtype))
+
+
+def shard_stats(store: CorpusStore) -> List[Dict[str, Any]]:
+    return [{"path": str(sh.path), "mtime_ns": sh.mtime_ns, "size": sh.size, "digest": sh.digest}
+            for sh in store.shards]
+
+
+def shards_unchanged(spec, shards: List[Dict[str, Any]]) -> bool:
+    """True if the shards of `spec` on disk are exactly `shards` (as recorded by shard_stats)."""
+    paths = discover_shards(spec)
+    if [str(p) for p in paths] != [sh["path"] for sh in shards]:
+        return False
+    for p, sh in zip(paths, shards):
+        st = _stat(p)
+        if st is None or (st != (sh["mtime_ns"], sh["size"]) and file_digest(p) != sh["digest"]):
+            return False
+    return True
+
+
+# -------- Process-wide registry --------
+_STORES: Dict[str, CorpusStore] = {}
+_LOCK = threading.Lock()
+
+
+def _reusable_parts(cur: CorpusStore) -> Dict[str, Dict[str, Any]]:
+    parts = {}
+    for i, sh in enumerate(cur.shards):
+        rows = cur.shard_rows(i)
+        parts[str(sh.path)] = {
+            "path": str(sh.path),
+            "mtime_ns": sh.mtime_ns,
+            "size": sh.size,
+            "digest": sh.digest,
+            "matrix": cur.matrix[rows] if sh.rows else None,
+            "scales": None if cur.scales is None or not sh.rows else cur.scales[rows],
+            "uids": cur.uids[rows],
+            "offsets": cur.offsets[rows],
+            "mm": sh.mm,
+        }
+    return parts
+
+
+def refresh_store(cur: Optional[CorpusStore], spec, dtype: str = DEFAULT_DTYPE) -> Optional[CorpusStore]:
+    """
+    Return a new store if any shard of `spec` was added, removed or changed
+    content since `cur`, re-parsing only those shards; None if `cur` is current.
+    """
+    paths = discover_shards(spec)
+    if cur is None:
+        return _merge(spec, parse_shards(paths, dtype))
+
+    old = _reusable_parts(cur)
+    keep, stale = {}, []
+    for p in paths:
+        prev = old.get(str(p))
+        st = _stat(p)
+        if prev is not None and st == (prev["mtime_ns"], prev["size"]):
+            keep[str(p)] = prev
+        elif prev is not None and st is not None and prev["digest"] == file_digest(p):
+            # touched but unchanged (e.g. re-synced): keep the parsed data
+            keep[str(p)] = {**prev, "mtime_ns": st[0], "size": st[1]}
+        else:
+            stale.append(p)
+
+    if not stale and list(keep) == [str(sh.path) for sh in cur.shards]:
+        for sh in cur.shards:
+            sh.mtime_ns, sh.size = keep[str(sh.path)]["mtime_ns"], keep[str(sh.path)]["size"]
+        return None
+    fresh = {part["path"]: part for part in parse_shards(stale, dtype)}
+    return _merge(spec, [keep.get(str(p)) or fresh[str(p)] for p in paths])
+
+
+def resolve_store(spec, cur: Optional[CorpusStore] = None) -> CorpusStore:
+    """
+    Current store for a source given its previous one: the compiled mmap
+    corpus while it is fresh, else the JSONL shards, re-parsing only shards
+    whose content changed. Touches no registry.
+    """
+    from .compiled import compiled_store  # compiled imports this module
+
+    comp = compiled_store(spec)
+    if comp is not None:
+        return comp
+    if cur is not None and cur.compiled is not None:
+        cur = None
+    new = refresh_store(cur, spec)
+    return cur if new is None else new
+
+
+# stores pinned by the background watcher (corpus/watcher.py), swapped as a whole
+_PUBLISHED: Dict[str, CorpusStore] = {}
+
+
+def publish_stores(stores: Dict[str, CorpusStore]) -> None:
+    """Serve these stores (keyed by source spec) from get_store without checking the disk."""
+    global _PUBLISHED
+    _PUBLISHED = {str(spec): store for spec, store in stores.items()}
+
+
+def resident_store(path) -> Optional[CorpusStore]:
+    """The store currently held for a source, without checking the disk."""
+    key = str(path)
+    published = _PUBLISHED.get(key)
+    return _STORES.get(key) if published is None else published
+
+
+def seed_store(path, store: CorpusStore) -> None:
+    """Adopt a store built elsewhere (e.g. restored from a snapshot) as the resident one."""
+    with _LOCK:
+        _STORES[str(path)] = store
+
+
+def get_store(path) -> CorpusStore:
+    """Return the resident store for a source (the published one while a watcher runs)."""
+    key = str(path)
+    published = _PUBLISHED.get(key)
+    if published is not None:
+        return published
+    with _LOCK:
+        cur = resolve_store(path, _STORES.get(key))
+        _STORES[key] = cur
+        return cur
+
+
+def clear_stores() -> None:
+    with _LOCK:
+        _STORES.clear()
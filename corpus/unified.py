@@ -0,0 +1,265 @@
+# corpus/unified.py
+"""
+Unified multi-source vector index.
+
+All registered sources (corpus/sources.py) are stacked into one normalized
+matrix with a source column, so a query is scored against every corpus in a
+single matmul and then split into per-source top-k. The per-source stores
+keep working, but their `matrix` becomes a view into the unified one, so the
+vectors are held once.
+
+The (q, N) score matrix of recent queries is cached, so the docs and
+community tools answering the same question share one scoring pass.
+When the stores are quantized the unified matrix is too, and each source's
+candidates are re-ranked on exact float32 rows from their store; the same
+happens when a reduced-dimension prefilter is enabled (corpus/reduce.py). When all
+sources come from the compiled corpus, its mapped matrix is used as is.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .filters import filter_rows, get_metadata_index
+from .quantize import dequantize, is_quantized, rescore_depth
+from .reduce import PREFILTER_DIMS, Reduction, build_reduction
+from .search import (
+    DIVERSITY_MODES,
+    FUSION_METHODS,
+    as_query_batch,
+    diversify,
+    diversity_pool,
+    fuse_scores,
+    rescore_fused,
+    score_matrix,
+)
+from .sources import DEFAULT_TOP_K, SOURCE_FILES
+from .store import CorpusStore, get_store
+
+SCORE_CACHE_SIZE = 8
+
+
+@dataclass
+class UnifiedIndex:
+    sources: Tuple[str, ...]
+    digests: Tuple[str, ...]
+    matrix: np.ndarray                   # (N, d) unit-length rows (float32 or quantized codes)
+    source_col: np.ndarray               # (N,) int16 index into `sources`
+    offsets: np.ndarray                  # rows of sources[i] are offsets[i]:offsets[i + 1]
+    stores: Dict[str, CorpusStore]
+    scales: Optional[np.ndarray] = None  # (N,) int8 row scales
+    reduction: Optional[Reduction] = None  # reduced-dim copy for first-stage scoring
+    _scores: "OrderedDict[bytes, np.ndarray]" = field(default_factory=OrderedDict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def source_range(self, source: str) -> Tuple[int, int]:
+        i = self.sources.index(source)
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+    def chunk(self, row: int) -> Tuple[str, Dict[str, Any]]:
+        """(source, chunk dict) for a unified row; the payload is read lazily from its store."""
+        src = self.sources[self.source_col[row]]
+        return src, self.stores[src].payload(row - int(self.offsets[self.sources.index(src)]))
+
+    @property
+    def approximate(self) -> bool:
+        """First-stage scores are approximate (quantized or reduced) and need exact rescoring."""
+        return self.reduction is not None or is_quantized(self.matrix)
+
+    def _first_stage(self, queries, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        if self.reduction is not None:
+            return self.reduction.score(queries, rows)
+        if rows is None:
+            return score_matrix(self.matrix, queries, self.scales)
+        return score_matrix(self.matrix[rows], queries, None if self.scales is None else self.scales[rows])
+
+    def score(self, queries) -> np.ndarray:
+        """First-stage scores (q, N) for a query batch, memoized per query vectors."""
+        q = as_query_batch(queries)
+        key = hashlib.blake2b(q.tobytes(), digest_size=16).digest() + str(q.shape).encode()
+        with self._lock:
+            hit = self._scores.get(key)
+            if hit is not None:
+                self._scores.move_to_end(key)
+                return hit
+        scores = self._first_stage(q)
+        with self._lock:
+            self._scores[key] = scores
+            while len(self._scores) > SCORE_CACHE_SIZE:
+                self._scores.popitem(last=False)
+        return scores
+
+    def search_per_source(
+        self,
+        queries,
+        top_k: Union[int, Dict[str, int]] = DEFAULT_TOP_K,
+        fusion: str = "max",
+        depth: int = 50,
+        filters: Optional[Dict[str, Any]] = None,
+        diversity: str = "none",
+    ) -> Dict[str, List[Tuple[int, float]]]:
+        """
+        Per-source top-k from one scoring pass.
+
+        `top_k` is either one k for every source or {source: k} (sources not
+        listed are skipped). With `filters` (see corpus/filters.py) only the
+        matching rows of each source are scored. `diversity` "group" returns
+        k distinct documents (best chunk each), "mmr" additionally applies
+        maximal marginal relevance. Returns {source: [(unified_row, score), ...]}.
+        """
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method: {fusion} (expected one of {FUSION_METHODS})")
+        if diversity not in DIVERSITY_MODES:
+            raise ValueError(f"Unknown diversity mode: {diversity} (expected one of {DIVERSITY_MODES})")
+        wanted = top_k if isinstance(top_k, dict) else {s: top_k for s in self.sources}
+        scores = None
+
+        out: Dict[str, List[Tuple[int, float]]] = {}
+        for src, k in wanted.items():
+            if src not in self.sources:
+                out[src] = []
+                continue
+            lo, hi = self.source_range(src)
+            store = self.stores[src]
+            rows = filter_rows(store, filters) if filters else None
+            if rows is None:
+                if scores is None:
+                    scores = self.score(queries)
+                block = scores[:, lo:hi]
+            else:
+                # pre-filtered: gather and score only the matching subset
+                block = self._first_stage(queries, lo + rows)
+            if block.shape[1] == 0:
+                out[src] = []
+                continue
+
+            if diversity == "none":
+                local, fused = self._ranked(store, block, rows, queries, k, k, fusion, depth)
+            else:
+                groups = get_metadata_index(store).groups
+                pool = diversity_pool(k)
+                while True:
+                    cand, cand_scores = self._ranked(store, block, rows, queries, k, pool, fusion, depth)
+                    enough = len(np.unique(groups[cand])) >= k
+                    if enough or pool >= block.shape[1]:
+                        break
+                    pool *= 4
+                vectors = store.exact_rows(cand) if diversity == "mmr" else None
+                local, fused = diversify(cand, cand_scores, k, diversity, groups=groups[cand],
+                                         vectors=vectors, queries=queries)
+            out[src] = [(lo + int(i), float(f)) for i, f in zip(local, fused)]
+        return out
+
+    def _ranked(self, store: CorpusStore, block: np.ndarray, rows: Optional[np.ndarray], queries,
+                k: int, n: int, fusion: str, depth: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Best-first (store rows, scores) of the top `n` columns of `block`, rescored when approximate."""
+        if not self.approximate:
+            idx, fused = fuse_scores(block, top_k=n, method=fusion, depth=max(depth, n))
+            return (idx if rows is None else rows[idx]), fused
+        n_cand = max(rescore_depth(k), n)
+        cand, _ = fuse_scores(block, top_k=n_cand, method=fusion, depth=n_cand)
+        cand = cand if rows is None else rows[cand]
+        return rescore_fused(store.exact_rows(cand), cand, queries, top_k=n, method=fusion)
+
+
+def _compiled_unified(stores: Dict[str, CorpusStore]) -> Optional[UnifiedIndex]:
+    """Zero-copy index when the stores are exactly the compiled corpus's sources, in order."""
+    corpus = next(iter(stores.values())).compiled if stores else None
+    if corpus is None or tuple(stores) != corpus.sources:
+        return None
+    if any(s.compiled is not corpus for s in stores.values()):
+        return None
+    offsets = np.array([src["rows"][0] for src in corpus.meta["sources"]] + [len(corpus)], dtype=np.int64)
+    return UnifiedIndex(tuple(stores), tuple(s.digest for s in stores.values()), corpus.matrix,
+                        corpus.source_col, offsets, dict(stores), corpus.scales)
+
+
+def build_unified(stores: Dict[str, CorpusStore], prefilter_dims: int = PREFILTER_DIMS) -> UnifiedIndex:
+    index = _compiled_unified(stores) or _stack(stores)
+    if prefilter_dims:
+        index.reduction = build_reduction(index.matrix, prefilter_dims, scales=index.scales)
+    return index
+
+
+def _stack(stores: Dict[str, CorpusStore]) -> UnifiedIndex:
+    names = tuple(stores)
+    dims = {s.matrix.shape[1] for s in stores.values() if len(s)}
+    if len(dims) > 1:
+        raise ValueError(f"Sources have mismatched embedding dims: {sorted(dims)}")
+    d = dims.pop() if dims else 0
+    sizes = [len(stores[n]) for n in names]
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+
+    kinds = {(stores[n].matrix.dtype, stores[n].scales is not None) for n in names if len(stores[n])}
+    if len(kinds) > 1:
+        # mixed precision (stores loaded under different CORPUS_EMBED_DTYPE): fall back to float32
+        for n in names:
+            if len(stores[n]) and is_quantized(stores[n].matrix):
+                stores[n].matrix, stores[n].scales = dequantize(stores[n].matrix, stores[n].scales), None
+        kinds = {(np.dtype(np.float32), False)}
+    dtype, has_scales = kinds.pop() if kinds else (np.dtype(np.float32), False)
+
+    total = int(offsets[-1])
+    matrix = np.empty((total, d), dtype=dtype)
+    scales = np.empty(total, dtype=np.float32) if has_scales else None
+    source_col = np.empty(total, dtype=np.int16)
+    for i, name in enumerate(names):
+        lo, hi = int(offsets[i]), int(offsets[i + 1])
+        if hi > lo:
+            matrix[lo:hi] = stores[name].matrix
+            # share memory: the per-source store now reads from the unified matrix
+            stores[name].matrix = matrix[lo:hi]
+            if scales is not None:
+                scales[lo:hi] = stores[name].scales
+                stores[name].scales = scales[lo:hi]
+        source_col[lo:hi] = i
+    return UnifiedIndex(names, tuple(stores[n].digest for n in names), matrix, source_col, offsets,
+                        dict(stores), scales)
+
+
+# -------- Process-wide registry --------
+_UNIFIED: Optional[UnifiedIndex] = None
+_PUBLISHED: Optional[UnifiedIndex] = None
+_LOCK = threading.Lock()
+
+
+def publish_unified(index: Optional[UnifiedIndex]) -> None:
+    """Serve `index` as the default unified index without checking the disk (None to stop)."""
+    global _PUBLISHED
+    _PUBLISHED = index
+
+
+def resident_unified() -> Optional[UnifiedIndex]:
+    """The default unified index currently held, without checking the disk."""
+    return _UNIFIED if _PUBLISHED is None else _PUBLISHED
+
+
+def seed_unified(index: UnifiedIndex) -> None:
+    """Adopt an index built elsewhere (e.g. restored from a snapshot) as the default one."""
+    global _UNIFIED
+    with _LOCK:
+        _UNIFIED = index
+
+
+def get_unified_index(source_files: Optional[Dict[str, Any]] = None) -> UnifiedIndex:
+    """Unified index over `source_files` (default: SOURCE_FILES), rebuilt when any source changes."""
+    global _UNIFIED
+    published = _PUBLISHED
+    if source_files is None and published is not None:
+        return published
+    files = source_files or SOURCE_FILES
+    stores = {name: get_store(path) for name, path in files.items()}
+    digests = tuple(stores[n].digest for n in stores)
+    with _LOCK:
+        cur = _UNIFIED
+        if cur is None or cur.sources != tuple(stores) or cur.digests != digests:
+            cur = build_unified(stores)
+            if source_files is None:
+                _UNIFIED = cur
+    return cur
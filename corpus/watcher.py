@@ -0,0 +1,202 @@
+# corpus/watcher.py
+"""
+Hot reload of the corpus without restarting the app.
+
+A daemon thread polls the shard stats of every source (and the compiled
+corpus pointer) every CORPUS_WATCH_INTERVAL seconds. When something changed
+it builds the next generation off the request path: new stores (re-parsing
+only changed shards), the unified index, and the BM25 / metadata / FAISS
+indexes already in use for those sources. Then it publishes the whole
+generation with one reference swap.
+
+Queries that already hold the previous generation finish on it; new queries
+get the new one. get_store / get_unified_index serve the published objects
+without touching the disk, so a corpus update never costs a query latency.
+
+The first generation adopts whatever is already resident (e.g. restored from
+a snapshot). A snapshot (corpus/snapshot.py) is saved right after a hot swap,
+every CORPUS_SNAPSHOT_INTERVAL seconds while the warm caches or built indexes
+keep changing on a stable corpus, and once more when the watcher stops or the
+process exits. Nothing is written while none of that changed, or when the
+current snapshot already holds the same corpus, indexes and cache contents.
+
+Nothing starts on import: the app entry point calls `start_watcher()`, which
+restores the snapshot and starts the watcher once per process.
+"""
+import atexit
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from . import bm25, faiss_index, filters
+from .compiled import COMPILED_DIR, current_version
+from .sources import SOURCE_FILES
+from .snapshot import cache_versions, restore_snapshot, save_snapshot
+from .store import CorpusStore, discover_shards, publish_stores, resident_store, resolve_store
+from .unified import UnifiedIndex, build_unified, publish_unified, resident_unified
+
+WATCH_INTERVAL = float(os.getenv("CORPUS_WATCH_INTERVAL", "30"))
+# 0 = snapshot only after a hot swap and on stop
+SNAPSHOT_INTERVAL = float(os.getenv("CORPUS_SNAPSHOT_INTERVAL", "900"))
+
+
+@dataclass(frozen=True)
+class Generation:
+    version: int
+    signature: Tuple
+    stores: Dict[str, CorpusStore]      # keyed by source name
+    unified: UnifiedIndex
+    built_at: float
+
+
+def corpus_signature(source_files: Dict[str, Any]) -> Tuple:
+    """Cheap fingerprint of what is on disk: shard names, mtimes and sizes, plus the compiled version."""
+    sig = []
+    for name, spec in source_files.items():
+        shards = []
+        for p in discover_shards(spec):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            shards.append((str(p), st.st_mtime_ns, st.st_size))
+        sig.append((name, tuple(shards)))
+    return current_version(COMPILED_DIR), tuple(sig)
+
+
+class CorpusWatcher:
+    def __init__(self, source_files: Optional[Dict[str, Any]] = None, interval: float = WATCH_INTERVAL,
+                 snapshot_interval: float = SNAPSHOT_INTERVAL):
+        self.source_files = dict(source_files or SOURCE_FILES)
+        self.interval = interval
+        self.snapshot_interval = snapshot_interval
+        self._saved_state: Optional[Tuple] = None
+        self._next_snapshot = time.monotonic() + snapshot_interval
+        self._active: Optional[Generation] = None
+        self._build_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> Optional[Generation]:
+        return self._active
+
+    def _build(self, signature: Tuple) -> Generation:
+        prev = self._active
+        held = prev.stores if prev else {name: resident_store(spec) for name, spec in self.source_files.items()}
+        stores = {name: resolve_store(spec, held.get(name)) for name, spec in self.source_files.items()}
+        unified = prev.unified if prev else resident_unified()
+        if (unified is None or unified.sources != tuple(stores)
+                or unified.digests != tuple(s.digest for s in stores.values())):
+            unified = build_unified(stores)
+        for store in stores.values():
+            for module in (bm25, filters, faiss_index):
+                try:
+                    module.warm(store)
+                except Exception as e:
+                    print(f"[WARN] Corpus watcher could not warm {module.__name__} for {store.path}: {e}")
+        return Generation((prev.version + 1) if prev else 1, signature, stores, unified, time.time())
+
+    def check_now(self) -> bool:
+        """Build and publish a new generation if the corpus changed on disk; True if one was swapped in."""
+        with self._build_lock:
+            signature = corpus_signature(self.source_files)
+            if self._active is not None and signature == self._active.signature:
+                return False
+            gen = self._build(signature)
+            if self._active is not None and gen.unified.digests == self._active.unified.digests:
+                # only mtimes moved: keep serving the same objects
+                self._active = Generation(self._active.version, signature, self._active.stores,
+                                          self._active.unified, self._active.built_at)
+                return False
+            # swap: stores first, so a query that sees the new index also finds its stores
+            publish_stores({self.source_files[name]: store for name, store in gen.stores.items()})
+            publish_unified(gen.unified)
+            if self._active is None:
+                # what the process started with (restored or not) is no reason to save
+                self._saved_state = self._warm_state(gen)
+            self._active = gen
+            print(f"[corpus] generation {gen.version} live ({len(gen.unified)} rows)")
+            return True
+
+    @staticmethod
+    def _warm_state(gen: Generation) -> Tuple:
+        """Cheap marker of what a snapshot would hold: corpus, built indexes and cache versions."""
+        return (gen.unified.digests, tuple(len(m._INDEXES.keys()) for m in (bm25, filters, faiss_index)),
+                cache_versions())
+
+    def _snapshot(self, force: bool = False) -> None:
+        """
+        Save the live generation, its indexes and the caches if any of them
+        changed since the last save; unless `force`, at most every snapshot_interval.
+        """
+        gen = self._active
+        if gen is None or self.source_files != SOURCE_FILES:
+            return
+        now = time.monotonic()
+        if not force and now < self._next_snapshot:
+            return
+        state = self._warm_state(gen)
+        if state == self._saved_state:
+            return
+        self._next_snapshot = now + self.snapshot_interval
+        try:
+            save_snapshot(gen.unified, if_changed=True)
+            self._saved_state = state
+        except Exception as e:
+            print(f"[WARN] Corpus snapshot failed: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            swapped = False
+            try:
+                swapped = self.check_now()
+            except Exception as e:
+                # keep serving the last good generation
+                print(f"[WARN] Corpus reload failed: {e}")
+            if swapped or self.snapshot_interval > 0:
+                self._snapshot(force=swapped)
+            self._stop.wait(self.interval)
+
+    def start(self) -> "CorpusWatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="corpus-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop polling, save what changed since the last snapshot, and stop serving the generation."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        self._snapshot(force=True)
+        publish_unified(None)
+        publish_stores({})
+        self._active = None
+
+
+# -------- Process-wide watcher --------
+_WATCHER: Optional[CorpusWatcher] = None
+_STARTED = False
+_LOCK = threading.Lock()
+
+
+def start_watcher(interval: float = WATCH_INTERVAL, restore: bool = True) -> Optional[CorpusWatcher]:
+    """
+    Once per process: adopt the last snapshot if it still matches the corpus,
+    then start the watcher (none when interval <= 0), which saves a last
+    snapshot at exit. Later calls are no-ops.
+    """
+    global _WATCHER, _STARTED
+    with _LOCK:
+        if not _STARTED:
+            _STARTED = True
+            if restore:
+                restore_snapshot()
+            if interval > 0:
+                _WATCHER = CorpusWatcher(interval=interval).start()
+                atexit.register(_WATCHER.stop)
+    return _WATCHER
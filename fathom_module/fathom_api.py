@@ -1,7 +1,9 @@
 # fathom_api.py
 import os
+import threading
 import time
-from typing import Any, Dict, Generator, List, Optional, Union
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Generator, Iterable, Optional, Union
 
 import httpx
 from dotenv import load_dotenv
@@ -10,6 +12,9 @@ from dotenv import load_dotenv
 load_dotenv()
 FATHOM_API_KEY = os.getenv("FATHOM_API_KEY")
 FATHOM_BASE_URL = "https://api.fathom.ai/external/v1"
+# pages fetched per list_meetings call unless the caller asks otherwise (0 = no cap)
+FATHOM_MAX_PAGES = int(os.getenv("FATHOM_MAX_PAGES", "10"))
+FATHOM_POOL_SIZE = 4
 
 if not FATHOM_API_KEY:
     raise RuntimeError("FATHOM_API_KEY not set in environment or .env file.")
@@ -28,62 +33,107 @@ def _prepare_params(params: Dict[str, Any]) -> Dict[str, Any]:
             out[k] = v
     return out
 
+# -------- Shared client --------
+_CLIENT: Optional[httpx.Client] = None
+_PREFETCH: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+
+
+def get_client() -> httpx.Client:
+    """Process-wide client: one keep-alive connection pool for every Fathom call."""
+    global _CLIENT
+    with _LOCK:
+        if _CLIENT is None:
+            _CLIENT = httpx.Client(
+                headers={"X-Api-Key": FATHOM_API_KEY},
+                limits=httpx.Limits(max_connections=FATHOM_POOL_SIZE, max_keepalive_connections=FATHOM_POOL_SIZE),
+            )
+        return _CLIENT
+
+
+def _prefetcher() -> ThreadPoolExecutor:
+    global _PREFETCH
+    with _LOCK:
+        if _PREFETCH is None:
+            _PREFETCH = ThreadPoolExecutor(max_workers=FATHOM_POOL_SIZE, thread_name_prefix="fathom-prefetch")
+        return _PREFETCH
+
+
+def _get_page(query: Dict[str, Any], max_retries: int, timeout: float) -> Dict[str, Any]:
+    """One /meetings page, retrying rate limits and server errors; an {"error": ...} dict on failure."""
+    retries = 0
+    while True:
+        resp = get_client().get(f"{FATHOM_BASE_URL}/meetings", params=query, timeout=timeout)
+        if resp.status_code == 429 or 500 <= resp.status_code < 600:
+            if retries >= max_retries:
+                return {"error": f"Max retries reached: {resp.status_code}", "status_code": resp.status_code,
+                        "params": query}
+            wait = min(2 ** retries, 8)
+            print(f"[WARN] Retrying in {wait}s after {resp.status_code}...")
+            time.sleep(wait)
+            retries += 1
+            continue
+        if not resp.is_success:
+            return {"error": f"Request failed: {resp.status_code}", "status_code": resp.status_code, "params": query}
+        return resp.json()
+
+
+def _project(item: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+    return item if fields is None else {k: item[k] for k in fields if k in item}
+
+
 def list_meetings(
     params: Optional[Dict[str, Any]] = None,
     auto_paginate: bool = True,
     max_retries: int = 3,
-    timeout: float = 15.0
+    timeout: float = 15.0,
+    limit: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    fields: Optional[Iterable[str]] = None,
 ) -> Generator[Union[Dict[str, Any], Dict[str, str]], None, None]:
     """
     Yield meetings from Fathom API /meetings endpoint.
 
+    Pagination stops after `limit` meetings or `max_pages` pages (default
+    FATHOM_MAX_PAGES), and the next page is fetched in the background while
+    the current one is consumed. With `fields`, only those keys of each
+    meeting are kept once its page is parsed.
+
     If max retries are reached due to rate limits or server errors,
     yields a single error dict instead of raising.
     """
-    headers = {"X-Api-Key": FATHOM_API_KEY}
-    client = httpx.Client(timeout=timeout, headers=headers)
-
-    cursor = None
     base_params = params or {}
+    max_pages = FATHOM_MAX_PAGES if max_pages is None else max_pages
+    fields = list(fields) if fields is not None else None
 
-    while True:
+    def request(cursor: Optional[str]) -> Future:
         query = _prepare_params(base_params.copy())
         if cursor:
             query["cursor"] = cursor
+        return _prefetcher().submit(_get_page, query, max_retries, timeout)
 
-        retries = 0
-        while True:
-            resp = client.get(f"{FATHOM_BASE_URL}/meetings", params=query)
-            if resp.status_code == 429 or 500 <= resp.status_code < 600:
-                if retries >= max_retries:
-                    yield {
-                        "error": f"Max retries reached: {resp.status_code}",
-                        "status_code": resp.status_code,
-                        "params": query
-                    }
-                    client.close()
-                    return
-                wait = min(2 ** retries, 8)
-                print(f"[WARN] Retrying in {wait}s after {resp.status_code}...")
-                time.sleep(wait)
-                retries += 1
-                continue
-            if not resp.is_success:
-                yield {
-                    "error": f"Request failed: {resp.status_code}",
-                    "status_code": resp.status_code,
-                    "params": query
-                }
-                client.close()
+    pending = request(None)
+    pages = yielded = 0
+    try:
+        while pending is not None:
+            data = pending.result()
+            pending = None
+            if "error" in data:
+                yield data
                 return
-            break
-
-        data = resp.json()
-        for item in data.get("items", []):
-            yield item
-
-        cursor = data.get("next_cursor")
-        if not (auto_paginate and cursor):
-            break
-
-    client.close()
\ No newline at end of file
+            pages += 1
+            cursor = data.get("next_cursor")
+            if auto_paginate and cursor and (not max_pages or pages < max_pages) and \
+                    (limit is None or yielded + len(data.get("items", [])) < limit):
+                # next page downloads while this one is consumed
+                pending = request(cursor)
+            for item in data.get("items", []):
+                if limit is not None and yielded >= limit:
+                    return
+                yielded += 1
+                yield _project(item, fields)
+            # drop the consumed page before waiting on the next one
+            del data
+    finally:
+        if pending is not None:
+            pending.cancel()
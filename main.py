@@ -12,6 +12,14 @@ if "selected_tools" not in st.session_state:
 if "lite_mode" not in st.session_state:
     st.session_state.lite_mode = False
 
+# adopt the last corpus snapshot and reload the corpus in the background when its files change;
+# once per process, Streamlit reruns of this script are no-ops (CORPUS_WATCH_INTERVAL=0 disables the watcher)
+try:
+    from corpus.watcher import start_watcher
+    start_watcher()
+except Exception as e:
+    print(f"[WARN] Corpus watcher not started: {e}")
+
 def get_tool_catalog():
     """Get tool catalog - imported here to avoid circular imports."""
     try:
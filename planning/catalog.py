@@ -3,11 +3,19 @@ from pathlib import Path
 from typing import List, Dict, Any
 
 # Use centralized import shims
-from import_shims import SlackSearcher, run_chunking, MCPRegistry
+from import_shims import MCPRegistry
 
 
-from app_core import load_json_embeddings, search_json_chunks, search_typesense_ngrams
-from tooling.common_utils import make_docs_url_from_path, make_community_url
+from app_core import search_typesense_ngrams
+from corpus.sources import SOURCE_FILES
+from corpus.unified import get_unified_index
+from corpus.faiss_index import get_faiss_index, DEFAULT_INDEX_TYPE
+from corpus.search import diversify, diversity_pool, fuse_ranked
+from corpus.bm25 import keyword_search
+from corpus.filters import filter_rows, get_metadata_index
+from corpus.slack_sync import SYNC_INTERVAL, last_synced_at
+from tooling.common_utils import SLACK_EXCLUSIONS, make_docs_url_from_path, make_community_url
+from tooling.slack_client import search_slack_ngrams, search_slack_since
 from fathom_module import fathom_api
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -41,8 +49,15 @@ else:
     mcp_client = _NoMCP()
 
 # === File paths for embeddings ===
-DOCS_EMBED_FILE = Path("sources/docs/docs-000.jsonl")
-COMMUNITY_EMBED_FILE = Path("sources/discourse/discourse-000.jsonl")
+DOCS_EMBED_FILE = SOURCE_FILES["docs"]
+COMMUNITY_EMBED_FILE = SOURCE_FILES["community"]
+
+# "exact" scans the unified in-memory index; "faiss" uses the persisted ANN index next to the file
+EMBED_SEARCH_BACKEND = os.getenv("EMBED_SEARCH_BACKEND", "exact").lower()
+# how per-chunk results of a multi-sentence query are combined: "max" (max-sim) or "rrf"
+EMBED_QUERY_FUSION = os.getenv("EMBED_QUERY_FUSION", "max").lower()
+# "group": k distinct docs/topics (best chunk each), "mmr": also diversify by MMR, "none": raw top-k chunks
+EMBED_DIVERSITY = os.getenv("EMBED_DIVERSITY", "group").lower()
 
 # === Helper for Docs & Community ===
 def _search_embeddings_for_source(
@@ -51,14 +66,45 @@ def _search_embeddings_for_source(
     source: str,
     url_formatter=None,
     top_k: int = 5,
+    backend: str = EMBED_SEARCH_BACKEND,
+    index_type: str = DEFAULT_INDEX_TYPE,
+    query_embeddings: List[List[float]] = None,
+    fusion: str = EMBED_QUERY_FUSION,
+    filters: Dict[str, Any] = None,
+    diversity: str = EMBED_DIVERSITY,
 ) -> List[Dict[str, Any]]:
-    chunks = load_json_embeddings(chunks_file)
-    top_chunks = search_json_chunks(query_embedding, chunks, top_k=top_k)
+    queries = query_embeddings or [query_embedding]
+    if backend == "faiss":
+        store, index = get_faiss_index(chunks_file, index_type)
+        pool = top_k if diversity == "none" else diversity_pool(top_k)
+        rows, scores = index.search_rows(queries, top_k=max(pool, 50) if len(queries) > 1 else pool,
+                                         rows=filter_rows(store, filters))
+        rows, scores = fuse_ranked(rows, scores, top_k=pool, method=fusion)
+        if diversity != "none":
+            rows, scores = diversify(
+                rows, scores, top_k, diversity,
+                groups=get_metadata_index(store).groups[rows],
+                vectors=store.exact_rows(rows) if diversity == "mmr" else None,
+                queries=queries,
+            )
+        top_chunks = store.payloads(rows)
+    else:
+        # thin view over the unified index: docs and community share one scoring pass per query
+        index = get_unified_index()
+        hits = index.search_per_source(queries, top_k={source: top_k}, fusion=fusion,
+                                       filters=filters, diversity=diversity)[source]
+        top_chunks = [index.chunk(row)[1] for row, _ in hits]
+    return _format_chunks(top_chunks, source, url_formatter)
+
 
+def _format_chunks(top_chunks: List[Dict[str, Any]], source: str, url_formatter=None) -> List[Dict[str, Any]]:
     results = []
     seen_urls = set()
     for c in top_chunks:
-        if source == "docs":
+        if "url" in c:
+            # precomputed by the compiled corpus
+            url, title = c["url"], c["title"]
+        elif source == "docs":
             url = url_formatter(c["metadata"].get("path", ""))
             title = url
         elif source == "community":
@@ -66,6 +112,10 @@ def _search_embeddings_for_source(
             topic_id = str(c["metadata"].get("topic_id") or "")
             url = url_formatter(slug, topic_id) if url_formatter else None
             title = slug or "Community"
+        elif source == "slack":
+            channel = c["metadata"].get("channel_name")
+            url = c["metadata"].get("permalink")
+            title = f"Slack – #{channel}" if channel else "Slack"
         else:
             url = None
             title = c.get("title") or source
@@ -83,8 +133,82 @@ def _search_embeddings_for_source(
 
     return results
 
+# "bm25" is keyword-only and needs no network; "hybrid" also embeds the query and fuses with RRF
+KEYWORD_SEARCH_MODE = os.getenv("KEYWORD_SEARCH_MODE", "bm25").lower()
+URL_FORMATTERS = {"docs": make_docs_url_from_path, "community": make_community_url}
+
+# planner-facing description of the `filters` arg shared by the corpus search tools
+FILTERS_HELP = (
+    "Optional arg filters narrows the search before scoring: "
+    "{\"path_prefix\": \"./docs/embed\"} (docs section), {\"topic_id\": 376} (community topic), "
+    "{\"ingested_after\": \"2025-06-01\", \"ingested_before\": \"2025-09-01\"}, {\"source\": \"docs\"}."
+)
+
+# === Helper for local keyword search ===
+def _keyword_search_sources(
+    query: str,
+    sources: List[str] = None,
+    top_k: int = 5,
+    mode: str = KEYWORD_SEARCH_MODE,
+    query_embeddings: List[List[float]] = None,
+    filters: Dict[str, Any] = None,
+) -> List[Dict[str, Any]]:
+    results = []
+    for source in sources or list(URL_FORMATTERS):
+        if source not in SOURCE_FILES:
+            continue
+        store, hits = keyword_search(source, query, top_k=top_k, mode=mode,
+                                     query_embeddings=query_embeddings, filters=filters)
+        results.extend(_format_chunks(store.payloads([row for row, _ in hits]), source, URL_FORMATTERS.get(source)))
+    return results
+
+# === Fathom ===
+# evidence.flatten_for_synth summarizes at most 10 meetings, from these fields
+FATHOM_MEETING_LIMIT = 10
+FATHOM_MEETING_FIELDS = (
+    "meeting_title", "title", "meeting_type", "created_at", "url", "share_url",
+    "recording_id", "default_summary", "action_items",
+)
+
 # === Slack token ===
 SLACK_TOKEN = os.getenv("SLACK_API_KEY")
+# seconds the live top-up of slack_local_search may add to a tool call
+SLACK_LIVE_TIMEOUT = float(os.getenv("SLACK_LIVE_TIMEOUT", "3"))
+
+# === Helper for the local Slack index ===
+def _slack_local_search(
+    query: str,
+    ngrams: List[str] = None,
+    top_k: int = 5,
+    mode: str = KEYWORD_SEARCH_MODE,
+    query_embeddings: List[List[float]] = None,
+    live: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Local index of synced channels (corpus/slack_sync.py). With `live`, plus
+    live results posted since the last sync, only when that sync is overdue
+    and only what returns within SLACK_LIVE_TIMEOUT.
+    """
+    store, hits = keyword_search("slack", query, top_k=top_k, mode=mode, query_embeddings=query_embeddings)
+    results = _format_chunks(store.payloads([row for row, _ in hits]), "slack")
+    if not (live and SLACK_TOKEN and ngrams):
+        return results
+
+    seen = {r["url"] for r in results}
+    gap = search_slack_since(SLACK_TOKEN, ngrams, last_synced_at(), exclusions=SLACK_EXCLUSIONS, result_limit=top_k,
+                             fresh_for=SYNC_INTERVAL, timeout=SLACK_LIVE_TIMEOUT)
+    for r in gap:
+        meta = r.get("metadata", {}) or {}
+        if meta.get("permalink") in seen:
+            continue
+        channel = meta.get("channel_name")
+        results.append({
+            "text": r.get("text", ""),
+            "source": "slack",
+            "url": meta.get("permalink"),
+            "title": f"Slack – #{channel}" if channel else "Slack",
+        })
+    return results
 
 # === Main tool catalog (unwrapped) ===
 tool_catalog = {
@@ -102,22 +226,43 @@ tool_catalog = {
                     "source": "slack",
                     "url": (r.get("metadata", {}) or {}).get("permalink")
                 }
-                for ng in args["ngrams"]
-                for r in SlackSearcher(
-                    slack_token=SLACK_TOKEN,
+                for r in search_slack_ngrams(
+                    SLACK_TOKEN,
+                    args["ngrams"],
+                    exclusions=SLACK_EXCLUSIONS,
                     result_limit=args.get("limit", 5),
                     thread_limit=args.get("thread_limit", 5)
-                ).search(ng)
+                )
             ],
             "preview": f"slack:{args.get('query','')[:60]}"
         }
     },
 
+    # Local Slack index (synced by corpus/slack_sync.py; optional live API top-up for the gap since an overdue sync)
+    "slack_local_search": {
+        "name": "Slack (local index)",
+        "category": "Communication",
+        "description": "Fast local keyword (BM25) search over synced Slack channels. Same content as slack_search at a fraction of the latency and without Slack rate limits; prefer it unless the question is about something from the last few minutes. Args: query, optional mode (\"bm25\" or \"hybrid\"), top_k, live (true = also fetch live Slack results posted since the last sync, when that sync is overdue; a few seconds at most).",
+        "produces": "docs",
+        "run": lambda args, qa=None: {
+            "kind": "docs",
+            "value": _slack_local_search(
+                query=args.get("query", ""),
+                ngrams=args.get("ngrams"),
+                top_k=args.get("top_k", 5),
+                mode=args.get("mode", KEYWORD_SEARCH_MODE),
+                query_embeddings=args.get("query_embeddings"),
+                live=args.get("live", False),
+            ),
+            "preview": f"slack_local:{args.get('query','')[:60]}",
+        },
+    },
+
     # Docs embedding search
     "docs_embed_search": {
         "name": "Docs-semantic",
         "category": "Documentation",
-        "description": "Semantic search over embedded Omni Docs JSON chunks. Best for official processes, product architecture and features, deployment guides.",
+        "description": "Semantic search over embedded Omni Docs JSON chunks. Best for official processes, product architecture and features, deployment guides. " + FILTERS_HELP,
         "produces": "docs",
         "run": lambda args, qa=None: {
             "kind": "docs",
@@ -127,6 +272,12 @@ tool_catalog = {
                 source="docs",
                 url_formatter=make_docs_url_from_path,
                 top_k=args.get("top_k", 5),
+                backend=args.get("backend", EMBED_SEARCH_BACKEND),
+                index_type=args.get("index_type", DEFAULT_INDEX_TYPE),
+                query_embeddings=args.get("query_embeddings"),
+                fusion=args.get("fusion", EMBED_QUERY_FUSION),
+                filters=args.get("filters"),
+                diversity=args.get("diversity", EMBED_DIVERSITY),
             ),
             "preview": "docs_embed:ok",
         },
@@ -136,7 +287,7 @@ tool_catalog = {
     "community_embed_search": {
         "name": "Community-semantic",
         "category": "Documentation",
-        "description": "Semantic search over embedded Community (Discourse) JSON chunks. Contains articles covering best practices, how-tos, common patterns and workflows.",
+        "description": "Semantic search over embedded Community (Discourse) JSON chunks. Contains articles covering best practices, how-tos, common patterns and workflows. " + FILTERS_HELP,
         "produces": "docs",
         "run": lambda args, qa=None: {
             "kind": "docs",
@@ -146,11 +297,37 @@ tool_catalog = {
                 source="community",
                 url_formatter=make_community_url,
                 top_k=args.get("top_k", 5),
+                backend=args.get("backend", EMBED_SEARCH_BACKEND),
+                index_type=args.get("index_type", DEFAULT_INDEX_TYPE),
+                query_embeddings=args.get("query_embeddings"),
+                fusion=args.get("fusion", EMBED_QUERY_FUSION),
+                filters=args.get("filters"),
+                diversity=args.get("diversity", EMBED_DIVERSITY),
             ),
             "preview": "community_embed:ok",
         },
     },
 
+    # Local BM25 / hybrid keyword search over the embedded corpora
+    "keyword_search": {
+        "name": "Docs & Community keyword",
+        "category": "Documentation",
+        "description": "Fast local keyword (BM25) search over the embedded Omni Docs and Community chunks. Best for exact terms: function names, YAML/model keys, error messages, setting names. Args: query, optional sources ([\"docs\", \"community\"]), mode (\"bm25\" or \"hybrid\" to also fuse semantic results), top_k. " + FILTERS_HELP,
+        "produces": "docs",
+        "run": lambda args, qa=None: {
+            "kind": "docs",
+            "value": _keyword_search_sources(
+                query=args.get("query", ""),
+                sources=args.get("sources"),
+                top_k=args.get("top_k", 5),
+                mode=args.get("mode", KEYWORD_SEARCH_MODE),
+                query_embeddings=args.get("query_embeddings"),
+                filters=args.get("filters"),
+            ),
+            "preview": f"keyword:{args.get('query','')[:60]}",
+        },
+    },
+
     # Typesense keyword search (uses ngrams; fetches live content for top results)
     "typesense_search": {
         "name": "docs.omni.co websearch",
@@ -214,7 +391,12 @@ tool_catalog = {
             "kind": "json",
             "value": meetings,
             "preview": f"fathom meetings: {len(meetings)} found"
-        })(list(fathom_api.list_meetings(params=args.get("params", {}))))
+        })(list(fathom_api.list_meetings(
+            # transcripts are never shown to synthesis; don't download them
+            params={k: v for k, v in args.get("params", {}).items() if k != "include_transcript"},
+            limit=args.get("limit", FATHOM_MEETING_LIMIT),
+            fields=FATHOM_MEETING_FIELDS,
+        )))
     }
 }
 
@@ -223,10 +405,12 @@ TOOL_CATEGORIES = {
     "Documentation": [
         "typesense_search",
         "docs_embed_search", 
-        "community_embed_search"
+        "community_embed_search",
+        "keyword_search"
     ],
     "Communication": [
         "slack_search",
+        "slack_local_search",
         "fathom_list_meetings"
     ],
     "Data & Analytics": [
@@ -1,6 +1,7 @@
-from planning.catalog import tool_catalog as BASE_CATALOG
+from planning.catalog import tool_catalog as BASE_CATALOG, KEYWORD_SEARCH_MODE
 from tooling.decorators import (
     needs_ngrams,
+    needs_query,
     needs_embedding,
     with_slack_exclusions,
     gated_by_is_metric,
@@ -100,12 +101,31 @@ def build_wrapped_catalog(is_metric_fn, mode="direct"):
         elif k == "typesense_search":
             run = wrap_tool(run, needs_ngrams)
 
+        elif k == "slack_local_search":
+            # ngrams only feed the live top-up; only hybrid mode pays for the query embedding
+            def run_slack_local(args, qa=None, _orig=run):
+                wrappers = []
+                if args.get("mode", KEYWORD_SEARCH_MODE) == "hybrid":
+                    wrappers.append(needs_embedding)
+                if args.get("live"):
+                    wrappers.append(needs_ngrams)
+                return wrap_tool(_orig, *wrappers)(args, qa=qa)
+            run = wrap_tool(run_slack_local, needs_query)
+
         elif k == "docs_embed_search":
             run = wrap_tool(run, needs_embedding)
 
         elif k == "community_embed_search":
             run = wrap_tool(run, needs_embedding)
 
+        elif k == "keyword_search":
+            # only hybrid mode pays for the query embedding
+            def run_keyword(args, qa=None, _orig=run):
+                if args.get("mode", KEYWORD_SEARCH_MODE) == "hybrid":
+                    return needs_embedding(_orig)(args, qa=qa)
+                return _orig(args, qa=qa)
+            run = wrap_tool(run_keyword, needs_query)
+
         elif k == "mcp_query":
             if mode == "direct":
                 # Only gate MCP in direct mode
@@ -0,0 +1,94 @@
+# tests/conftest.py
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from corpus import bm25, compiled, faiss_index, filters, store, unified
+from tooling import page_cache, slack_client
+
+
+@pytest.fixture
+def pages(tmp_path, monkeypatch):
+    """Empty page caches: a fresh memory LRU and a sqlite file under tmp_path."""
+    page_cache.PAGES.clear()
+    monkeypatch.setattr(page_cache, "_DISK", page_cache.DiskPageCache(tmp_path / "pages.sqlite"))
+    yield page_cache
+    page_cache.PAGES.clear()
+
+
+@pytest.fixture
+def slack(monkeypatch):
+    """
+    Fake SlackSearcher. `slack.calls` records every query; a query returns
+    `slack.hits[terms]` when set, else result_limit hits named after its terms.
+    """
+    fake = SimpleNamespace(calls=[], hits={})
+
+    class FakeSearcher:
+        def __init__(self, slack_token=None, result_limit=3, thread_limit=5):
+            self.result_limit = result_limit
+
+        def search(self, query):
+            fake.calls.append(query)
+            terms = query.split(" -")[0].split(" after:")[0]
+            if terms in fake.hits:
+                return fake.hits[terms]
+            return [{"text": f"{terms} hit {i}", "metadata": {"permalink": f"https://x/{terms}/{i}"}}
+                    for i in range(self.result_limit)]
+
+    monkeypatch.setattr(slack_client, "SlackSearcher", FakeSearcher)
+    monkeypatch.setattr(slack_client, "_CLIENTS", {})
+    return fake
+
+
+def _reset_corpus():
+    unified.publish_unified(None)
+    unified.seed_unified(None)
+    store.publish_stores({})
+    store.clear_stores()
+    for module in (bm25, filters, faiss_index):
+        module._INDEXES.clear()
+    compiled._CURRENT = None
+
+
+class Corpus:
+    """Writes JSONL shards at the relative SOURCE_FILES paths under a temporary working directory."""
+
+    dirs = {"docs": "sources/docs/docs", "community": "sources/discourse/discourse", "slack": "sources/slack/slack"}
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    @staticmethod
+    def reset():
+        """Forget every resident store and index, as in a fresh process."""
+        _reset_corpus()
+
+    def write(self, source, rows, shard=0):
+        """
+        Replace one shard atomically. `rows` are (id, text, embedding) or
+        full chunk dicts; returns the shard path.
+        """
+        path = Path(f"{self.dirs[source]}-{shard:03d}.jsonl")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            for row in rows:
+                if not isinstance(row, dict):
+                    chunk_id, text, emb = row
+                    row = {"id": chunk_id, "chunk_text": text, "embedding": list(map(float, emb))}
+                f.write(json.dumps(row) + "\n")
+        os.replace(tmp, path)
+        return path
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """Empty working directory for the relative corpus paths; every corpus registry is reset around the test."""
+    monkeypatch.chdir(tmp_path)
+    _reset_corpus()
+    yield Corpus(tmp_path)
+    _reset_corpus()
@@ -0,0 +1,66 @@
+# tests/test_bm25.py
+import pytest
+
+from corpus import bm25
+from corpus.store import get_store, publish_stores, resolve_store
+from corpus.sources import SOURCE_FILES
+from corpus.unified import get_unified_index, publish_unified
+
+DOCS = [
+    ("d1", "Configure the sql_expression dimension", [1, 0, 0]),
+    ("d2", "Row level security for embedded dashboards", [0, 1, 0]),
+    ("d3", "Caching dashboards and fetchRows", [0, 0, 1]),
+]
+
+
+@pytest.fixture
+def docs(corpus):
+    corpus.write("docs", DOCS)
+    corpus.write("community", [("c1", "community post", [1, 1, 0])])
+    corpus.write("slack", [])
+    return corpus
+
+
+def test_tokenize_keeps_identifiers_whole_and_split():
+    assert bm25.tokenize("sql_expression fetchRows") == ["sql_expression", "sql", "expression",
+                                                         "fetchrows", "fetch", "rows"]
+
+
+def test_scores_only_matching_rows():
+    index = bm25.build_bm25(["embed dashboards", "row level security", "dashboards dashboards caching"])
+    rows, scores = index.search_rows("dashboards", top_k=5)
+    assert sorted(rows.tolist()) == [0, 2]
+    assert (scores > 0).all()
+    assert index.search_rows("nothing", top_k=5)[0].size == 0
+    assert index.search_rows("dashboards", top_k=5, rows=index.search_rows("caching")[0])[0].tolist() == [2]
+
+
+def test_keyword_search_matches_identifier_parts(docs):
+    store, hits = bm25.keyword_search("docs", "expression")
+    assert [store.payload(r)["id"] for r, _ in hits] == ["d1"]
+
+
+def test_unknown_mode_is_rejected(docs):
+    with pytest.raises(ValueError):
+        bm25.keyword_search("docs", "x", mode="fuzzy")
+
+
+def test_hybrid_fuses_keyword_and_dense_rankings(docs):
+    store, hits = bm25.keyword_search("docs", "dashboards", mode="hybrid", query_embeddings=[[0, 0, 1]])
+    ids = [store.payload(r)["id"] for r, _ in hits]
+    # d3 is first in both rankings; d2 only matches the keyword
+    assert ids[0] == "d3" and "d2" in ids
+
+
+def test_hybrid_reads_one_generation_during_a_swap(docs):
+    old = get_unified_index()
+    publish_unified(old)
+    # a newer docs store is already served by get_store while the old unified index is still live
+    docs.write("docs", [("n1", "brand new dashboards", [0, 0, 1])] + DOCS)
+    publish_stores({SOURCE_FILES["docs"]: resolve_store(SOURCE_FILES["docs"])})
+    assert get_store(SOURCE_FILES["docs"]) is not old.stores["docs"]
+
+    store, hits = bm25.keyword_search("docs", "dashboards", mode="hybrid", query_embeddings=[[0, 0, 1]])
+    assert store is old.stores["docs"]
+    ids = [store.payload(r)["id"] for r, _ in hits]
+    assert ids[0] == "d3" and set(ids) == {"d1", "d2", "d3"}
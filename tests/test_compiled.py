@@ -0,0 +1,93 @@
+# tests/test_compiled.py
+import json
+
+import numpy as np
+import pytest
+
+from corpus import bm25, compiled
+from corpus.filters import filter_rows
+from corpus.sources import SOURCE_FILES
+from corpus.store import get_store, load_store
+from corpus.unified import get_unified_index
+
+DOCS = SOURCE_FILES["docs"]
+
+
+def doc(i, text, emb):
+    return {"id": f"d{i}", "chunk_text": text, "metadata": {"path": f"./docs/page-{i}.md"}, "embedding": emb}
+
+
+@pytest.fixture
+def sources(corpus):
+    corpus.write("docs", [doc(0, "alpha é", [1, 0]), doc(1, "beta", [0, 1])])
+    corpus.write("community", [{"id": "c0", "chunk_text": "post", "embedding": [1, 1],
+                                "metadata": {"slug": "a-topic", "topic_id": 7}}])
+    corpus.write("slack", [])
+    return corpus
+
+
+def test_compiled_store_serves_the_same_chunks(sources):
+    jsonl = load_store(DOCS)
+    root = compiled.compile_corpus()
+    assert compiled.current_version() == root.name
+
+    s = get_store(DOCS)
+    assert s.compiled is not None and isinstance(s.compiled.vectors, np.memmap)
+    assert s.digest == jsonl.digest and np.allclose(s.matrix, jsonl.matrix)
+    for row in range(len(s)):
+        payload = s.payload(row)
+        assert {k: payload[k] for k in jsonl.payload(row)} == jsonl.payload(row)
+    assert payload["url"]
+
+
+def test_unified_index_maps_the_compiled_matrix(sources):
+    compiled.compile_corpus()
+    index = get_unified_index()
+    assert index.matrix is compiled.get_compiled().matrix
+    assert index.chunk(2)[1]["title"] == "a-topic"
+
+
+def test_stale_compiled_corpus_falls_back_to_jsonl(sources, capsys):
+    compiled.compile_corpus()
+    sources.write("docs", [doc(0, "alpha, edited", [1, 0])])
+    s = get_store(DOCS)
+    assert s.compiled is None and s.payload(0)["chunk_text"] == "alpha, edited"
+    assert "Compiled corpus is stale for 'docs'" in capsys.readouterr().out
+
+
+def test_recompiling_flips_current(sources):
+    first = compiled.compile_corpus()
+    assert compiled.compile_corpus() == first    # same corpus, same version
+    old = compiled.get_compiled()
+    sources.write("docs", [doc(0, "alpha", [1, 0])])
+    second = compiled.compile_corpus()
+    assert second != first
+    reopened = compiled.get_compiled()
+    assert reopened is not old and reopened.root == second
+    assert len(get_store(DOCS)) == 1
+
+
+def test_quantized_codes_are_stored(sources):
+    root = compiled.compile_corpus(dtype="int8")
+    corpus = compiled.open_compiled(root, "int8")
+    assert corpus.matrix.dtype == np.int8 and corpus.scales is not None
+    assert corpus.vectors.dtype == np.float32
+
+
+def test_filters_and_bm25_read_the_string_columns(sources, monkeypatch):
+    compiled.compile_corpus()
+    s = get_store(DOCS)
+    monkeypatch.setattr(compiled.json, "loads", lambda *a: pytest.fail("JSON decoded"))
+    assert s.metadata_fields(1) == {"source": "", "path": "./docs/page-1.md", "topic_id": "", "ingested_at": ""}
+    assert list(filter_rows(s, {"path_prefix": "./docs/page-1"})) == [1]
+    assert bm25.keyword_search("docs", "beta")[1][0][0] == 1
+    community = get_store(SOURCE_FILES["community"])
+    assert list(filter_rows(community, {"topic_id": 7})) == [0]
+
+
+def test_format_change_compiles_a_new_version(sources, monkeypatch):
+    root = compiled.compile_corpus()
+    monkeypatch.setattr(compiled, "FORMAT_VERSION", compiled.FORMAT_VERSION + 1)
+    new = compiled.compile_corpus()
+    assert new != root and json.loads((new / "meta.json").read_text())["format"] == compiled.FORMAT_VERSION
+    assert compiled.get_compiled().root == new
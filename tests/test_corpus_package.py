@@ -0,0 +1,24 @@
+# tests/test_corpus_package.py
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+JOBS = ("compiled", "snapshot", "ingest", "faiss_index", "reduce", "slack_sync")
+
+
+@pytest.mark.parametrize("job", JOBS)
+def test_job_runs_as_module_without_double_import(job):
+    proc = subprocess.run([sys.executable, "-W", "error::RuntimeWarning", "-m", f"corpus.{job}", "--help"],
+                          capture_output=True, text=True, cwd=ROOT)
+    assert proc.returncode == 0, proc.stderr
+    assert "RuntimeWarning" not in proc.stderr
+
+
+def test_package_import_loads_no_submodule():
+    code = "import sys, corpus; print(sorted(m for m in sys.modules if m.startswith(('corpus.', 'faiss'))))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT).stdout
+    assert out.strip() == "[]"
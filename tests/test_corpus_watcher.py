@@ -0,0 +1,224 @@
+# tests/test_corpus_watcher.py
+import os
+import time
+
+import pytest
+
+from corpus import snapshot, watcher
+from corpus.unified import get_unified_index, resident_unified
+
+
+def write_corpus(corpus, docs_text="alpha"):
+    corpus.write("docs", [("d1", docs_text, [1, 0, 0]), ("d2", "beta", [0, 1, 0])])
+    corpus.write("community", [("c1", "gamma", [0, 0, 1])])
+    corpus.write("slack", [("s1", "delta", [1, 1, 0])])
+
+
+@pytest.fixture
+def saves(monkeypatch):
+    calls = []
+    monkeypatch.setattr(watcher, "save_snapshot", lambda unified, **kw: calls.append((unified, kw)))
+    return calls
+
+
+def test_stable_corpus_is_snapshotted_when_caches_change(corpus, saves, monkeypatch):
+    from corpus.cache import LRUCache
+
+    cache = LRUCache(8)
+    monkeypatch.setattr(snapshot, "_CACHES", {})
+    snapshot.register_cache("embeds", cache.items, cache.update, cache.version)
+    write_corpus(corpus)
+    w = watcher.CorpusWatcher(interval=0, snapshot_interval=60)
+    assert w.check_now()
+    assert w.current.version == 1
+    w._snapshot(force=True)
+    assert saves == []                             # what the process started with is not re-saved
+
+    cache.put("q", [0.1, 0.2])
+    w._snapshot()
+    assert saves == []                             # not due yet
+    w._next_snapshot = 0
+    w._snapshot()
+    assert saves == [(w.current.unified, {"if_changed": True})]
+    w._next_snapshot = 0
+    w._snapshot()
+    assert len(saves) == 1                         # nothing changed since
+
+    cache.put("r", [0.3, 0.4])
+    w.stop()                                       # saved on the way out
+    assert len(saves) == 2
+
+
+def test_hot_swap_is_snapshotted(corpus, saves):
+    write_corpus(corpus)
+    w = watcher.CorpusWatcher(interval=0)
+    w.check_now()
+    first = w.current
+
+    assert not w.check_now()                       # nothing changed on disk
+    corpus.write("docs", [("d1", "alpha v2", [1, 0, 0]), ("d2", "beta", [0, 1, 0])])
+    assert w.check_now()
+    gen = w.current
+    assert gen.version == 2 and gen.unified.digests != first.unified.digests
+    assert get_unified_index() is gen.unified      # published without touching the disk
+    w._snapshot(force=True)
+    assert saves == [(gen.unified, {"if_changed": True})]
+    w.stop()
+
+
+def test_touched_shards_keep_the_generation(corpus, saves):
+    write_corpus(corpus)
+    w = watcher.CorpusWatcher(interval=0)
+    w.check_now()
+    path = corpus.write("docs", [("d1", "alpha", [1, 0, 0]), ("d2", "beta", [0, 1, 0])])
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    assert not w.check_now()
+    assert w.current.version == 1
+    w.stop()
+
+
+def test_running_watcher_swaps_in_a_changed_corpus(corpus, saves):
+    write_corpus(corpus)
+    w = watcher.CorpusWatcher(interval=0.02).start()
+    try:
+        deadline = time.time() + 5
+        while w.current is None and time.time() < deadline:
+            time.sleep(0.01)
+        corpus.write("slack", [("s1", "delta", [1, 1, 0]), ("s2", "epsilon", [0, 1, 1])])
+        while w.current.version < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert w.current.version == 2 and len(get_unified_index()) == 5
+    finally:
+        w.stop()
+    assert w.current is None and resident_unified() is None   # stop() unpublishes
+
+
+def test_queries_on_the_old_generation_keep_working(corpus, saves):
+    write_corpus(corpus)
+    w = watcher.CorpusWatcher(interval=0)
+    w.check_now()
+    old = get_unified_index()
+    corpus.write("docs", [("d9", "replaced", [0, 1, 0])])
+    w.check_now()
+    assert get_unified_index() is not old
+    assert old.chunk(0)[1]["chunk_text"] == "alpha"
+    assert old.search_per_source([1, 0, 0], top_k={"docs": 1})["docs"][0][0] == 0
+    w.stop()
+
+
+def test_failed_reload_keeps_the_last_generation(corpus, saves, monkeypatch):
+    write_corpus(corpus)
+    w = watcher.CorpusWatcher(interval=0)
+    w.check_now()
+    live = get_unified_index()
+    corpus.write("docs", [("d1", "changed", [1, 0, 0])])
+    monkeypatch.setattr(watcher, "build_unified", lambda stores: (_ for _ in ()).throw(RuntimeError("boom")))
+    with pytest.raises(RuntimeError):
+        w.check_now()
+    assert w.current.version == 1 and get_unified_index() is live
+    w.stop()
+
+
+def test_start_watcher_restores_and_starts_once(monkeypatch):
+    restores = []
+    monkeypatch.setattr(watcher, "_STARTED", False)
+    monkeypatch.setattr(watcher, "_WATCHER", None)
+    monkeypatch.setattr(watcher, "restore_snapshot", lambda: restores.append(1))
+    assert watcher.start_watcher(interval=0) is None
+    assert watcher.start_watcher(interval=0) is None
+    assert restores == [1]
+
+
+# -------- Snapshots --------
+def test_snapshot_restores_a_matching_corpus(corpus):
+    write_corpus(corpus)
+    index = get_unified_index()
+    root = snapshot.save_snapshot(index)
+    assert (root.parent / "CURRENT").read_text() == root.name
+
+    corpus.reset()
+    assert snapshot.restore_snapshot()
+    restored = resident_unified()
+    assert restored.digests == index.digests
+    assert restored.stores["docs"].payload(0)["chunk_text"] == "alpha"
+
+
+def test_snapshot_is_rejected_after_a_corpus_change(corpus, capsys):
+    write_corpus(corpus)
+    snapshot.save_snapshot(get_unified_index())
+    corpus.write("docs", [("d1", "changed", [1, 0, 0])])
+    assert not snapshot.restore_snapshot()
+    assert "corpus changed for 'docs'" in capsys.readouterr().out
+
+
+def test_unchanged_corpus_is_not_saved_twice(corpus):
+    write_corpus(corpus)
+    index = get_unified_index()
+    first = snapshot.save_snapshot(index, if_changed=True)
+    assert snapshot.save_snapshot(index, if_changed=True) == first
+    assert [p.name for p in first.parent.iterdir() if p.is_dir()] == [first.name]
+
+
+
+def test_changed_caches_or_new_indexes_are_saved(corpus, monkeypatch):
+    from corpus import bm25
+
+    cache = {}
+    monkeypatch.setattr(snapshot, "_CACHES", {})
+    snapshot.register_cache("embeds", lambda: dict(cache), cache.update)
+    write_corpus(corpus)
+    index = get_unified_index()
+    first = snapshot.save_snapshot(index, if_changed=True)
+    cache["q"] = [0.1]
+    second = snapshot.save_snapshot(index, if_changed=True)
+    assert second != first
+    assert snapshot.save_snapshot(index, if_changed=True) == second
+    bm25.bm25_for_store(index.stores["docs"])
+    third = snapshot.save_snapshot(index, if_changed=True)
+    assert third != second and (third / "bm25" / "docs").is_dir()
+
+def test_prune_keeps_recently_superseded_versions(tmp_path):
+    out = tmp_path / "snap"
+    old = time.time() - snapshot.PRUNE_GRACE - 60
+    for name in ("v1", "v2", "v3", "v4"):
+        (out / name).mkdir(parents=True)
+        os.utime(out / name, (old, old))
+    (out / "CURRENT").write_text("v4")
+    os.utime(out / "v2")                          # superseded a moment ago
+    snapshot._prune_versions(out, keep="v4")
+    assert sorted(p.name for p in out.iterdir() if p.is_dir()) == ["v2", "v3", "v4"]
+
+
+def test_snapshot_carries_indexes_and_caches(corpus, monkeypatch):
+    from corpus import bm25
+
+    write_corpus(corpus)
+    index = get_unified_index()
+    bm25.bm25_for_store(index.stores["docs"])
+    cache = {"q": [0.1, 0.2]}
+    monkeypatch.setattr(snapshot, "_CACHES", {})
+    monkeypatch.setattr(snapshot, "_PENDING", {})
+    snapshot.register_cache("embeds", lambda: dict(cache), cache.update)
+    root = snapshot.save_snapshot(index)
+    assert (root / "bm25" / "docs" / "vocab.json").exists()
+
+    corpus.reset()
+    snapshot._CACHES.clear()
+    cache.clear()
+    assert snapshot.restore_snapshot()
+    restored = resident_unified().stores["docs"]
+    assert bm25._INDEXES.peek(str(restored.path), restored.digest) is not None
+    # a cache registered after the restore still gets its entries
+    assert cache == {}
+    snapshot.register_cache("embeds", lambda: dict(cache), cache.update)
+    assert cache == {"q": [0.1, 0.2]}
+
+
+def test_unchanged_sections_are_hard_linked(corpus):
+    write_corpus(corpus)
+    first = snapshot.save_snapshot(get_unified_index())
+    corpus.write("slack", [("s1", "delta", [1, 1, 0]), ("s2", "new", [0, 1, 1])])
+    second = snapshot.save_snapshot(get_unified_index())
+    docs_uids = "stores/docs/uids.npy"
+    assert os.stat(first / docs_uids).st_ino == os.stat(second / docs_uids).st_ino
+    assert os.stat(first / "stores/slack/uids.npy").st_ino != os.stat(second / "stores/slack/uids.npy").st_ino
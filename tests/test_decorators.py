@@ -0,0 +1,21 @@
+# tests/test_decorators.py
+import pytest
+
+pytest.importorskip("streamlit")  # tooling.query_artifacts imports it
+
+from tooling.decorators import needs_query
+from tooling.query_artifacts import LazyQueryArtifacts
+
+
+def echo(args, qa=None):
+    return args["query"]
+
+
+def test_missing_query_defaults_to_the_question():
+    qa = LazyQueryArtifacts("how do I embed a dashboard?")
+    assert needs_query(echo)({}, qa=qa) == "how do I embed a dashboard?"
+    assert needs_query(echo)({"query": ""}, qa=qa) == "how do I embed a dashboard?"
+
+
+def test_explicit_query_wins():
+    assert needs_query(echo)({"query": "sql_expression"}, qa=LazyQueryArtifacts("other")) == "sql_expression"
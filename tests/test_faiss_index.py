@@ -0,0 +1,71 @@
+# tests/test_faiss_index.py
+import numpy as np
+import pytest
+
+from corpus import faiss_index
+from corpus.sources import SOURCE_FILES
+from corpus.store import chunk_uid, get_store
+
+DOCS = SOURCE_FILES["docs"]
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(1).normal(size=(200, 8))
+
+
+@pytest.fixture
+def docs(corpus, vectors):
+    corpus.write("docs", [(f"d{i}", f"chunk {i}", v) for i, v in enumerate(vectors)])
+    return corpus
+
+
+@pytest.mark.parametrize("index_type", faiss_index.INDEX_TYPES)
+def test_index_finds_the_exact_best_row(docs, vectors, index_type):
+    store, idx = faiss_index.get_faiss_index(DOCS, index_type)
+    rows, scores = idx.search_rows(vectors[:5], top_k=3)
+    assert rows.shape == (5, 3)
+    assert rows[:, 0].tolist() == [0, 1, 2, 3, 4]
+    assert np.allclose(scores[:, 0], 1.0, atol=1e-5)
+    assert (scores[:, :-1] >= scores[:, 1:]).all()
+
+
+def test_index_is_saved_and_reused_while_the_digest_matches(docs, monkeypatch):
+    store = get_store(DOCS)
+    faiss_index.load_or_build(store, "flat")
+    idx_path, meta_path = faiss_index.index_paths(DOCS, "flat")
+    assert idx_path.exists() and meta_path.exists()
+
+    monkeypatch.setattr(faiss_index, "build_index", lambda *a, **k: pytest.fail("rebuilt"))
+    assert faiss_index.load_or_build(store, "flat").index.ntotal == len(store)
+
+
+def test_index_is_rebuilt_after_a_corpus_change(docs, vectors):
+    faiss_index.get_faiss_index(DOCS, "flat")
+    docs.write("docs", [(f"d{i}", f"chunk {i}", v) for i, v in enumerate(vectors[:50])])
+    store, idx = faiss_index.get_faiss_index(DOCS, "flat")
+    assert idx.digest == store.digest and idx.index.ntotal == 50
+
+
+def test_patch_saved_indexes(docs, vectors):
+    store = get_store(DOCS)
+    for index_type in ("flat", "hnsw"):
+        faiss_index.load_or_build(store, index_type)
+    added = np.asarray(vectors[:1] / np.linalg.norm(vectors[:1]), dtype=np.float32)
+    status = faiss_index.patch_saved_indexes(DOCS, store.digest, "new", np.array([chunk_uid("d0")]),
+                                             added, np.array([chunk_uid("new")]))
+    # HNSW cannot delete, so it is dropped and rebuilt on next use
+    assert status == {"flat": "patched", "hnsw": "dropped"}
+    assert faiss_index._read_saved(DOCS, "flat", "new").ntotal == len(store)
+    assert not faiss_index.index_paths(DOCS, "hnsw")[0].exists()
+
+
+def test_filtered_search_only_visits_allowed_rows(docs, vectors):
+    allowed = np.array([10, 20, 30])
+    for index_type in faiss_index.INDEX_TYPES:
+        _, idx = faiss_index.get_faiss_index(DOCS, index_type)
+        rows, scores = idx.search_rows(vectors[:2], top_k=5, rows=allowed)
+        found = rows[rows >= 0]
+        assert set(found.tolist()) <= set(allowed.tolist()), index_type
+        assert rows.shape[1] == 3
+    assert idx.search_rows(vectors[:1], top_k=5, rows=np.array([], dtype=np.int64))[0].shape == (1, 0)
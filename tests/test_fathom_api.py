@@ -0,0 +1,107 @@
+# tests/test_fathom_api.py
+import importlib
+import threading
+import time
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def fathom(monkeypatch):
+    """fathom_api on a mock transport serving `fathom.pages` (cursor -> page); `fathom.requests` logs each query."""
+    monkeypatch.setenv("FATHOM_API_KEY", "test-key")
+    api = importlib.import_module("fathom_module.fathom_api")
+    api.requests, api.pages, api.failures = [], {}, []
+    lock = threading.Lock()
+
+    def handler(request):
+        assert request.headers["X-Api-Key"] == "test-key"
+        params = request.url.params
+        with lock:
+            api.requests.append(params)
+            if api.failures:
+                return httpx.Response(api.failures.pop(0))
+        return httpx.Response(200, json=api.pages[params.get("cursor")])
+
+    client = httpx.Client(headers={"X-Api-Key": "test-key"}, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(api, "_CLIENT", client)
+    monkeypatch.setattr(api.time, "sleep", lambda s: None)
+    yield api
+    client.close()
+
+
+def paged(n_pages, per_page=2):
+    pages = {}
+    for p in range(n_pages):
+        items = [{"recording_id": p * per_page + i, "meeting_title": f"m{p * per_page + i}", "transcript": "…"}
+                 for i in range(per_page)]
+        pages[f"c{p}" if p else None] = {"items": items, "next_cursor": f"c{p + 1}" if p + 1 < n_pages else None}
+    return pages
+
+
+def test_follows_cursors_and_sends_array_params(fathom):
+    fathom.pages = paged(3)
+    meetings = list(fathom.list_meetings({"calendar_invitees_domains": ["a.com", "b.com"], "include_summary": True}))
+    assert [m["recording_id"] for m in meetings] == list(range(6))
+    assert [q.get("cursor") for q in fathom.requests] == [None, "c1", "c2"]
+    assert fathom.requests[0].get_list("calendar_invitees_domains[]") == ["a.com", "b.com"]
+
+
+def test_limit_stops_fetching_early(fathom):
+    fathom.pages = paged(5)
+    meetings = list(fathom.list_meetings(limit=3))
+    assert [m["recording_id"] for m in meetings] == [0, 1, 2]
+    # page 2 was needed; nothing past it was requested
+    assert [q.get("cursor") for q in fathom.requests] == [None, "c1"]
+
+    fathom.requests.clear()
+    assert len(list(fathom.list_meetings(limit=2))) == 2
+    assert len(fathom.requests) == 1
+
+
+def test_max_pages_and_auto_paginate(fathom, monkeypatch):
+    fathom.pages = paged(5)
+    assert len(list(fathom.list_meetings(max_pages=2))) == 4
+    assert len(fathom.requests) == 2
+
+    fathom.requests.clear()
+    monkeypatch.setattr(fathom, "FATHOM_MAX_PAGES", 3)
+    assert len(list(fathom.list_meetings())) == 6
+    fathom.requests.clear()
+    assert len(list(fathom.list_meetings(max_pages=0))) == 10
+    fathom.requests.clear()
+    assert len(list(fathom.list_meetings(auto_paginate=False))) == 2 and len(fathom.requests) == 1
+
+
+def test_fields_are_projected(fathom):
+    fathom.pages = paged(1)
+    meetings = list(fathom.list_meetings(fields=["recording_id", "missing"]))
+    assert meetings == [{"recording_id": 0}, {"recording_id": 1}]
+
+
+def test_retries_then_reports_errors(fathom, capsys):
+    fathom.pages = paged(1)
+    fathom.failures = [429, 503]
+    assert len(list(fathom.list_meetings())) == 2
+    assert "Retrying in 1s after 429" in capsys.readouterr().out
+
+    fathom.failures = [500] * 3
+    [err] = list(fathom.list_meetings(max_retries=2))
+    assert err["error"] == "Max retries reached: 500"
+
+    fathom.failures = [404]
+    [err] = list(fathom.list_meetings())
+    assert err["error"] == "Request failed: 404" and err["status_code"] == 404
+
+
+def test_next_page_is_prefetched(fathom):
+    fathom.pages = paged(2)
+    gen = fathom.list_meetings()
+    assert next(gen)["recording_id"] == 0
+    deadline = time.monotonic() + 2
+    while len(fathom.requests) < 2 and time.monotonic() < deadline:
+        threading.Event().wait(0.01)  # time.sleep is patched out
+    # page 2 was requested while page 1 was still being consumed
+    assert [q.get("cursor") for q in fathom.requests] == [None, "c1"]
+    assert [m["recording_id"] for m in gen] == [1, 2, 3]
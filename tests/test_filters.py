@@ -0,0 +1,84 @@
+# tests/test_filters.py
+import numpy as np
+import pytest
+
+from corpus import bm25
+from corpus import store as store_mod
+from corpus.filters import filter_rows, get_metadata_index
+from corpus.sources import SOURCE_FILES
+from corpus.store import get_store
+from corpus.unified import get_unified_index
+
+DOCS = SOURCE_FILES["docs"]
+
+
+def chunk(i, emb, **meta):
+    return {"id": f"r{i}", "chunk_text": f"dashboard row {i}", "embedding": emb, "metadata": meta}
+
+
+@pytest.fixture
+def docs(corpus):
+    corpus.write("docs", [
+        chunk(0, [1, 0], source="docs", path="./docs/embed/a.md", ingested_at="2025-05-01T00:00:00Z"),
+        chunk(1, [1, 0.1], source="docs", path="./docs/embed/a.md", ingested_at="2025-07-01"),
+        chunk(2, [0.9, 0.2], source="docs", path="./docs/modeling/b.md", ingested_at="2025-08-01"),
+        chunk(3, [0, 1], source="community", topic_id=376, ingested_at="2025-09-15"),
+        chunk(4, [0.5, 0.5], source="community", topic_id="372"),
+    ])
+    corpus.write("community", [])
+    corpus.write("slack", [])
+    return get_store(DOCS)
+
+
+@pytest.mark.parametrize("filters, rows", [
+    (None, None),
+    ({"path_prefix": ""}, None),                                   # empty values are ignored
+    ({"source": "community"}, [3, 4]),
+    ({"path_prefix": "./docs/embed"}, [0, 1]),
+    ({"path_prefix": ["./docs/modeling", "./docs/embed/a"]}, [0, 1, 2]),
+    ({"topic_id": [376, 372]}, [3, 4]),
+    ({"ingested_after": "2025-06-01", "ingested_before": "2025-09-01"}, [1, 2]),
+    ({"source": "docs", "ingested_after": "2025-07-01"}, [1, 2]),
+])
+def test_filter_rows(docs, filters, rows):
+    got = filter_rows(docs, filters)
+    assert (got if got is None else got.tolist()) == rows
+
+
+def test_invalid_filters_are_rejected(docs):
+    with pytest.raises(ValueError, match="Unknown filter"):
+        filter_rows(docs, {"author": "x"})
+    with pytest.raises(ValueError, match="Invalid date"):
+        filter_rows(docs, {"ingested_after": "last week"})
+
+
+def test_documents_are_grouped(docs):
+    groups = get_metadata_index(docs).groups
+    assert groups[0] == groups[1] and len(set(groups.tolist())) == 4
+
+
+def test_vector_search_only_scores_matching_rows(docs):
+    index = get_unified_index()
+    hits = index.search_per_source([1, 0], top_k={"docs": 5}, filters={"topic_id": 376})["docs"]
+    assert [index.chunk(r)[1]["id"] for r, _ in hits] == ["r3"]
+    hits = index.search_per_source([1, 0], top_k={"docs": 5}, filters={"topic_id": 1})["docs"]
+    assert hits == []
+
+
+def test_keyword_search_respects_filters(docs):
+    store, hits = bm25.keyword_search("docs", "dashboard", filters={"path_prefix": "./docs/modeling"})
+    assert [store.payload(r)["id"] for r, _ in hits] == ["r2"]
+
+
+def test_metadata_index_does_not_decode_embeddings(docs, monkeypatch):
+    decoded = []
+    loads = store_mod.json.loads
+    monkeypatch.setattr(store_mod.json, "loads", lambda b: decoded.append(b) or loads(b))
+    index = get_metadata_index(docs)
+    assert list(index.topic_ids) == [-1, -1, -1, 376, 372]
+    assert len(decoded) == len(docs) and not any(b"0.9" in line for line in decoded)
+
+
+def test_epoch_ingested_at_is_accepted(corpus):
+    corpus.write("docs", [chunk(0, [1, 0], ingested_at=1751328000), chunk(1, [0, 1], ingested_at="1751328000.5")])
+    assert list(get_metadata_index(get_store(DOCS)).ingested) == [1751328000.0, 1751328000.5]
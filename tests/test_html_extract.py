@@ -0,0 +1,73 @@
+# tests/test_html_extract.py
+import pytest
+
+from tooling import html_extract
+from tooling.html_extract import decode_html, extract_text, truncate_utf8
+from tooling.page_fetcher import PageFetcher
+
+ENGINES = [e for e in html_extract.ENGINES if e != "lxml" or html_extract.lxml_html is not None]
+TEXT = "café – naïve “quotes” 東京"
+# no <meta charset> and (below) no charset in the Content-Type header
+PAGE = f"<html><body><nav>Menu</nav><main><p>{TEXT}</p></main></body></html>"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_undeclared_utf8_bytes_are_not_read_as_latin1(engine):
+    assert extract_text(PAGE.encode("utf-8"), engine=engine) == TEXT
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_meta_charset_is_honored(engine):
+    html = "<html><head><meta charset='windows-1252'></head><body><p>café – naïve</p></body></html>"
+    assert extract_text(html.encode("cp1252"), engine=engine) == "café – naïve"
+
+
+def test_http_charset_wins_over_guessing():
+    data = "<p>façade</p>".encode("iso-8859-1")
+    assert decode_html(data, "iso-8859-1") == "<p>façade</p>"
+    # undeclared and not UTF-8: cp1252 rather than an exception
+    assert decode_html(data) == "<p>façade</p>"
+
+
+def test_xml_declaration_page():
+    html = '<?xml version="1.0" encoding="utf-8"?><html><body><main><p>résumé</p></main></body></html>'
+    for engine in ENGINES:
+        assert extract_text(html, engine=engine) == "résumé"
+        assert extract_text(html.encode("utf-8"), engine=engine) == "résumé"
+
+
+def test_max_bytes_counts_utf8_bytes():
+    text = "é" * 100                                     # 200 bytes
+    cut = truncate_utf8(text, 51)
+    assert cut == "é" * 25 and len(cut.encode("utf-8")) <= 51
+    assert truncate_utf8("short", 51) == "short"
+    html = f"<p>{'東' * 100}</p>"
+    for engine in ENGINES:
+        out = extract_text(html, max_bytes=30, engine=engine)
+        assert out and set(out) == {"東"} and len(out.encode("utf-8")) <= 30
+        # bytes cut in the middle of a character: the partial character is dropped, not mangled
+        out = extract_text(html.encode("utf-8"), max_bytes=31, engine=engine)
+        assert set(out) == {"東"}
+
+
+def test_main_content_only():
+    for engine in ENGINES:
+        assert extract_text(html_extract.sample_page(2), engine=engine).startswith("Guide Section 0")
+        assert "Navigation entry" not in extract_text(html_extract.sample_page(2), engine=engine)
+
+
+class _Response:
+    def __init__(self, content, headers):
+        self.content, self.headers, self.status_code = content, headers, 200
+
+    def raise_for_status(self):
+        pass
+
+
+def test_fetcher_decodes_undeclared_pages(pages, monkeypatch):
+    fetcher = PageFetcher(workers=1)
+    monkeypatch.setattr(fetcher.session, "get", lambda url, **kw: _Response(
+        PAGE.encode("utf-8"), {"Content-Type": "text/html"}))
+    assert fetcher.fetch("https://example.com/a") == TEXT
+    # what was cached is the clean text too
+    assert pages.lookup("https://example.com/a").text == TEXT
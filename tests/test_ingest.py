@@ -0,0 +1,99 @@
+# tests/test_ingest.py
+import json
+
+import pytest
+
+from corpus import faiss_index, ingest
+from corpus.sources import SOURCE_FILES
+from corpus.store import get_store
+
+DOCS = SOURCE_FILES["docs"]
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """Fake embedder: records the texts it is asked for."""
+    texts = []
+
+    def embed_texts(batch, batch_size=64):
+        texts.extend(batch)
+        return [[float(len(t)), 1.0, float(sum(map(ord, t)) % 7)] for t in batch]
+
+    monkeypatch.setattr(ingest, "embed_texts", embed_texts)
+    return texts
+
+
+@pytest.fixture
+def checkout(corpus):
+    root = corpus.root / "checkout" / "docs"
+    root.mkdir(parents=True)
+    (root / "a.md").write_text("Alpha intro.\n\nAlpha details.")
+    (root / "b.md").write_text("Beta page.")
+    return root
+
+
+def ids():
+    s = get_store(DOCS)
+    return sorted(s.payload(r)["id"] for r in range(len(s)))
+
+
+def test_first_run_embeds_everything(checkout, embedded):
+    summary = ingest.ingest("docs", checkout)
+    assert summary["changed"] == ["./docs/a.md", "./docs/b.md"] and summary["rows_added"] == 2
+    assert ids() == ["./docs/a.md:chunk-0", "./docs/b.md:chunk-0"]
+    manifest = json.loads(ingest.SOURCES["docs"]["manifest"].read_text())
+    assert set(manifest) == {"./docs/a.md", "./docs/b.md"}
+
+
+def test_only_changed_documents_are_reembedded(checkout, embedded):
+    ingest.ingest("docs", checkout)
+    embedded.clear()
+    (checkout / "b.md").write_text("Beta page, edited.")
+    summary = ingest.ingest("docs", checkout)
+    assert summary["changed"] == ["./docs/b.md"] and summary["unchanged"] == 1
+    assert embedded == ["Beta page, edited."]
+    assert summary["rows_removed"] == 1
+    texts = {get_store(DOCS).payload(r)["chunk_text"] for r in range(2)}
+    assert texts == {"Alpha intro.\n\nAlpha details.", "Beta page, edited."}
+
+
+def test_unchanged_run_writes_nothing(checkout, embedded):
+    ingest.ingest("docs", checkout)
+    shard = ingest.discover_shards(DOCS)[0]
+    before = shard.stat().st_mtime_ns
+    embedded.clear()
+    assert ingest.ingest("docs", checkout)["changed"] == []
+    assert embedded == [] and shard.stat().st_mtime_ns == before
+
+
+def test_removed_documents_need_prune(checkout, embedded):
+    ingest.ingest("docs", checkout)
+    (checkout / "b.md").unlink()
+    assert ingest.ingest("docs", checkout)["removed"] == []
+    assert len(ids()) == 2
+    assert ingest.ingest("docs", checkout, prune=True)["removed"] == ["./docs/b.md"]
+    assert ids() == ["./docs/a.md:chunk-0"]
+
+
+def test_dry_run_only_reports(checkout, embedded):
+    summary = ingest.ingest("docs", checkout, dry_run=True)
+    assert len(summary["changed"]) == 2
+    assert embedded == [] and ingest.discover_shards(DOCS) == []
+
+
+def test_saved_faiss_index_is_patched(checkout, embedded):
+    ingest.ingest("docs", checkout)
+    faiss_index.load_or_build(get_store(DOCS), "flat")
+    (checkout / "c.md").write_text("Gamma.")
+    summary = ingest.ingest("docs", checkout)
+    assert summary["indexes"] == {"flat": "patched"}
+    store = get_store(DOCS)
+    assert faiss_index._read_saved(DOCS, "flat", store.digest).ntotal == len(store) == 3
+
+
+def test_new_shard_once_the_last_is_full(checkout, embedded, monkeypatch):
+    ingest.ingest("docs", checkout)
+    monkeypatch.setattr(ingest, "SHARD_MAX_BYTES", 1)
+    (checkout / "c.md").write_text("Gamma.")
+    ingest.ingest("docs", checkout)
+    assert [p.name for p in ingest.discover_shards(DOCS)] == ["docs-000.jsonl", "docs-001.jsonl"]
@@ -0,0 +1,99 @@
+# tests/test_page_cache.py
+import time
+
+import pytest
+
+from tooling import page_cache
+from tooling.page_cache import CachedPage, DiskPageCache
+from tooling.page_fetcher import PageFetcher
+
+URL = "https://docs.example.com/page"
+
+
+class _Response:
+    def __init__(self, status_code=200, content=b"", headers=None):
+        self.status_code, self.content, self.headers = status_code, content, headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+@pytest.fixture
+def server(pages, monkeypatch):
+    """Fetcher against a fake server answering 304 when the client's ETag matches."""
+    fetcher = PageFetcher(workers=1, host_rps=0)
+    state = {"etag": '"v1"', "body": "first", "requests": [], "fail": False}
+
+    def get(url, timeout=None, headers=None):
+        state["requests"].append(headers or {})
+        if state["fail"]:
+            raise ConnectionError("down")
+        if (headers or {}).get("If-None-Match") == state["etag"]:
+            return _Response(304)
+        return _Response(200, f"<p>{state['body']}</p>".encode(),
+                         {"ETag": state["etag"], "Last-Modified": "Mon, 01 Sep 2025 00:00:00 GMT"})
+
+    monkeypatch.setattr(fetcher.session, "get", get)
+    state["fetcher"] = fetcher
+    return state
+
+
+def expire(url=URL):
+    page = page_cache.lookup(url)
+    page_cache.remember(url, CachedPage(page.text, page.etag, page.last_modified, time.time() - page_cache.PAGE_CACHE_TTL - 1))
+
+
+def test_fresh_page_is_served_without_a_request(server):
+    assert server["fetcher"].fetch(URL) == "first"
+    assert server["fetcher"].fetch(URL) == "first"
+    assert len(server["requests"]) == 1
+
+
+def test_stale_page_is_revalidated_and_a_304_reuses_it(server):
+    server["fetcher"].fetch(URL)
+    expire()
+    assert server["fetcher"].fetch(URL) == "first"
+    assert server["requests"][-1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Sep 2025 00:00:00 GMT"}
+    assert page_cache.lookup(URL).fresh                  # the 304 restarted the TTL
+
+
+def test_changed_page_is_replaced(server):
+    server["fetcher"].fetch(URL)
+    expire()
+    server["etag"], server["body"] = '"v2"', "second"
+    assert server["fetcher"].fetch(URL) == "second"
+    assert page_cache.lookup(URL).etag == '"v2"'
+
+
+def test_stale_text_beats_a_failed_fetch(server):
+    server["fetcher"].fetch(URL)
+    expire()
+    server["fail"] = True
+    assert server["fetcher"].fetch(URL) == "first"
+
+
+def test_disk_cache_survives_the_memory_cache(server):
+    server["fetcher"].fetch(URL)
+    page_cache.PAGES.clear()
+    assert page_cache.lookup(URL).text == "first"
+    assert len(server["requests"]) == 1
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    disk = DiskPageCache(tmp_path / "pages.sqlite", max_bytes=25)
+    for i, url in enumerate(["a", "b", "c"]):
+        disk.put(url, CachedPage("x" * 10, None, None, time.time()))
+        time.sleep(0.01)
+        if url == "b":
+            disk.get("a")                                 # a is now used more recently than b
+    assert disk.get("b") is None
+    assert disk.get("a") is not None and disk.get("c") is not None
+
+
+def test_unwritable_disk_cache_is_disabled(tmp_path, capsys):
+    (tmp_path / "file").write_text("")
+    disk = DiskPageCache(tmp_path / "file" / "pages.sqlite")
+    assert disk.get(URL) is None
+    disk.put(URL, CachedPage("x", None, None, time.time()))
+    assert "Page cache disabled" in capsys.readouterr().out
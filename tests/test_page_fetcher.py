@@ -0,0 +1,69 @@
+# tests/test_page_fetcher.py
+import threading
+import time
+
+import pytest
+
+from tooling.page_fetcher import HostRateLimiter, PageFetcher
+
+
+class _Response:
+    def __init__(self, content=b"", headers=None, status_code=200):
+        self.content, self.headers, self.status_code = content, headers or {}, status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+@pytest.fixture
+def fetcher(pages, monkeypatch):
+    """PageFetcher whose session serves `<p>page <url></p>`, after `delays[url]` seconds."""
+    f = PageFetcher(workers=4, host_rps=0)
+    f.calls, f.delays = [], {}
+    lock = threading.Lock()
+
+    def get(url, timeout=None, headers=None):
+        with lock:
+            f.calls.append((url, headers))
+        time.sleep(f.delays.get(url, 0.1))
+        return _Response(f"<html><body><p>page {url}</p></body></html>".encode(), {"ETag": '"v1"'})
+
+    monkeypatch.setattr(f.session, "get", get)
+    yield f
+    f.pool.shutdown(wait=True)
+
+
+def test_pages_are_fetched_concurrently(fetcher):
+    urls = [f"https://docs.example.com/{i}" for i in range(4)]
+    start = time.monotonic()
+    out = fetcher.fetch_many(urls + urls[:1])
+    assert time.monotonic() - start < 0.3           # 4 x 100 ms one after another would be 400 ms
+    assert out == {u: f"page {u}" for u in urls}
+    assert len(fetcher.calls) == 4                   # duplicates fetched once
+
+
+def test_slow_page_misses_the_deadline_but_lands_in_the_cache(fetcher, pages):
+    slow, fast = "https://docs.example.com/slow", "https://docs.example.com/fast"
+    fetcher.delays[slow] = 0.6
+    out = fetcher.fetch_many([slow, fast], deadline=0.3)
+    assert out == {slow: None, fast: f"page {fast}"}
+    fetcher.pool.shutdown(wait=True)
+    assert pages.lookup(slow).text == f"page {slow}"
+
+
+def test_fresh_pages_need_no_request(fetcher):
+    url = "https://docs.example.com/a"
+    fetcher.fetch(url)
+    assert fetcher.fetch_many([url]) == {url: f"page {url}"}
+    assert len(fetcher.calls) == 1
+
+
+def test_rate_limiter_spaces_requests_per_host():
+    limiter = HostRateLimiter(rps=20)
+    start = time.monotonic()
+    for _ in range(3):
+        assert limiter.acquire("a.example.com")
+    assert time.monotonic() - start >= 0.09
+    assert limiter.acquire("b.example.com")                   # other hosts are not held up
+    assert not limiter.acquire("a.example.com", deadline=time.monotonic())
@@ -0,0 +1,47 @@
+# tests/test_quantize.py
+import numpy as np
+import pytest
+
+from corpus import quantize as quant
+from corpus.search import normalize_rows, search_matrix
+from corpus.sources import SOURCE_FILES
+from corpus.store import load_store
+
+
+@pytest.fixture
+def matrix():
+    return normalize_rows(np.random.default_rng(2).normal(size=(300, 32)))
+
+
+@pytest.mark.parametrize("dtype, tol", [("float16", 2e-3), ("int8", 2e-2)])
+def test_quantization_error_is_small(matrix, dtype, tol):
+    data, scales = quant.quantize(matrix, dtype)
+    assert data.dtype == np.dtype(dtype) and quant.is_quantized(data)
+    assert np.abs(quant.dequantize(data, scales) - matrix).max() < tol
+
+
+def test_unknown_dtype_is_rejected(matrix):
+    with pytest.raises(ValueError):
+        quant.quantize(matrix, "int4")
+
+
+def test_blockwise_scores_match_dequantized(matrix, monkeypatch):
+    monkeypatch.setattr(quant, "SCORE_BLOCK_ROWS", 64)
+    data, scales = quant.quantize(matrix, "int8")
+    q = matrix[:3]
+    assert np.allclose(quant.score_quantized(data, scales, q), q @ quant.dequantize(data, scales).T, atol=1e-5)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_store_rescores_on_exact_vectors(corpus, matrix, dtype):
+    corpus.write("docs", [(f"d{i}", f"chunk {i}", v) for i, v in enumerate(matrix)])
+    exact = load_store(SOURCE_FILES["docs"], "float32")
+    store = load_store(SOURCE_FILES["docs"], dtype)
+    assert store.quantized and store.matrix.dtype == np.dtype(dtype)
+    # exact rows are re-read from the shard, not dequantized
+    assert np.allclose(store.exact_rows([4, 7]), exact.matrix[[4, 7]], atol=1e-6)
+
+    queries = matrix[:20] + np.random.default_rng(3).normal(scale=0.3, size=(20, 32))
+    for q in queries:
+        want = [exact.payload(r)["id"] for r in search_matrix(exact.matrix, q, top_k=5)[0][0]]
+        assert [c["id"] for c in store.search(q, top_k=5)] == want
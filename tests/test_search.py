@@ -0,0 +1,116 @@
+# tests/test_search.py
+import numpy as np
+import pytest
+
+from corpus.search import (
+    diversify,
+    fuse_ranked,
+    group_best,
+    mmr_select,
+    normalize_rows,
+    search_matrix,
+    search_matrix_fused,
+    top_k_indices,
+)
+from corpus.unified import get_unified_index
+
+
+@pytest.fixture
+def matrix():
+    rng = np.random.default_rng(0)
+    return normalize_rows(rng.normal(size=(200, 16)))
+
+
+def test_normalize_rows_keeps_zero_rows():
+    m = normalize_rows([[3, 4], [0, 0]])
+    assert m.dtype == np.float32 and m.flags["C_CONTIGUOUS"]
+    assert np.allclose(m, [[0.6, 0.8], [0, 0]])
+
+
+def test_top_k_matches_a_full_sort(matrix):
+    scores = matrix @ matrix[:3].T
+    idx = top_k_indices(scores.T, 7)
+    assert idx.shape == (3, 7)
+    for q in range(3):
+        assert idx[q].tolist() == np.argsort(-scores[:, q], kind="stable")[:7].tolist()
+
+
+def test_top_k_clamps_k():
+    assert top_k_indices(np.array([0.1, 0.3, 0.2]), 10)[0].tolist() == [1, 2, 0]
+    assert top_k_indices(np.array([0.1]), 0).shape == (1, 0)
+
+
+def test_search_matrix_normalizes_queries(matrix):
+    idx, scores = search_matrix(matrix, matrix[5] * 10, top_k=3)
+    assert idx[0, 0] == 5 and np.isclose(scores[0, 0], 1.0)
+    assert (np.diff(scores[0]) <= 0).all()
+
+
+def test_search_of_an_empty_matrix():
+    idx, scores = search_matrix(np.zeros((0, 0), np.float32), [1.0, 0.0], top_k=3)
+    assert idx.shape == (1, 0) and scores.shape == (1, 0)
+
+
+# -------- Multi-chunk queries --------
+def test_max_fusion_finds_rows_matching_any_chunk():
+    m = normalize_rows([[1, 0, 0], [0, 1, 0], [0, 0, 1]])
+    idx, scores = search_matrix_fused(m, [[1, 0, 0], [0, 0, 1]], top_k=2, method="max")
+    assert sorted(idx.tolist()) == [0, 2] and np.allclose(scores, 1.0)
+    # the first chunk alone misses row 2
+    assert 2 not in search_matrix(m, [1, 0, 0], top_k=2)[0][0].tolist()
+
+
+def test_rrf_rewards_rows_ranked_by_several_chunks():
+    rows = np.array([[3, 1, 2], [1, 4, 5]])
+    idx, fused = fuse_ranked(rows, np.zeros(rows.shape), top_k=3, method="rrf", rrf_k=0)
+    assert idx[0] == 1 and np.isclose(fused[0], 1 / 2 + 1)
+    assert idx.tolist()[1:] == [3, 4]
+
+
+def test_fusion_ignores_missing_hits_and_unknown_methods():
+    idx, _ = fuse_ranked(np.array([[2, -1]]), np.array([[0.5, -np.inf]]), top_k=5)
+    assert idx.tolist() == [2]
+    with pytest.raises(ValueError):
+        fuse_ranked(np.array([[0]]), np.array([[1.0]]), method="sum")
+
+
+def test_single_chunk_fusion_equals_plain_search(matrix):
+    q = matrix[7] + matrix[9]
+    fused, _ = search_matrix_fused(matrix, q, top_k=5, method="rrf")
+    assert fused.tolist() == search_matrix(matrix, q, top_k=5)[0][0].tolist()
+
+
+# -------- Diversity --------
+def test_group_best_keeps_the_first_row_of_each_group():
+    assert group_best(np.array([4, 4, 2, 4, 7, 2]), 5).tolist() == [0, 2, 4]
+    assert group_best(np.array([4, 4, 2, 4, 7, 2]), 2).tolist() == [0, 2]
+
+
+def test_diversify_group_returns_distinct_documents():
+    rows, scores = np.array([10, 11, 12, 13]), np.array([0.9, 0.8, 0.7, 0.6])
+    got, got_scores = diversify(rows, scores, 2, "group", groups=np.array([1, 1, 2, 3]))
+    assert got.tolist() == [10, 12] and got_scores.tolist() == [0.9, 0.7]
+    assert diversify(rows, scores, 2, "none")[0].tolist() == [10, 11]
+
+
+def test_mmr_prefers_a_different_direction():
+    vecs = normalize_rows([[1, 0, 0], [0.99, 0.14, 0], [0.7, 0, 0.7]])
+    relevance = vecs @ normalize_rows([1, 0.05, 0.1])[0]
+    assert mmr_select(vecs, relevance, 2, lam=0.5).tolist() == [0, 2]
+    assert mmr_select(vecs, relevance, 2, lam=1.0).tolist() == [0, 1]
+
+
+def test_unified_search_returns_k_distinct_documents(corpus):
+    def chunk(i, path, emb):
+        return {"id": f"r{i}", "chunk_text": "x", "embedding": emb, "metadata": {"path": path}}
+    corpus.write("docs", [chunk(0, "./a.md", [1, 0]), chunk(1, "./a.md", [1, 0.01]),
+                          chunk(2, "./a.md", [1, 0.02]), chunk(3, "./b.md", [1, 0.5])])
+    corpus.write("community", [])
+    corpus.write("slack", [])
+    index = get_unified_index()
+    ids = lambda hits: [index.chunk(r)[1]["id"] for r, _ in hits["docs"]]
+    assert ids(index.search_per_source([1, 0], top_k={"docs": 2})) == ["r0", "r1"]
+    assert ids(index.search_per_source([1, 0], top_k={"docs": 2}, diversity="group")) == ["r0", "r3"]
+    assert ids(index.search_per_source([1, 0], top_k={"docs": 2}, diversity="mmr")) == ["r0", "r3"]
+    with pytest.raises(ValueError):
+        index.search_per_source([1, 0], diversity="random")
@@ -0,0 +1,56 @@
+# tests/test_slack_client.py
+import threading
+import time
+
+from tooling import slack_client
+from tooling.slack_client import SlackSearchClient, get_slack_client, search_slack
+
+
+def msg(text, link):
+    return {"text": text, "metadata": {"permalink": link}}
+
+
+def test_clients_and_searchers_are_reused(slack):
+    client = get_slack_client("token")
+    assert get_slack_client("token") is client and get_slack_client("other") is not client
+    assert client.searcher(5, 0) is client.searcher(5, 0)
+    assert client.searcher(5, 0) is not client.searcher(10, 0)
+
+
+def test_results_are_deduped_in_query_order(slack):
+    slack.hits["b"] = [msg("b0", "/x"), msg("b1", "/shared")]
+    slack.hits["a"] = [msg("a0", "/shared"), msg("a1", "/y")]
+    slack.hits["c"] = [{"text": "no link"}, {"text": "no link"}]
+    results = search_slack("t", ["a", "b", "a", "", "c"])
+    assert [r["text"] for r in results] == ["a0", "a1", "b0", "no link"]
+    assert sorted(slack.calls) == ["a", "b", "c"]
+
+
+def test_queries_run_concurrently_and_failures_are_isolated(monkeypatch, capsys):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    class SlowSearcher:
+        def __init__(self, **kw):
+            pass
+
+        def search(self, query):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.1)
+            with lock:
+                active[0] -= 1
+            if query == "boom":
+                raise RuntimeError("ratelimited")
+            return [msg(query, f"/{query}")]
+
+    monkeypatch.setattr(slack_client, "SlackSearcher", SlowSearcher)
+    client = SlackSearchClient("t", concurrency=4)
+    start = time.monotonic()
+    results = client.search_many(["a", "boom", "b", "c"])
+    assert time.monotonic() - start < 0.3
+    assert peak[0] > 1
+    assert [r["text"] for r in results] == ["a", "b", "c"]
+    assert "Slack search failed for 'boom'" in capsys.readouterr().out
+    client.pool.shutdown()
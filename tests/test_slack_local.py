@@ -0,0 +1,64 @@
+# tests/test_slack_local.py
+from tooling import slack_client
+from tooling.slack_threads import message_ts, parse_permalink
+
+SYNCED_AT = 1_760_000_000.0
+OLD_THREAD = "1759990000.000100"                 # started before the last sync
+
+
+def hit(text, ts, thread_ts=None):
+    url = f"https://acme.slack.com/archives/C1/p{ts.replace('.', '')}"
+    if thread_ts:
+        url += f"?thread_ts={thread_ts}&cid=C1"
+    return {"text": text, "metadata": {"permalink": url}}
+
+
+def test_message_ts_is_the_messages_own():
+    url = hit("r", "1760000500.000200", OLD_THREAD)["metadata"]["permalink"]
+    assert message_ts(url) == "1760000500.000200"
+    assert parse_permalink(url) == ("C1", OLD_THREAD)
+    assert message_ts("https://example.com") is None
+
+
+def test_gap_search_keeps_new_replies_to_old_threads(slack):
+    slack.hits["embed"] = [
+        hit("already synced", "1759999000.000100"),
+        hit("new reply in an old thread", "1760000500.000200", OLD_THREAD),
+        hit("new message", "1760000600.000300"),
+        {"text": "no permalink", "metadata": {}},
+    ]
+    got = slack_client.search_slack_since("t", ["embed"], SYNCED_AT, exclusions=" -in:x", thread_limit=0)
+    assert [r["text"] for r in got] == ["new reply in an old thread", "new message", "no permalink"]
+    # the day before the sync, since after: is exclusive
+    assert slack.calls == ["embed -in:x after:2025-10-08"]
+
+
+def test_gap_search_without_a_sync_is_a_plain_search(slack):
+    slack.hits["embed"] = [hit("old", "1000000000.000100")]
+    assert [r["text"] for r in slack_client.search_slack_since("t", ["embed"], None, thread_limit=0)] == ["old"]
+    assert slack.calls == ["embed"]
+
+
+def test_gap_search_is_skipped_while_the_sync_is_fresh(slack):
+    now = slack_client.time.time()
+    assert slack_client.search_slack_since("t", ["embed"], now - 60, fresh_for=900, thread_limit=0) == []
+    assert slack.calls == []
+    assert slack_client.search_slack_since("t", ["embed"], now - 1800, fresh_for=900, thread_limit=0)
+    assert len(slack.calls) == 1                  # overdue: the gap is searched
+
+
+def test_gap_search_returns_what_is_back_by_the_deadline(slack, capsys):
+    release = slack_client.threading.Event()
+
+    def slow():                                   # a search that only answers after the deadline
+        release.wait(5)
+        yield hit("late", "1760000700.000100")
+
+    slack.hits["slow"] = slow()
+    slack.hits["fast"] = [hit("on time", "1760000600.000100")]
+    try:
+        got = slack_client.search_slack_ngrams("t", ["slow", "fast"], thread_limit=0, timeout=0.2)
+    finally:
+        release.set()
+    assert [r["text"] for r in got] == ["on time"]
+    assert "dropped: slow" in capsys.readouterr().out
@@ -0,0 +1,91 @@
+# tests/test_slack_query.py
+from tooling import slack_client
+from tooling.slack_query import fetch_limit, phrase_tokens, plan_slack_queries, rescore
+
+# what the extractor produces for "how do I embed a dashboard with row level security"
+NGRAMS = [
+    "embed", "dashboard", "row", "level", "security",
+    "embed dashboard", "dashboard row", "row level", "level security",
+    "embed dashboard row", "dashboard row level", "row level security",
+]
+TRIGRAMS = ["embed dashboard row", "dashboard row level", "row level security"]
+
+
+def recovered(plan):
+    """Every phrase is searched or recovered from a query whose hits all contain its terms."""
+    return all(
+        (q := plan.recovered_by(p)) is not None and set(p) <= set(q.terms)
+        for p in plan.phrases if p not in plan.unsearched
+    )
+
+
+def test_longest_phrases_are_searched_and_recover_their_sub_ngrams():
+    plan = plan_slack_queries(NGRAMS)
+    assert [q.text for q in plan.queries] == TRIGRAMS
+    assert not plan.unsearched
+    assert recovered(plan)
+    assert sum(len(q.recovers) for q in plan.queries) == len(NGRAMS) == plan.answered
+    assert plan.recovered_by(("dashboard",)).text == "embed dashboard row"
+    assert plan.recovered_by(("level", "security")).text == "row level security"
+
+
+def test_unrelated_phrases_are_never_anded():
+    plan = plan_slack_queries(["embed dashboard", "row level security", "dashboard filters"])
+    # nothing to merge: each query is one of the phrases, not a union of several
+    assert sorted(q.terms for q in plan.queries) == sorted(phrase_tokens(p) for p in
+                                                          ["embed dashboard", "row level security", "dashboard filters"])
+    assert recovered(plan)
+
+
+def test_phrase_is_recovered_only_from_a_query_with_all_its_terms():
+    plan = plan_slack_queries(["Row Level", "row level security", "sso", "level  row", "security token"])
+    assert [q.text for q in plan.queries] == ["row level security", "security token", "sso"]
+    assert plan.recovered_by(("level", "row")).text == "row level security"
+    assert plan.recovered_by(("sso",)).text == "sso"
+    assert recovered(plan)
+
+
+def test_leftovers_over_budget_are_reported():
+    plan = plan_slack_queries(["a1", "b2", "c3", "a1 b2", "d4 e5"], max_queries=2)
+    assert [q.text for q in plan.queries] == ["a1 b2", "d4 e5"]
+    assert plan.unsearched == [("c3",)]
+    assert plan.answered == 4
+    assert recovered(plan)
+
+
+def test_fetch_grows_with_the_phrases_a_query_recovers():
+    assert fetch_limit(5) == 15
+    assert fetch_limit(5, phrases=6) == 30
+    assert fetch_limit(50, phrases=6) == 100
+
+
+def test_rescore_prefers_more_and_longer_phrase_matches():
+    phrases = [phrase_tokens(p) for p in ["embed", "dashboard", "embed dashboard"]]
+    results = [{"text": "dashboard tips"}, {"text": "how to embed a dashboard"}, {"text": "Embed dashboard SSO"}]
+    assert [r["text"] for r in rescore(results, phrases)] == [
+        "Embed dashboard SSO", "how to embed a dashboard", "dashboard tips"]
+
+
+def test_search_slack_ngrams_sends_planned_queries_with_exclusions(slack):
+    results = slack_client.search_slack_ngrams("t", NGRAMS, exclusions=" -in:x", result_limit=2, thread_limit=0)
+    assert sorted(slack.calls) == sorted(f"{t} -in:x" for t in TRIGRAMS)
+    # the trigrams recover the uni- and bigrams: result_limit results for each of the 12 n-grams
+    assert len(results) == 2 * len(NGRAMS)
+    assert len({r["metadata"]["permalink"] for r in results}) == len(results)
+
+
+def test_search_slack_ngrams_keeps_result_limit_per_answered_phrase(slack):
+    slack.hits["embed dashboard"] = [{"text": f"embed dashboard {i}", "metadata": {"permalink": f"https://x/{i}"}}
+                                     for i in range(20)]
+    results = slack_client.search_slack_ngrams("t", ["embed", "dashboard", "embed dashboard"], result_limit=2,
+                                               thread_limit=0)
+    assert slack.calls == ["embed dashboard"]
+    assert len(results) == 6                      # 2 for each of the three n-grams, not 2 for the one query
+
+
+def test_search_slack_ngrams_warns_about_unsearched(slack, monkeypatch, capsys):
+    monkeypatch.setattr(slack_client, "plan_slack_queries", lambda ngrams: plan_slack_queries(ngrams, max_queries=1))
+    monkeypatch.setattr(slack_client, "SLACK_MAX_QUERIES", 1)
+    slack_client.search_slack_ngrams("t", ["embed", "security"], thread_limit=0)
+    assert slack.calls == ["embed"]
+    assert "not searched: security" in capsys.readouterr().out
@@ -0,0 +1,141 @@
+# tests/test_slack_sync.py
+import json
+import time
+
+import pytest
+
+from corpus import ingest, slack_sync
+from corpus.slack_sync import parse_exclusions
+
+NOW = time.time()
+
+
+def ts(hours_ago, n=0):
+    return f"{NOW - hours_ago * 3600:.0f}.{n:06d}"
+
+
+class FakeWebClient:
+    """
+    Paged conversations_* over `history` (channel id -> messages) and
+    `threads` (thread ts -> replies), two items per page.
+    """
+
+    def __init__(self, channels, history, threads=None):
+        self.channels, self.history, self.threads = channels, history, threads or {}
+        self.oldest = {}
+
+    @staticmethod
+    def _page(items, key, limit, cursor):
+        start = int(cursor or 0)
+        more = start + 2 < len(items)
+        return {key: items[start:start + 2], "response_metadata": {"next_cursor": str(start + 2) if more else ""}}
+
+    def auth_test(self):
+        return {"url": "https://acme.slack.com/"}
+
+    def conversations_list(self, limit, cursor, **params):
+        return self._page(self.channels, "channels", limit, cursor)
+
+    def conversations_history(self, limit, cursor, channel, oldest):
+        self.oldest[channel] = float(oldest)
+        msgs = [m for m in self.history.get(channel, []) if float(m["ts"]) >= float(oldest)]
+        return self._page(msgs, "messages", limit, cursor)
+
+    def conversations_replies(self, channel, ts, limit):
+        return {"messages": [{"ts": ts, "text": "parent"}] + self.threads.get(ts, [])}
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    texts = []
+
+    def embed_texts(batch, batch_size=64):
+        texts.extend(batch)
+        return [[float(len(t)), 1.0] for t in batch]
+
+    monkeypatch.setattr(ingest, "embed_texts", embed_texts)
+    return texts
+
+
+@pytest.fixture
+def workspace(corpus, embedded, monkeypatch):
+    channels = [
+        {"id": "C1", "name": "embed", "is_member": True},
+        {"id": "C2", "name": "legal-review", "is_member": True},
+        {"id": "C3", "name": "random", "is_member": False},
+        {"id": "C4", "name": "dashboards", "is_member": True},
+    ]
+    parent = ts(5)
+    history = {
+        "C1": [
+            {"ts": parent, "text": "How do I embed a dashboard?", "reply_count": 2},
+            {"ts": ts(4), "text": "sentry alert fired"},
+            {"ts": ts(3), "subtype": "channel_join", "text": "joined"},
+            {"ts": ts(2), "text": "Static embedding needs a secret key."},
+        ],
+        "C2": [{"ts": ts(1), "text": "confidential"}],
+        "C4": [{"ts": ts(1), "text": "Dashboard filters are linked."}],
+    }
+    threads = {parent: [{"ts": ts(4, 1), "text": "Use the embed menu."}, {"ts": ts(4, 2), "text": "github mirror"}]}
+    client = FakeWebClient(channels, history, threads)
+    monkeypatch.setattr(slack_sync, "make_client", lambda token=None: client)
+    return client
+
+
+def test_parse_exclusions():
+    channels, words = parse_exclusions(" -in:#Legal -in:ops -sentry -github - plain")
+    assert channels == {"legal", "ops"}
+    assert words == {"sentry", "github"}
+
+
+def test_first_sync_backfills_member_channels(workspace, embedded):
+    started = time.time()
+    summary = slack_sync.sync(backfill_days=1)
+    assert summary["channels"] == {"embed": 2, "dashboards": 1}
+    assert summary["changed"] == 3
+    assert workspace.oldest["C1"] == pytest.approx(started - 86400, abs=5)
+    assert "C2" not in workspace.oldest and "C3" not in workspace.oldest
+
+    thread = next(t for t in embedded if t.startswith("How do I embed"))
+    assert "Use the embed menu." in thread and "parent" not in thread and "github" not in thread
+    assert not any("sentry" in t or "joined" in t for t in embedded)
+
+    state = json.loads(slack_sync.SLACK_SYNC_STATE.read_text())
+    assert state["channels"]["C1"] == {"name": "embed", "cursor": ts(2)}
+    assert slack_sync.last_synced_at() == state["synced_at"] >= started
+
+
+def test_next_sync_rereads_the_lookback_window_only(workspace, embedded):
+    slack_sync.sync(backfill_days=1)
+    embedded.clear()
+    summary = slack_sync.sync(backfill_days=1)
+    lookback = slack_sync.THREAD_LOOKBACK_HOURS * 3600
+    assert workspace.oldest["C1"] == pytest.approx(float(ts(2)) - lookback)
+    # nothing changed: no re-embedding, cursors kept
+    assert summary["changed"] == 0 and embedded == []
+    assert slack_sync.load_state()["channels"]["C4"]["cursor"] == ts(1)
+
+
+def test_new_reply_reembeds_its_thread(workspace, embedded):
+    slack_sync.sync(backfill_days=1)
+    embedded.clear()
+    parent = workspace.history["C1"][0]["ts"]
+    workspace.threads[parent].append({"ts": ts(0, 3), "text": "Or use the SDK."})
+    summary = slack_sync.sync(backfill_days=1)
+    assert summary["changed"] == 1
+    assert len(embedded) == 1 and embedded[0].endswith("Or use the SDK.")
+
+
+def test_dry_run_and_channel_errors_leave_state_alone(workspace, embedded, capsys):
+    def broken(**kw):
+        raise RuntimeError("not_in_channel")
+
+    summary = slack_sync.sync(["embed"], backfill_days=1, dry_run=True)
+    assert summary["channels"] == {"embed": 2} and embedded == []
+    assert slack_sync.last_synced_at() is None
+
+    workspace.conversations_history = broken
+    summary = slack_sync.sync(backfill_days=1)
+    assert summary["channels"] == {}
+    assert "Slack sync skipped #embed: not_in_channel" in capsys.readouterr().out
+    assert "C1" not in slack_sync.load_state()["channels"]
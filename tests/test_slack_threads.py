@@ -0,0 +1,100 @@
+# tests/test_slack_threads.py
+import pytest
+
+from tooling import slack_threads
+from tooling.slack_client import get_slack_client, search_slack_ngrams
+from tooling.slack_threads import ThreadExpander, parse_permalink
+
+BASE = "https://acme.slack.com/archives/C0123/p"
+
+
+class FakeWebClient:
+    """conversations_replies returning the parent plus `n` replies per thread."""
+
+    def __init__(self, n=3, fail=False):
+        self.n, self.fail, self.calls = n, fail, []
+
+    def conversations_replies(self, channel, ts, limit):
+        self.calls.append((channel, ts, limit))
+        if self.fail:
+            raise RuntimeError("ratelimited")
+        msgs = [{"ts": ts, "text": "parent"}] + [{"ts": f"{ts}{i}", "text": f"reply {i}"} for i in range(self.n)]
+        return {"messages": msgs[:limit]}
+
+
+@pytest.fixture
+def expander():
+    slack_threads.THREADS.clear()
+    exp = ThreadExpander("t")
+    exp.client = FakeWebClient()
+    yield exp
+    slack_threads.THREADS.clear()
+
+
+def test_parse_permalink():
+    assert parse_permalink(BASE + "1700000000123456") == ("C0123", "1700000000.123456")
+    reply = BASE + "1700000999000001?thread_ts=1700000000.123456&cid=C0123"
+    assert parse_permalink(reply) == ("C0123", "1700000000.123456")
+    assert parse_permalink("https://x/embed/0") is None
+    assert parse_permalink(None) is None
+
+
+def test_expand_appends_replies(expander):
+    res = {"text": "parent", "metadata": {"permalink": BASE + "1700000000123456"}}
+    out = expander.expand(res, 2)
+    assert out["text"] == "parent\n  ↳ reply 0\n  ↳ reply 1"
+    assert out["metadata"]["thread_replies"] == 2
+    assert "thread_replies" not in res["metadata"]
+    assert expander.client.calls == [("C0123", "1700000000.123456", 3)]
+
+    no_link = {"text": "stub", "metadata": {"permalink": "https://x/embed/0"}}
+    assert expander.expand(no_link, 2) is no_link
+    expander.client.n = 0
+    lonely = {"text": "alone", "metadata": {"permalink": BASE + "1700000111000000"}}
+    assert expander.expand(lonely, 2) is lonely
+
+
+def test_replies_are_cached_until_ttl(expander, monkeypatch):
+    assert expander.replies("C0123", "1.0", 2) == ["reply 0", "reply 1"]
+    expander.replies("C0123", "1.0", 2)
+    assert len(expander.client.calls) == 1
+    monkeypatch.setattr(slack_threads, "THREAD_CACHE_TTL", 0)
+    expander.replies("C0123", "1.0", 2)
+    assert len(expander.client.calls) == 2
+
+
+def test_failed_fetch_is_warned_and_not_cached(expander, capsys):
+    expander.client.fail = True
+    assert expander.replies("C0123", "1.0", 2) == []
+    assert "Slack thread fetch failed for C0123/1.0" in capsys.readouterr().out
+    expander.client.fail = False
+    assert expander.replies("C0123", "1.0", 2) == ["reply 0", "reply 1"]
+
+
+def test_only_top_hits_are_expanded(slack, expander):
+    slack.hits["embed"] = [{"text": f"embed {i}", "metadata": {"permalink": BASE + f"17000000{i:02d}000000"}}
+                           for i in range(5)]
+    client = get_slack_client("t")
+    client.threads = expander
+    results = search_slack_ngrams("t", ["embed"], result_limit=5, thread_limit=1)
+    budget = slack_threads.SLACK_THREAD_BUDGET
+    assert [r["metadata"].get("thread_replies") for r in results] == [1] * budget + [None] * (5 - budget)
+    assert len(expander.client.calls) == budget
+    # stubs were searched: the searcher itself fetched no threads
+    assert all(thread_limit == 0 for _, thread_limit in client._searchers)
+
+    expander.client.calls.clear()
+    slack_threads.THREADS.clear()
+    assert client.expand_threads(results, 1, budget=0) is results
+    assert client.expand_threads(results, 0) is results
+    assert [r["metadata"].get("thread_replies") for r in client.expand_threads(slack.hits["embed"], 1, budget=2)] \
+        == [1, 1, None, None, None]
+    assert len(expander.client.calls) == 2
+
+
+def test_searcher_fetches_threads_without_slack_sdk(slack):
+    client = get_slack_client("t")
+    client.threads.client = None
+    results = search_slack_ngrams("t", ["embed"], result_limit=2, thread_limit=4)
+    assert len(results) == 2 and "thread_replies" not in results[0]["metadata"]
+    assert list(client._searchers) == [(6, 4)]
@@ -0,0 +1,123 @@
+# tests/test_store.py
+import os
+import time
+
+import numpy as np
+
+from corpus import store as store_mod
+from corpus.sources import SOURCE_FILES
+from corpus.store import discover_shards, get_store, load_store
+
+DOCS = SOURCE_FILES["docs"]
+
+
+def test_store_is_parsed_once_and_reused(corpus):
+    corpus.write("docs", [("a", "alpha", [3, 4]), ("b", "beta", [0, 2])])
+    first = get_store(DOCS)
+    assert len(first) == 2
+    assert np.allclose(np.linalg.norm(first.matrix, axis=1), 1.0)  # rows pre-normalized
+    assert np.allclose(first.matrix[0], [0.6, 0.8])
+    assert get_store(DOCS) is first
+
+
+def test_store_reloads_when_content_changes(corpus):
+    corpus.write("docs", [("a", "alpha", [1, 0])])
+    first = get_store(DOCS)
+    corpus.write("docs", [("a", "alpha", [1, 0]), ("b", "beta", [0, 1])])
+    second = get_store(DOCS)
+    assert second is not first and len(second) == 2
+    assert second.digest != first.digest
+
+
+def test_touched_but_unchanged_file_is_not_reparsed(corpus, monkeypatch):
+    path = corpus.write("docs", [("a", "alpha", [1, 0])])
+    first = get_store(DOCS)
+    later = time.time() + 10
+    os.utime(path, (later, later))
+    monkeypatch.setattr(store_mod, "_parse_shard", lambda *a: (_ for _ in ()).throw(AssertionError("re-parsed")))
+    assert get_store(DOCS) is first
+
+
+def test_rows_without_embeddings_are_skipped(corpus):
+    corpus.write("docs", [("a", "alpha", [1, 0]), {"id": "x", "chunk_text": "no vector"}])
+    s = load_store(DOCS)
+    assert len(s) == 1
+    assert [p.name for p in discover_shards(DOCS)] == ["docs-000.jsonl"]
+
+
+def test_search_returns_best_chunks(corpus):
+    corpus.write("docs", [("a", "alpha", [1, 0]), ("b", "beta", [0, 1]), ("c", "gamma", [1, 1])])
+    assert [c["id"] for c in get_store(DOCS).search([1, 0.1], top_k=2)] == ["a", "c"]
+
+
+# -------- Lazy payloads --------
+def test_payload_is_read_back_by_offset(corpus):
+    rows = [{"id": f"c{i}", "chunk_text": f"text {i} é", "metadata": {"i": i}, "embedding": [1.0, float(i)]}
+            for i in range(3)]
+    corpus.write("docs", rows)
+    s = get_store(DOCS)
+    assert not hasattr(s, "chunks")              # only vectors, uids and offsets are resident
+    assert s.payload(2) == {"id": "c2", "chunk_text": "text 2 é", "metadata": {"i": 2}}
+    assert [p["id"] for p in s.payloads(np.array([1, 0]))] == ["c1", "c0"]
+
+
+def test_text_and_payload_skip_decoding_the_embedding(corpus, monkeypatch):
+    tricky = 'quoted "embedding": [1, 2] in the text'
+    corpus.write("docs", [{"id": "a", "embedding": [1.0, 0.5], "chunk_text": tricky, "metadata": {"path": "p"}}])
+    s = get_store(DOCS)
+    decoded = []
+    loads = store_mod.json.loads
+    monkeypatch.setattr(store_mod.json, "loads", lambda b: decoded.append(b) or loads(b))
+    assert s.text(0) == tricky
+    assert s.payload(0) == {"id": "a", "chunk_text": tricky, "metadata": {"path": "p"}}
+    assert decoded and not any(b"0.5" in line for line in decoded)
+
+def test_payloads_stay_pinned_to_the_loaded_version(corpus):
+    corpus.write("docs", [("a", "old text", [1, 0])])
+    s = load_store(DOCS)
+    corpus.write("docs", [("a", "new, longer text", [1, 0]), ("b", "beta", [0, 1])])
+    assert s.payload(0)["chunk_text"] == "old text"
+
+
+# -------- Shards --------
+def test_shards_are_merged_in_order(corpus):
+    corpus.write("docs", [("a", "alpha", [1, 0])], shard=0)
+    corpus.write("docs", [("b", "beta", [0, 1]), ("c", "gamma", [1, 1])], shard=1)
+    s = get_store(DOCS)
+    assert [sh.path.name for sh in s.shards] == ["docs-000.jsonl", "docs-001.jsonl"]
+    assert [s.payload(r)["id"] for r in range(3)] == ["a", "b", "c"]
+    assert s.shard_rows(1) == slice(1, 3)
+
+
+def test_only_changed_shards_are_reparsed(corpus, monkeypatch):
+    corpus.write("docs", [("a", "alpha", [1, 0])], shard=0)
+    corpus.write("docs", [("b", "beta", [0, 1])], shard=1)
+    first = get_store(DOCS)
+    parsed = []
+    parse = store_mod._parse_shard
+    monkeypatch.setattr(store_mod, "_parse_shard", lambda path, dtype: parsed.append(path) or parse(path, dtype))
+    corpus.write("docs", [("b", "beta", [0, 1]), ("c", "gamma", [1, 1])], shard=1)
+    corpus.write("docs", [("d", "delta", [1, 2])], shard=2)
+    s = get_store(DOCS)
+    assert [p.rsplit("/", 1)[1] for p in parsed] == ["docs-001.jsonl", "docs-002.jsonl"]
+    assert [s.payload(r)["id"] for r in range(len(s))] == ["a", "b", "c", "d"]
+    assert s.shards[0].mm is first.shards[0].mm  # unchanged shard keeps its mapping
+
+
+def test_removed_shard_drops_its_rows(corpus):
+    corpus.write("docs", [("a", "alpha", [1, 0])], shard=0)
+    gone = corpus.write("docs", [("b", "beta", [0, 1])], shard=1)
+    get_store(DOCS)
+    gone.unlink()
+    assert len(get_store(DOCS)) == 1
+
+
+def test_parallel_parse_matches_serial(corpus, monkeypatch, capsys):
+    paths = [corpus.write("docs", [(f"{i}-{j}", "x", [i, j, 1]) for j in range(5)], shard=i) for i in range(3)]
+    monkeypatch.setattr(store_mod, "PARALLEL_MIN_BYTES", 0)
+    serial = store_mod.parse_shards(paths, "float32", workers=1)
+    parallel = store_mod.parse_shards(paths, "float32", workers=2)
+    assert "Parallel shard load failed" not in capsys.readouterr().out
+    for a, b in zip(serial, parallel):
+        assert a["digest"] == b["digest"]
+        assert np.array_equal(a["matrix"], b["matrix"]) and np.array_equal(a["offsets"], b["offsets"])
@@ -0,0 +1,73 @@
+# tests/test_typesense.py
+import json
+
+import pytest
+
+from planning import helpers
+from tooling.common_utils import TYPESENSE_MAX_SEARCHES, rank_typesense_groups, typesense_ngram_body
+
+
+def group(url, **doc):
+    return {"hits": [{"document": {"url": url, **doc}}]}
+
+
+def test_one_search_per_distinct_ngram():
+    body = typesense_ngram_body({"collection": "omni-docs", "q": ""}, ["embed", "", "embed", "row level", " "])
+    assert [s["q"] for s in body["searches"]] == ["embed", "row level"]
+    assert all(s["collection"] == "omni-docs" for s in body["searches"])
+    many = typesense_ngram_body({}, [f"t{i}" for i in range(TYPESENSE_MAX_SEARCHES + 5)])
+    assert len(many["searches"]) == TYPESENSE_MAX_SEARCHES
+
+
+def test_urls_matched_by_several_ngrams_rank_first():
+    results = [
+        {"grouped_hits": [group("/a"), group("/b")]},
+        {"error": "bad query"},
+        {"grouped_hits": [group("/c"), group("/b"), {"hits": []}]},
+    ]
+    assert [d["url"] for d in rank_typesense_groups(results, 5)] == ["/b", "/a", "/c"]
+    assert [d["url"] for d in rank_typesense_groups(results, 1)] == ["/b"]
+    assert rank_typesense_groups(None) == []
+
+
+class _Response:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def typesense(monkeypatch):
+    posts = []
+
+    def post(url, headers=None, data=None, timeout=None):
+        body = json.loads(data)
+        posts.append(body)
+        return _Response({"results": [
+            {"grouped_hits": [group(f"/{s['q']}", content="indexed text", **{"hierarchy.lvl0": "Docs",
+                                                                              "hierarchy.lvl1": s["q"]})]}
+            for s in body["searches"]
+        ]})
+
+    monkeypatch.setattr(helpers.requests, "post", post)
+    monkeypatch.setattr(helpers, "fetch_pages", lambda urls: {u: f"live {u}" for u in urls if u != "/b"})
+    return posts
+
+
+def test_search_sends_one_request(typesense):
+    docs = helpers.search_typesense_ngrams({"ngram": ["a", "b", "a"]}, max_results=5)
+    assert len(typesense) == 1 and [s["q"] for s in typesense[0]["searches"]] == ["a", "b"]
+    assert docs == [
+        {"title": "Docs > a", "url": "/a", "content": "live /a"},
+        {"title": "Docs > b", "url": "/b", "content": "indexed text"},   # page fetch failed
+    ]
+
+
+def test_no_ngrams_no_request(typesense):
+    assert helpers.search_typesense_ngrams([]) == []
+    assert typesense == []
@@ -0,0 +1,87 @@
+# tests/test_unified.py
+import numpy as np
+import pytest
+
+from corpus.reduce import REDUCE_METHODS, build_reduction, recall_report
+from corpus.search import normalize_rows
+from corpus.sources import SOURCE_FILES
+from corpus.store import get_store
+from corpus.unified import build_unified, get_unified_index
+
+
+@pytest.fixture
+def sources(corpus):
+    corpus.write("docs", [("d1", "docs one", [1, 0, 0]), ("d2", "docs two", [0.9, 0.1, 0])])
+    corpus.write("community", [("c1", "community one", [0, 1, 0]), ("c2", "community two", [0.8, 0.2, 0])])
+    corpus.write("slack", [("s1", "slack one", [0, 0, 1])])
+    return corpus
+
+
+def test_sources_are_stacked_once(sources):
+    index = get_unified_index()
+    assert index.sources == tuple(SOURCE_FILES) and len(index) == 5
+    assert index.source_range("community") == (2, 4)
+    # the stores' matrices are views into the unified one
+    assert index.stores["docs"] is get_store(SOURCE_FILES["docs"])
+    assert np.shares_memory(index.stores["docs"].matrix, index.matrix)
+    assert index.chunk(3) == ("community", index.stores["community"].payload(1))
+
+
+def test_per_source_top_k_from_one_pass(sources):
+    index = get_unified_index()
+    hits = index.search_per_source([1, 0, 0], top_k={"docs": 1, "community": 2})
+    assert set(hits) == {"docs", "community"}
+    assert [index.chunk(r)[1]["id"] for r, _ in hits["docs"]] == ["d1"]
+    assert [index.chunk(r)[1]["id"] for r, _ in hits["community"]] == ["c2", "c1"]
+    assert index.search_per_source([1, 0, 0], top_k={"wiki": 3}) == {"wiki": []}
+
+
+def test_scores_are_shared_between_calls(sources):
+    index = get_unified_index()
+    assert index.score([1, 0, 0]) is index.score([1, 0, 0])
+
+
+def test_index_is_rebuilt_when_a_source_changes(sources):
+    first = get_unified_index()
+    assert get_unified_index() is first
+    sources.write("slack", [("s1", "slack one", [0, 0, 1]), ("s2", "slack two", [0, 1, 1])])
+    second = get_unified_index()
+    assert second is not first and len(second) == 6
+
+
+# -------- Reduced-dimension prefilter --------
+@pytest.fixture
+def low_rank():
+    """Rows that mostly live in 8 of 64 dims, like real embeddings' leading components."""
+    rng = np.random.default_rng(4)
+    basis = np.linalg.qr(rng.normal(size=(64, 64)))[0]
+    weights = np.concatenate([np.ones(8), np.full(56, 0.05)])
+    return normalize_rows((rng.normal(size=(400, 64)) * weights) @ basis.T)
+
+
+@pytest.mark.parametrize("method", REDUCE_METHODS)
+def test_reduction_shape(low_rank, method):
+    red = build_reduction(low_rank, 16, method)
+    assert red.matrix.shape == (400, 16) and red.dims == 16
+    assert build_reduction(low_rank, 64, method) is None      # not smaller
+    assert red.score(low_rank[:2], rows=np.array([3, 5])).shape == (2, 2)
+
+
+def test_two_stage_search_recovers_exact_recall(low_rank):
+    rows = {r["method"]: r for r in recall_report(low_rank, [16], ["pca"], n_queries=50, top_k=10)}
+    assert rows["pca"]["two_stage_recall"] >= 0.99
+    assert rows["pca"]["first_stage_recall"] <= rows["pca"]["two_stage_recall"]
+
+
+def test_unified_prefilter_matches_exact_search(corpus, low_rank):
+    corpus.write("docs", [(f"d{i}", "x", v) for i, v in enumerate(low_rank)])
+    corpus.write("community", [])
+    corpus.write("slack", [])
+    exact = get_unified_index()
+    reduced = build_unified(exact.stores, prefilter_dims=16)
+    assert reduced.approximate and reduced.reduction.dims == 16
+    for q in low_rank[:10]:
+        want = exact.search_per_source(q, top_k={"docs": 5})["docs"]
+        got = reduced.search_per_source(q, top_k={"docs": 5})["docs"]
+        assert [r for r, _ in got] == [r for r, _ in want]
+        assert np.allclose([s for _, s in got], [s for _, s in want], atol=1e-5)
@@ -1,5 +1,5 @@
 # tooling/common_utils.py
-from bs4 import BeautifulSoup
+from tooling.html_extract import extract_text
 
 SLACK_EXCLUSIONS = (
     " -in:customer-sla-breach -in:customer-triage -in:support-overflow "
@@ -22,7 +22,7 @@ def make_community_url(slug: str, topic_id: str) -> str | None:
     return None
 
 def html_to_text(s: str) -> str:
-    return BeautifulSoup(s or "", "html.parser").get_text(" ", strip=True)
+    return extract_text(s, main_only=False)
 
 def dedupe_by_url_or_text(items):
     seen, out = set(), []
@@ -33,3 +33,35 @@ def dedupe_by_url_or_text(items):
         seen.add(key)
         out.append(it)
     return out
+
+# -------- Typesense multi_search --------
+# server-side cap on searches per multi_search request (Typesense limit_multi_searches default)
+TYPESENSE_MAX_SEARCHES = 50
+TYPESENSE_RRF_K = 60
+
+def typesense_ngram_body(search_template: dict, ngrams) -> dict:
+    """One multi_search body with a search per distinct n-gram (in order, capped at TYPESENSE_MAX_SEARCHES)."""
+    distinct = list(dict.fromkeys(ng for ng in ngrams if ng and str(ng).strip()))
+    return {"searches": [{**search_template, "q": ng} for ng in distinct[:TYPESENSE_MAX_SEARCHES]]}
+
+def rank_typesense_groups(results, max_results: int = 5):
+    """
+    Merge the grouped hits of a multi_search response (one result per n-gram)
+    into the best `max_results` documents, one per url. A url scores
+    1 / (k + rank) in every n-gram's result list it appears in, so pages
+    matched by several n-grams rise to the top; ties keep n-gram order.
+    """
+    scores, docs = {}, {}
+    for result in results or []:
+        if not isinstance(result, dict) or "error" in result:
+            continue
+        for rank, group in enumerate(result.get("grouped_hits", [])):
+            hits = group.get("hits") or []
+            if not hits:
+                continue
+            doc = hits[0]["document"]
+            url = doc.get("url") or ""
+            scores[url] = scores.get(url, 0.0) + 1.0 / (TYPESENSE_RRF_K + rank + 1)
+            docs.setdefault(url, doc)
+    ranked = sorted(scores, key=lambda u: -scores[u])
+    return [docs[u] for u in ranked[:max_results]]
@@ -7,12 +7,20 @@ def needs_ngrams(fn):
         return fn(args, qa=qa, **kw)
     return wrapped
 
+def needs_query(fn):
+    def wrapped(args, qa: LazyQueryArtifacts, **kw):
+        if not args.get("query") and qa is not None:
+            args = {**args, "query": qa.raw_query}
+        return fn(args, qa=qa, **kw)
+    return wrapped
+
 def needs_embedding(fn):
     def wrapped(args, qa: LazyQueryArtifacts, **kw):
         if "query_embedding" not in args or args["query_embedding"] is None:
             args = {
                 **args,
                 "query_embedding": qa.query_embedding,
+                "query_embeddings": qa.query_embeddings,
                 "query_chunks": qa.query_chunks,
             }
         return fn(args, qa=qa, **kw)
@@ -0,0 +1,235 @@
+# tooling/html_extract.py
+"""
+Main-content text extraction for fetched pages.
+
+Parsing whole pages with BeautifulSoup's pure-Python `html.parser` is slow
+and drags navigation, sidebars and footers into the synthesis context.
+`extract_text` instead:
+
+    - parses with lxml (C) when installed, else BeautifulSoup (HTML_EXTRACT_ENGINE)
+    - reads at most HTML_MAX_BYTES (UTF-8 bytes for str input) of the document;
+      truncated markup is fine
+    - decodes raw bytes itself (`decode_html`): the HTTP charset, else the
+      page's <meta charset>, else UTF-8, else cp1252; lxml alone would read
+      undeclared pages as latin-1 and mangle every non-ASCII character
+    - keeps only the main content: the page's single <article>, else <main> /
+      [role=main], else <body>, minus scripts, nav, asides, forms and
+      sidebar / table-of-contents / breadcrumb / pagination blocks
+
+`python -m tooling.html_extract [files or urls]` benchmarks parse time per
+page against the old whole-page html.parser path.
+"""
+import argparse
+import codecs
+import os
+import re
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html as lxml_html
+    from lxml import etree
+except ImportError:  # optional: falls back to BeautifulSoup
+    lxml_html = None
+
+ENGINES = ("lxml", "bs4")
+HTML_EXTRACT_ENGINE = os.getenv("HTML_EXTRACT_ENGINE", "lxml" if lxml_html is not None else "bs4").lower()
+HTML_MAX_BYTES = int(os.getenv("HTML_MAX_BYTES", str(512 << 10)))
+
+# never content
+DROP_TAGS = ("script", "style", "noscript", "template", "svg", "iframe", "form", "button", "nav", "aside")
+# page chrome, dropped when no main container was found (inside <article>/<main> they hold titles)
+CHROME_TAGS = ("header", "footer")
+DROP_ROLES = ("navigation", "banner", "contentinfo", "complementary", "search")
+BOILERPLATE_RE = re.compile(
+    r"sidebar|navbar|breadcrumb|table-?of-?contents|(^|[\s_-])toc([\s_-]|$)|pagination|cookie|skip-?link",
+    re.IGNORECASE,
+)
+
+Html = Union[str, bytes]
+
+_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+_XML_DECL_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+# bytes of the document searched for a <meta charset>
+META_SCAN_BYTES = 4096
+FALLBACK_ENCODING = "cp1252"
+
+
+def charset_of(content_type: Optional[str]) -> Optional[str]:
+    """Charset declared in a Content-Type header, if any."""
+    m = _CHARSET_RE.search(content_type or "")
+    return m.group(1) if m else None
+
+
+def decode_html(data: bytes, encoding: Optional[str] = None) -> str:
+    """
+    Text of raw page bytes, decoded with `encoding` (the HTTP charset), else
+    the page's <meta charset>, else UTF-8, else cp1252. A multi-byte character
+    cut off at the end of `data` is dropped.
+    """
+    candidates = [encoding] if encoding else []
+    m = _META_CHARSET_RE.search(data[:META_SCAN_BYTES])
+    if m:
+        candidates.append(m.group(1).decode("ascii"))
+    for enc in candidates + ["utf-8", FALLBACK_ENCODING]:
+        try:
+            return codecs.getincrementaldecoder(enc)().decode(data, final=False)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return data.decode("latin-1")
+
+
+def _is_boilerplate(attrs) -> bool:
+    if attrs.get("role") in DROP_ROLES:
+        return True
+    names = attrs.get("class") or ""
+    names = " ".join(names) if isinstance(names, list) else names
+    return bool(BOILERPLATE_RE.search(f"{names} {attrs.get('id') or ''}"))
+
+
+# -------- lxml --------
+def _lxml_text(html: str, main_only: bool) -> str:
+    try:
+        # lxml rejects str input that still carries an XML encoding declaration
+        doc = lxml_html.document_fromstring(_XML_DECL_RE.sub("", html, count=1))
+    except (etree.ParserError, ValueError):
+        return ""
+    etree.strip_elements(doc, etree.Comment, with_tail=False)
+    root = doc
+    if main_only:
+        articles = doc.xpath("//article")
+        mains = articles if len(articles) == 1 else doc.xpath("//main") or doc.xpath("//*[@role='main']")
+        root = mains[0] if mains else (doc.find("body") if doc.find("body") is not None else doc)
+        drop = DROP_TAGS if mains else DROP_TAGS + CHROME_TAGS
+        for el in list(root.iter(*drop)):
+            el.drop_tree()
+        for el in [el for el in root.iter(etree.Element) if _is_boilerplate(el.attrib)]:
+            if el is not root and el.getparent() is not None:
+                el.drop_tree()
+    else:
+        for el in list(root.iter("script", "style", "noscript", "template")):
+            el.drop_tree()
+    return " ".join(t.strip() for t in root.itertext() if t.strip())
+
+
+# -------- BeautifulSoup --------
+def _bs4_text(html: str, main_only: bool) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    root = soup
+    if main_only:
+        articles = soup.find_all("article")
+        main = articles[0] if len(articles) == 1 else soup.find("main") or soup.find(attrs={"role": "main"})
+        root = main or soup.body or soup
+        for el in root.find_all(DROP_TAGS if main else DROP_TAGS + CHROME_TAGS):
+            el.decompose()
+        for el in root.find_all(lambda tag: _is_boilerplate(tag.attrs)):
+            if not el.decomposed:
+                el.decompose()
+    else:
+        for el in soup(["script", "style", "noscript", "template"]):
+            el.decompose()
+    return root.get_text(" ", strip=True)
+
+
+_EXTRACTORS: Dict[str, Callable[[str, bool], str]] = {"lxml": _lxml_text, "bs4": _bs4_text}
+
+
+def truncate_utf8(text: str, max_bytes: int) -> str:
+    """`text` cut to at most `max_bytes` UTF-8 bytes, on a character boundary."""
+    # a character is at most 4 bytes: short strings need no encoding pass
+    if not max_bytes or len(text) <= max_bytes // 4:
+        return text
+    data = text.encode("utf-8")
+    return text if len(data) <= max_bytes else data[:max_bytes].decode("utf-8", errors="ignore")
+
+
+def extract_text(html: Optional[Html], main_only: bool = True, max_bytes: int = HTML_MAX_BYTES,
+                 engine: str = HTML_EXTRACT_ENGINE, encoding: Optional[str] = None) -> str:
+    """
+    Readable text of `html`: str, or raw bytes decoded per `decode_html`
+    (`encoding` is the response's declared charset). Only the first
+    `max_bytes` bytes are parsed.
+    """
+    if not html:
+        return ""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown HTML engine: {engine} (expected one of {ENGINES})")
+    if engine == "lxml" and lxml_html is None:
+        engine = "bs4"
+    if isinstance(html, bytes):
+        html = decode_html(html[:max_bytes] if max_bytes else html, encoding)
+    else:
+        html = truncate_utf8(html, max_bytes)
+    return _EXTRACTORS[engine](html, main_only)
+
+
+# -------- Benchmark --------
+def sample_page(sections: int = 60) -> str:
+    """A docs-like page: header, nav and sidebar around an article, plus a footer."""
+    nav = "".join(f'<li><a href="/docs/page-{i}">Navigation entry {i}</a></li>' for i in range(400))
+    body = "".join(
+        f"<h2 id='s{i}'>Section {i}</h2><p>Workbook fields, topics and dashboards: paragraph {i} "
+        f"explains how the model layer resolves joins.</p><pre><code>dimension: field_{i}</code></pre>"
+        for i in range(sections)
+    )
+    toc = "".join(f"<li><a href='#s{i}'>Section {i}</a></li>" for i in range(sections))
+    return (
+        "<html><head><title>Docs</title><script>var analytics = {};</script><style>.x{color:red}</style></head>"
+        f"<body><header class='navbar'><a href='/'>Home</a></header><nav class='menu'><ul>{nav}</ul></nav>"
+        f"<main><div class='row'><article><header><h1>Guide</h1></header>{body}</article>"
+        f"<div class='tableOfContents'><ul>{toc}</ul></div></div></main>"
+        "<footer>Copyright, legal and social links</footer></body></html>"
+    )
+
+
+def _time(fn: Callable[[], str], repeat: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = fn()
+    return {"ms": (time.perf_counter() - start) * 1000 / repeat, "chars": len(text)}
+
+
+def benchmark(pages: Dict[str, Html], repeat: int = 5) -> List[Dict[str, object]]:
+    """Per page: the old whole-page html.parser path vs extract_text on each available engine."""
+    rows = []
+    for name, html in pages.items():
+        row = {"page": name, "bytes": len(html),
+               "before": _time(lambda: BeautifulSoup(html, "html.parser").get_text(" ", strip=True), repeat)}
+        for engine in ENGINES:
+            if engine == "lxml" and lxml_html is None:
+                continue
+            row[engine] = _time(lambda: extract_text(html, engine=engine), repeat)
+        rows.append(row)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark HTML text extraction per page.")
+    parser.add_argument("pages", nargs="*", help="HTML files or URLs (default: a synthetic docs page)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    pages: Dict[str, Html] = {}
+    for src in args.pages:
+        if src.startswith(("http://", "https://")):
+            import requests
+            pages[src] = requests.get(src, timeout=15, headers={"User-Agent": "Mozilla/5.0"}).content
+        else:
+            with open(src, "rb") as f:
+                pages[src] = f.read()
+    if not pages:
+        pages["synthetic docs page"] = sample_page()
+
+    engines = [e for e in ENGINES if e != "lxml" or lxml_html is not None]
+    print(f"{'page':<40}{'KB':>8}{'before ms':>11}{'chars':>9}" + "".join(f"{e + ' ms':>10}{'chars':>9}" for e in engines))
+    for r in benchmark(pages, args.repeat):
+        line = f"{str(r['page'])[-40:]:<40}{r['bytes'] / 1024:>8.0f}{r['before']['ms']:>11.2f}{r['before']['chars']:>9}"
+        line += "".join(f"{r[e]['ms']:>10.2f}{r[e]['chars']:>9}" for e in engines)
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
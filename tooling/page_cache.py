@@ -0,0 +1,152 @@
+# tooling/page_cache.py
+"""
+Two-level cache of fetched page text, keyed by URL.
+
+    memory   process-wide LRU shared by all sessions, saved in corpus
+             snapshots (corpus/snapshot.py) so a restarted process keeps it
+    disk     sqlite file shared by all processes (PAGE_CACHE_DB), capped at
+             PAGE_CACHE_MAX_MB with least-recently-used eviction
+
+Entries hold the extracted text plus the ETag / Last-Modified of the
+response. Within PAGE_CACHE_TTL seconds an entry is served as is; after
+that the fetcher revalidates it with a conditional GET and a 304 reuses the
+stored text, so neither the download nor the HTML parse is repeated.
+"""
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from corpus.cache import LRUCache
+from corpus.snapshot import register_cache
+
+PAGE_CACHE_SIZE = 512
+PAGE_CACHE_DB = Path(os.getenv("PAGE_CACHE_DB", "sources/cache/pages.sqlite"))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", str(6 * 3600)))
+PAGE_CACHE_MAX_MB = float(os.getenv("PAGE_CACHE_MAX_MB", "200"))
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float           # epoch seconds of the last 200 or 304
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() - self.fetched_at < PAGE_CACHE_TTL
+
+    def validators(self) -> dict:
+        """Conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DiskPageCache:
+    def __init__(self, path: Path = PAGE_CACHE_DB, max_bytes: int = int(PAGE_CACHE_MAX_MB * (1 << 20))):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._bytes = 0
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, text TEXT, etag TEXT, "
+                "last_modified TEXT, fetched_at REAL, accessed_at REAL, size INTEGER)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)")
+            db.commit()
+            self._bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            self._db = db
+        except (OSError, sqlite3.Error) as e:
+            print(f"[WARN] Page cache disabled, cannot open {self.path}: {e}")
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        if self._db is None:
+            return None
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT text, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+                    self._db.commit()
+            except sqlite3.Error as e:
+                print(f"[WARN] Page cache read failed: {e}")
+                return None
+        return CachedPage(*row) if row is not None else None
+
+    def put(self, url: str, page: CachedPage) -> None:
+        if self._db is None:
+            return
+        size = len(page.text.encode("utf-8"))
+        with self._lock:
+            try:
+                old = self._db.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, page.text, page.etag, page.last_modified, page.fetched_at, time.time(), size),
+                )
+                self._bytes += size - (old[0] if old else 0)
+                if self._bytes > self.max_bytes:
+                    self._evict()
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"[WARN] Page cache write failed: {e}")
+
+    def _evict(self) -> None:
+        """Drop least recently used pages until the cache is back under 90% of its cap."""
+        # other processes write to the same file: start from the real total
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        doomed = []
+        for url, size in self._db.execute("SELECT url, size FROM pages ORDER BY accessed_at"):
+            if self._bytes <= target:
+                break
+            doomed.append((url,))
+            self._bytes -= size
+        self._db.executemany("DELETE FROM pages WHERE url = ?", doomed)
+
+
+# -------- Process-wide cache --------
+PAGES: LRUCache = LRUCache(PAGE_CACHE_SIZE)
+register_cache("pages", PAGES.items,
+               lambda items: PAGES.update((url, p) for url, p in items if isinstance(p, CachedPage)),
+               PAGES.version)
+
+_DISK: Optional[DiskPageCache] = None
+_LOCK = threading.Lock()
+
+
+def disk_cache() -> DiskPageCache:
+    global _DISK
+    with _LOCK:
+        if _DISK is None:
+            _DISK = DiskPageCache()
+        return _DISK
+
+
+def lookup(url: str) -> Optional[CachedPage]:
+    """Cached entry for `url` (memory, else disk), fresh or not."""
+    page = PAGES.get(url)
+    if page is None:
+        page = disk_cache().get(url)
+        if page is not None:
+            PAGES.put(url, page)
+    return page
+
+
+def remember(url: str, page: CachedPage) -> None:
+    PAGES.put(url, page)
+    disk_cache().put(url, page)
@@ -0,0 +1,134 @@
+# tooling/page_fetcher.py
+"""
+Concurrent live-page fetcher.
+
+All pages of a batch are fetched in parallel on a shared, bounded thread
+pool through one keep-alive `requests.Session` (pooled connections per
+host). Requests to the same host are spaced by a per-host rate limit
+instead of fixed sleeps, and a batch waits at most its deadline: pages not
+back by then come back as None, while their fetches finish in the
+background and land in the page cache for the next question.
+
+Cached pages (tooling/page_cache.py) are served without a request while
+fresh and revalidated with a conditional GET once stale; if a fetch fails
+the stale text is still better than nothing.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import replace
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tooling.html_extract import charset_of, extract_text
+from tooling.page_cache import CachedPage, lookup, remember
+
+FETCH_WORKERS = int(os.getenv("PAGE_FETCH_WORKERS", "8"))
+# requests started per second per host
+HOST_RPS = float(os.getenv("PAGE_FETCH_HOST_RPS", "20"))
+# seconds a batch waits for its pages
+FETCH_DEADLINE = float(os.getenv("PAGE_FETCH_DEADLINE", "6"))
+FETCH_TIMEOUT = 8
+USER_AGENT = "Mozilla/5.0"
+
+
+class HostRateLimiter:
+    """Spaces request starts to the same host at least 1 / rps apart."""
+
+    def __init__(self, rps: float):
+        self.interval = 1.0 / rps if rps > 0 else 0.0
+        self._next: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str, deadline: Optional[float] = None) -> bool:
+        """Wait for the host's next slot; False (without waiting) if it falls after `deadline`."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, now))
+            if deadline is not None and slot > deadline:
+                return False
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+        return True
+
+
+class PageFetcher:
+    def __init__(self, workers: int = FETCH_WORKERS, host_rps: float = HOST_RPS, timeout: float = FETCH_TIMEOUT):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.limiter = HostRateLimiter(host_rps)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="page-fetch")
+
+    def _get(self, url: str, deadline: Optional[float] = None, timeout: Optional[float] = None) -> Optional[str]:
+        cached = lookup(url)
+        if cached is not None and cached.fresh:
+            return cached.text
+        stale = cached.text if cached is not None else None
+        if not self.limiter.acquire(urlsplit(url).netloc, deadline):
+            return stale
+        try:
+            resp = self.session.get(url, timeout=timeout or self.timeout,
+                                    headers=cached.validators() if cached is not None else None)
+            if resp.status_code == 304 and cached is not None:
+                remember(url, replace(cached, fetched_at=time.time()))
+                return cached.text
+            resp.raise_for_status()
+            # decoded by extract_text: requests would assume latin-1 for an undeclared text/html charset
+            text = extract_text(resp.content, encoding=charset_of(resp.headers.get("Content-Type")))
+            page = CachedPage(text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), time.time())
+        except Exception:
+            return stale
+        remember(url, page)
+        return page.text
+
+    def fetch(self, url: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Text of one page (cached)."""
+        return self._get(url, timeout=timeout)
+
+    def fetch_many(self, urls: Iterable[str], deadline: float = FETCH_DEADLINE) -> Dict[str, Optional[str]]:
+        """{url: text or None} for all `urls`, fetched concurrently within `deadline` seconds."""
+        out: Dict[str, Optional[str]] = {}
+        missing = []
+        for url in dict.fromkeys(u for u in urls if u):
+            cached = lookup(url)
+            out[url] = cached.text if cached is not None else None
+            if cached is None or not cached.fresh:
+                missing.append(url)
+        if not missing:
+            return out
+        until = time.monotonic() + deadline
+        futures = {self.pool.submit(self._get, url, until): url for url in missing}
+        done, _ = wait(futures, timeout=deadline)
+        for fut in done:
+            out[futures[fut]] = fut.result()
+        return out
+
+
+# -------- Process-wide fetcher --------
+_FETCHER: Optional[PageFetcher] = None
+_LOCK = threading.Lock()
+
+
+def get_fetcher() -> PageFetcher:
+    global _FETCHER
+    with _LOCK:
+        if _FETCHER is None:
+            _FETCHER = PageFetcher()
+        return _FETCHER
+
+
+def fetch_page(url: str, timeout: Optional[float] = None) -> Optional[str]:
+    return get_fetcher().fetch(url, timeout)
+
+
+def fetch_pages(urls: Iterable[str], deadline: float = FETCH_DEADLINE) -> Dict[str, Optional[str]]:
+    return get_fetcher().fetch_many(urls, deadline)
@@ -2,6 +2,14 @@ import streamlit as st
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional, Callable
 
+from corpus.cache import LRUCache
+from corpus.snapshot import register_cache
+
+# --- PROCESS-LEVEL CACHE: shared by all sessions, saved in corpus snapshots ---
+QUERY_EMBED_CACHE_SIZE = 2048
+QUERY_EMBEDDINGS: LRUCache = LRUCache(QUERY_EMBED_CACHE_SIZE)
+register_cache("query_embeddings", QUERY_EMBEDDINGS.items, QUERY_EMBEDDINGS.update, QUERY_EMBEDDINGS.version)
+
 @dataclass
 class LazyQueryArtifacts:
     raw_query: str
@@ -24,6 +32,11 @@ class LazyQueryArtifacts:
             self._build_embedding()
         return self._chunks or []
 
+    @property
+    def query_embeddings(self) -> List[List[float]]:
+        """One embedding per query chunk, for multi-vector search."""
+        return [c["embedding"] for c in self.query_chunks if c.get("embedding") is not None]
+
     @property
     def query_embedding(self) -> Optional[List[float]]:
         if self._embedding is None and self._embedding_builder:
@@ -40,8 +53,9 @@ class LazyQueryArtifacts:
             st.session_state["embedding_cache"] = {}
 
         cache_key = self.raw_query.strip().lower()
-        if cache_key in st.session_state["embedding_cache"]:
-            cached = st.session_state["embedding_cache"][cache_key]
+        cached = st.session_state["embedding_cache"].get(cache_key) or QUERY_EMBEDDINGS.get(cache_key)
+        if cached is not None:
+            st.session_state["embedding_cache"][cache_key] = cached
             self._chunks = cached["chunks"]
             self._embedding = cached["embedding"]
             return
@@ -51,7 +65,10 @@ class LazyQueryArtifacts:
         self._chunks = res.get("chunks", [])
         self._embedding = res.get("embedding")
 
-        st.session_state["embedding_cache"][cache_key] = {
+        cached = {
             "chunks": self._chunks,
             "embedding": self._embedding
         }
+        st.session_state["embedding_cache"][cache_key] = cached
+        if self._embedding is not None:
+            QUERY_EMBEDDINGS.put(cache_key, cached)
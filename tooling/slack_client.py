@@ -0,0 +1,171 @@
+# tooling/slack_client.py
+"""
+Shared Slack search client.
+
+One long-lived client per token keeps its SlackSearcher instances (and
+their HTTP connections) for the life of the process instead of building a
+new searcher per n-gram. A batch of queries is searched concurrently on a
+bounded thread pool (SLACK_SEARCH_CONCURRENCY, kept low for Slack's
+search rate limits); results are merged and deduped by permalink as each
+query returns, then ordered by (query position, rank within the query).
+
+`search_slack_ngrams` searches a question's n-grams through the query
+planner (tooling/slack_query.py): only the most specific n-grams are
+searched, the shorter ones made of their terms are recovered by re-scoring
+those results locally. Those searches return message stubs, and threads are
+fetched afterwards for the top hits only (tooling/slack_threads.py). With a
+timeout, whatever searches and threads are back by then are returned.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed, wait
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from import_shims import SlackSearcher
+from tooling.slack_query import SLACK_MAX_QUERIES, SLACK_QUERY_PLANNER, fetch_limit, plan_slack_queries, rescore
+from tooling.slack_threads import SLACK_THREAD_BUDGET, ThreadExpander, message_ts
+
+SLACK_SEARCH_CONCURRENCY = int(os.getenv("SLACK_SEARCH_CONCURRENCY", "4"))
+
+
+def result_key(res: Any) -> str:
+    """Dedupe key of a search result: its permalink, else its text."""
+    if isinstance(res, dict):
+        return (res.get("metadata") or {}).get("permalink") or res.get("text", "")
+    return str(res)
+
+
+class SlackSearchClient:
+    def __init__(self, slack_token: Optional[str], concurrency: int = SLACK_SEARCH_CONCURRENCY):
+        self.slack_token = slack_token
+        self.pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="slack-search")
+        self._searchers: Dict[Tuple[int, int], Any] = {}
+        self._lock = threading.Lock()
+        self.threads = ThreadExpander(slack_token)
+
+    def searcher(self, result_limit: int, thread_limit: int):
+        key = (result_limit, thread_limit)
+        with self._lock:
+            if key not in self._searchers:
+                self._searchers[key] = SlackSearcher(
+                    slack_token=self.slack_token, result_limit=result_limit, thread_limit=thread_limit)
+            return self._searchers[key]
+
+    def _search_one(self, query: str, result_limit: int, thread_limit: int) -> List[Any]:
+        try:
+            return list(self.searcher(result_limit, thread_limit).search(query) or [])
+        except Exception as e:
+            print(f"[WARN] Slack search failed for {query[:60]!r}: {e}")
+            return []
+
+    def search_many(self, queries: Iterable[str], result_limit: int = 5, thread_limit: int = 5,
+                    timeout: Optional[float] = None) -> List[Any]:
+        """
+        Results of all `queries` (searched concurrently), deduped by permalink,
+        in query order. Queries still running after `timeout` seconds are dropped.
+        """
+        queries = list(dict.fromkeys(q for q in queries if q and q.strip()))
+        best: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+        futures = {self.pool.submit(self._search_one, q, result_limit, thread_limit): i for i, q in enumerate(queries)}
+        try:
+            for fut in as_completed(futures, timeout=timeout):
+                qi = futures[fut]
+                for rank, res in enumerate(fut.result()):
+                    key = result_key(res)
+                    if key not in best or (qi, rank) < best[key][0]:
+                        best[key] = ((qi, rank), res)
+        except FuturesTimeout:
+            late = [queries[i] for fut, i in futures.items() if not fut.done()]
+            for fut in futures:
+                fut.cancel()
+            print(f"[WARN] Slack search deadline ({timeout:g}s) reached; dropped: {', '.join(late)}")
+        return [res for _, res in sorted(best.values(), key=lambda e: e[0])]
+
+    def expand_threads(self, results: List[Any], reply_limit: int = 5, budget: int = SLACK_THREAD_BUDGET,
+                       timeout: Optional[float] = None) -> List[Any]:
+        """
+        `results` with thread replies added to the first `budget` hits, fetched
+        concurrently; hits whose thread is not back within `timeout` stay as they are.
+        """
+        top = min(budget, len(results)) if reply_limit > 0 else 0
+        if not top:
+            return results
+        futures = [self.pool.submit(self.threads.expand, res, reply_limit) for res in results[:top]]
+        done, _ = wait(futures, timeout=timeout)
+        expanded = [fut.result() if fut in done else res for fut, res in zip(futures, results[:top])]
+        return expanded + results[top:]
+
+
+# -------- Process-wide clients --------
+_CLIENTS: Dict[Optional[str], SlackSearchClient] = {}
+_LOCK = threading.Lock()
+
+
+def get_slack_client(slack_token: Optional[str]) -> SlackSearchClient:
+    with _LOCK:
+        if slack_token not in _CLIENTS:
+            _CLIENTS[slack_token] = SlackSearchClient(slack_token)
+        return _CLIENTS[slack_token]
+
+
+def search_slack(slack_token: Optional[str], queries: Iterable[str], result_limit: int = 5,
+                 thread_limit: int = 5) -> List[Any]:
+    return get_slack_client(slack_token).search_many(queries, result_limit, thread_limit)
+
+
+def search_slack_ngrams(slack_token: Optional[str], ngrams: Iterable[str], exclusions: str = "",
+                        result_limit: int = 5, thread_limit: int = 5, timeout: Optional[float] = None) -> List[Any]:
+    """
+    Slack results for a question's n-grams, `exclusions` appended to every query.
+    With the planner on, up to `result_limit` results per n-gram searched or
+    recovered are returned, best local score first. Up to `thread_limit` replies are added
+    to the top SLACK_THREAD_BUDGET hits. With `timeout`, whatever is back
+    after that many seconds is returned.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    client = get_slack_client(slack_token)
+    # stubs first when threads can be expanded after ranking
+    search_threads = 0 if client.threads.available else thread_limit
+    ngrams = [ng for ng in ngrams or [] if ng and ng.strip()]
+    if not SLACK_QUERY_PLANNER:
+        results = client.search_many([ng + exclusions for ng in ngrams], result_limit, search_threads, timeout)
+    else:
+        plan = plan_slack_queries(ngrams)
+        if plan.unsearched:
+            print(f"[WARN] Slack query budget ({SLACK_MAX_QUERIES}) reached; not searched: "
+                  f"{', '.join(' '.join(p) for p in plan.unsearched)}")
+        per_query = max((len(q.recovers) for q in plan.queries), default=1)
+        results = client.search_many(plan.with_exclusions(exclusions), fetch_limit(result_limit, per_query),
+                                     search_threads, timeout)
+        results = rescore(results, plan.phrases)[:result_limit * plan.answered]
+    if not client.threads.available:
+        return results
+    remaining = None if deadline is None else deadline - time.monotonic()
+    if remaining is not None and remaining <= 0:
+        return results
+    return client.expand_threads(results, thread_limit, timeout=remaining)
+
+
+def search_slack_since(slack_token: Optional[str], ngrams: Iterable[str], since: Optional[float],
+                       exclusions: str = "", result_limit: int = 5, thread_limit: int = 5,
+                       fresh_for: float = 0.0, timeout: Optional[float] = None) -> List[Any]:
+    """
+    `search_slack_ngrams` limited to messages posted after `since` (epoch
+    seconds; None = no limit), e.g. the freshness gap of a local index.
+    Nothing is searched while `since` is less than `fresh_for` seconds ago.
+    """
+    if since is not None and time.time() - since < fresh_for:
+        return []
+    if since is None:
+        return search_slack_ngrams(slack_token, ngrams, exclusions, result_limit, thread_limit, timeout)
+    # Slack's after: is day-granular and exclusive; older messages of that day are dropped below
+    after = time.strftime(" after:%Y-%m-%d", time.gmtime(since - 86400))
+    out = []
+    for res in search_slack_ngrams(slack_token, ngrams, exclusions + after, result_limit, thread_limit, timeout):
+        meta = (res.get("metadata") or {}) if isinstance(res, dict) else {}
+        # the message's own ts: a new reply to an old thread is still new
+        ts = meta.get("ts") or message_ts(meta.get("permalink"))
+        if ts is None or float(ts) > since:
+            out.append(res)
+    return out
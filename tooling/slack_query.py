@@ -0,0 +1,122 @@
+# tooling/slack_query.py
+"""
+Slack query planner.
+
+The keyword extractor yields unigrams, bigrams and trigrams for a question.
+Searching each one separately costs a dozen or more `search.messages` calls,
+and Slack's tier-2 limits allow about 20 a minute.
+
+Slack ANDs the terms of a query, so every hit of a query contains every
+phrase made of its terms. The planner therefore:
+
+    1. normalizes and dedupes the n-grams
+    2. searches the most specific phrases first (most distinct terms); a phrase
+       whose terms are all in a searched query is recovered from that query's
+       results instead of searched ("embed dashboard" and "embed" from
+       "embed dashboard row")
+    3. never ANDs unrelated phrases into one query, which would lose every
+       message that does not mention all of them
+
+Recovered phrases are ranked, not searched: messages that match one of them
+but not the longer query are not fetched. Phrases beyond the SLACK_MAX_QUERIES
+budget are neither searched nor recovered. They are reported in
+`SlackQueryPlan.unsearched`, never dropped silently. Each query over-fetches
+(more when it recovers more phrases), and the merged results are re-scored
+locally against all the original n-grams, so messages matching more and
+longer phrases rank first.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# off: one search per n-gram, as before
+SLACK_QUERY_PLANNER = os.getenv("SLACK_QUERY_PLANNER", "1").lower() not in ("0", "false", "no")
+SLACK_MAX_QUERIES = int(os.getenv("SLACK_MAX_QUERIES", "8"))
+# per-query results requested, as a multiple of the tool's result limit (Slack caps a page at 100)
+OVERFETCH = 3
+SLACK_PAGE_MAX = 100
+
+_TOKEN_RE = re.compile(r"[\w'-]+")
+
+
+def phrase_tokens(text: str) -> Tuple[str, ...]:
+    return tuple(_TOKEN_RE.findall((text or "").lower()))
+
+
+def _contains(longer: Tuple[str, ...], shorter: Tuple[str, ...]) -> bool:
+    n = len(shorter)
+    return any(longer[i:i + n] == shorter for i in range(len(longer) - n + 1))
+
+
+Phrase = Tuple[str, ...]
+
+
+@dataclass
+class SlackQuery:
+    terms: Phrase                                          # ANDed by Slack
+    recovers: List[Phrase] = field(default_factory=list)   # phrases ranked from this query's results, its own first
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.terms)
+
+
+@dataclass
+class SlackQueryPlan:
+    phrases: List[Phrase]                                # every distinct n-gram, for rescoring
+    queries: List[SlackQuery]                            # what is sent to Slack
+    unsearched: List[Phrase] = field(default_factory=list)  # over the query budget: neither searched nor recovered
+
+    @property
+    def answered(self) -> int:
+        """Phrases searched or recovered."""
+        return len(self.phrases) - len(self.unsearched)
+
+    def with_exclusions(self, exclusions: str) -> List[str]:
+        return [q.text + exclusions for q in self.queries]
+
+    def recovered_by(self, phrase: Phrase) -> Optional[SlackQuery]:
+        return next((q for q in self.queries if phrase in q.recovers), None)
+
+
+def plan_slack_queries(ngrams: Iterable[str], max_queries: int = SLACK_MAX_QUERIES) -> SlackQueryPlan:
+    phrases = list(dict.fromkeys(t for t in (phrase_tokens(ng) for ng in ngrams or []) if t))
+    queries: List[SlackQuery] = []
+    unsearched = []
+    # most terms first: a specific query recovers every phrase made of its terms
+    for phrase in sorted(phrases, key=lambda p: -len(set(p))):
+        terms = set(phrase)
+        query = next((q for q in queries if terms.issubset(q.terms)), None)
+        if query is not None:
+            query.recovers.append(phrase)
+        elif len(queries) < max_queries:
+            queries.append(SlackQuery(tuple(dict.fromkeys(phrase)), [phrase]))
+        else:
+            unsearched.append(phrase)
+    return SlackQueryPlan(phrases, queries, unsearched)
+
+
+def fetch_limit(result_limit: int, phrases: int = 1) -> int:
+    """Results to request per query that answers `phrases` n-grams of `result_limit` results each."""
+    return min(SLACK_PAGE_MAX, result_limit * max(OVERFETCH, phrases))
+
+
+def rescore(results: List[Any], phrases: List[Phrase]) -> List[Any]:
+    """
+    Order merged results by local relevance: each original n-gram found in the
+    message counts its length (phrase matches outweigh single words), and
+    Slack's own order breaks ties.
+    """
+    scored = []
+    for pos, res in enumerate(results):
+        text = res.get("text", "") if isinstance(res, dict) else str(res)
+        tokens = phrase_tokens(text)
+        score = sum(len(p) for p in phrases if _contains(tokens, p))
+        scored.append((-score, pos, res))
+    return [res for _, _, res in sorted(scored, key=lambda e: e[:2])]
+
+
+def plan_summary(plan: SlackQueryPlan) -> Dict[str, Any]:
+    return {"ngrams": len(plan.phrases), "queries": [q.text for q in plan.queries],
+            "unsearched": [" ".join(p) for p in plan.unsearched]}
@@ -0,0 +1,89 @@
+# tooling/slack_threads.py
+"""
+Deferred Slack thread expansion.
+
+Searching with `thread_limit > 0` makes SlackSearcher call
+`conversations.replies` for every raw hit, before merging and ranking decide
+which hits are kept. Searches now return plain message stubs instead
+(`thread_limit=0`) and only the top SLACK_THREAD_BUDGET hits of a query
+have their threads fetched, concurrently, once ranking is done.
+
+A hit's channel and thread come from its permalink
+(`.../archives/<channel>/p<ts digits>[?thread_ts=<ts>]`). Replies are kept
+in a short-lived process cache, so follow-up questions citing the same
+thread reuse them. Without slack_sdk, callers fall back to the searcher's own
+thread fetching.
+"""
+import os
+import re
+import time
+from typing import Any, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from corpus.cache import LRUCache
+
+try:
+    from slack_sdk import WebClient
+except ImportError:  # optional: threads are then fetched by SlackSearcher
+    WebClient = None
+
+# threads expanded per query
+SLACK_THREAD_BUDGET = int(os.getenv("SLACK_THREAD_BUDGET", "3"))
+THREAD_CACHE_SIZE = 256
+THREAD_CACHE_TTL = 600
+
+_PERMALINK_RE = re.compile(r"/archives/([A-Z0-9]+)/p(\d{10})(\d{6})")
+
+# (channel, thread_ts, limit) -> (fetched_at, replies)
+THREADS: LRUCache = LRUCache(THREAD_CACHE_SIZE)
+
+
+def parse_permalink(url: Optional[str]) -> Optional[Tuple[str, str]]:
+    """(channel id, thread ts) of a message permalink, None if it is not one."""
+    m = _PERMALINK_RE.search(url or "")
+    if not m:
+        return None
+    thread_ts = parse_qs(urlsplit(url).query).get("thread_ts")
+    return m.group(1), thread_ts[0] if thread_ts else f"{m.group(2)}.{m.group(3)}"
+
+
+def message_ts(url: Optional[str]) -> Optional[str]:
+    """The message's own ts from its permalink (for a reply, not its thread's)."""
+    m = _PERMALINK_RE.search(url or "")
+    return f"{m.group(2)}.{m.group(3)}" if m else None
+
+
+class ThreadExpander:
+    def __init__(self, slack_token: Optional[str]):
+        self.client = WebClient(token=slack_token) if WebClient is not None else None
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    def replies(self, channel: str, thread_ts: str, limit: int) -> List[str]:
+        """Texts of up to `limit` replies in the thread (the parent message excluded)."""
+        key = (channel, thread_ts, limit)
+        hit = THREADS.get(key)
+        if hit is not None and time.time() - hit[0] < THREAD_CACHE_TTL:
+            return hit[1]
+        try:
+            resp = self.client.conversations_replies(channel=channel, ts=thread_ts, limit=limit + 1)
+        except Exception as e:
+            print(f"[WARN] Slack thread fetch failed for {channel}/{thread_ts}: {e}")
+            return []
+        replies = [m.get("text", "") for m in resp.get("messages", []) if m.get("ts") != thread_ts][:limit]
+        THREADS.put(key, (time.time(), replies))
+        return replies
+
+    def expand(self, res: Any, limit: int) -> Any:
+        """`res` with its thread replies appended to the text (unchanged if it has none)."""
+        if not isinstance(res, dict):
+            return res
+        meta = res.get("metadata") or {}
+        ref = parse_permalink(meta.get("permalink"))
+        replies = [r for r in self.replies(*ref, limit) if r] if ref else []
+        if not replies:
+            return res
+        text = res.get("text", "") + "".join(f"\n  ↳ {r}" for r in replies)
+        return {**res, "text": text, "metadata": {**meta, "thread_replies": len(replies)}}